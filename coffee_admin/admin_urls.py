@@ -0,0 +1,248 @@
+"""
+Memoized admin URLs for the launcher.
+
+Reversing ``admin:<app>_<model>_changelist`` and ``_add`` for every model on
+every request would walk the URL resolver thousands of times. Instead
+``AdminURLTable`` reverses all of an AdminSite's URLs once per language,
+script prefix and URLconf, so they are correct wherever the admin is mounted
+(also under ``i18n_patterns()``), and keeps them until the site's registry or
+``ROOT_URLCONF`` changes. Record change URLs are reversed once per model as a
+template and filled in with the quoted primary key.
+
+The table also lists every app index page and every other parameterless
+named pattern of the site -- custom AdminSite views and the extra views of
+``ModelAdmin.get_urls()`` -- found by walking ``admin_site.get_urls()``.
+
+AdminSites that are not mounted in the URLconf fall back to
+``<script prefix><site name>/...`` paths.
+"""
+import threading
+import weakref
+
+from django.contrib.admin.utils import quote
+from django.urls import (
+    NoReverseMatch,
+    URLResolver,
+    get_script_prefix,
+    get_urlconf,
+    reverse,
+)
+from django.utils import translation
+
+# Stand-in primary key reversed into change URL templates
+PK_PLACEHOLDER = '__coffee_pk__'
+
+# Site-level pattern names the launcher does not list as pages: the index is
+# the home entry, the others are not pages or do not accept GET requests.
+SKIPPED_PAGE_NAMES = frozenset((
+    'index', 'login', 'logout', 'password_change_done', 'autocomplete', 'jsi18n',
+))
+# Model pattern suffixes already covered by list and add entries
+SKIPPED_MODEL_PAGE_SUFFIXES = frozenset(('changelist', 'add'))
+
+
+class AdminURLTable:
+    """
+    The reversed index, changelist, add and change URLs of every model
+    registered on ``admin_site``, for the given URLconf and script prefix.
+    """
+    __slots__ = (
+        'admin_site', 'urlconf', 'prefix', 'namespace', 'index', 'models', 'apps', 'pages',
+    )
+
+    def __init__(self, admin_site, urlconf=None, prefix='/'):
+        self.admin_site = admin_site
+        self.urlconf = urlconf
+        self.prefix = prefix
+        self.namespace = getattr(admin_site, 'name', 'admin')
+        self.index = self.reverse('index', '')
+        self.models = {}
+        for model in list(admin_site._registry):
+            self.models[model] = self.reverse_model(model)
+        self.apps = {
+            app_label: self.reverse('app_list', f'{app_label}/', kwargs={'app_label': app_label})
+            for app_label in dict.fromkeys(model._meta.app_label for model in self.models)
+        }
+        self.pages = self.collect_pages()
+
+    @classmethod
+    def from_snapshot(cls, admin_site, urlconf, prefix, snapshot):
+        """
+        Return a table for ``admin_site`` restored from ``snapshot()`` output
+        instead of reversing every URL again. Raises LookupError if a model
+        in the snapshot is not registered on the site.
+        """
+        registered = {model._meta.label_lower: model for model in list(admin_site._registry)}
+        table = cls.__new__(cls)
+        table.admin_site = admin_site
+        table.urlconf = urlconf
+        table.prefix = prefix
+        table.namespace = getattr(admin_site, 'name', 'admin')
+        table.index = snapshot['index']
+        table.models = {
+            get_registered(registered, label): tuple(urls)
+            for label, urls in snapshot['models'].items()
+        }
+        table.apps = dict(snapshot['apps'])
+        table.pages = [
+            (name, url, get_registered(registered, label) if label else None)
+            for name, url, label in snapshot['pages']
+        ]
+        return table
+
+    def snapshot(self):
+        """
+        Return the table as plain, picklable data, with models referenced by
+        their label.
+        """
+        return {
+            'index': self.index,
+            'models': {model._meta.label_lower: urls for model, urls in self.models.items()},
+            'apps': self.apps,
+            'pages': [
+                (name, url, model._meta.label_lower if model is not None else None)
+                for name, url, model in self.pages
+            ],
+        }
+
+    def reverse(self, name, fallback, args=(), kwargs=None):
+        """
+        Return the URL named ``name`` in the site's namespace, or ``fallback``
+        under the site's path if the site is not in the URLconf.
+        """
+        try:
+            return reverse(
+                f'{self.namespace}:{name}', urlconf=self.urlconf, args=args, kwargs=kwargs,
+            )
+        except NoReverseMatch:
+            return f'{self.prefix}{self.namespace}/{fallback}'
+
+    def collect_pages(self):
+        """
+        Return ``(name, url, model)`` for the site's parameterless named
+        patterns other than the index, changelists and add views. ``model``
+        is set for patterns added by a ModelAdmin.
+        """
+        model_prefixes = {
+            f'{model._meta.app_label}_{model._meta.model_name}_': model for model in self.models
+        }
+        pages = []
+        try:
+            patterns = self.admin_site.get_urls()
+        except Exception:
+            # A broken get_urls() leaves out the pages, not the whole catalog
+            return pages
+        for name, path in iter_named_patterns(patterns):
+            if name in SKIPPED_PAGE_NAMES:
+                continue
+            model = None
+            for prefix, prefix_model in model_prefixes.items():
+                if name.startswith(prefix):
+                    model = prefix_model
+                    if name[len(prefix):] in SKIPPED_MODEL_PAGE_SUFFIXES:
+                        name = None
+                    break
+            if name is not None:
+                pages.append((name, self.reverse(name, path), model))
+        return pages
+
+    def reverse_model(self, model):
+        """
+        Return the ``(changelist, add, change template)`` URLs of ``model``.
+        """
+        app_label, model_name = model._meta.app_label, model._meta.model_name
+        name = f'{app_label}_{model_name}'
+        path = f'{app_label}/{model_name}/'
+        return (
+            self.reverse(f'{name}_changelist', path),
+            self.reverse(f'{name}_add', f'{path}add/'),
+            self.reverse(f'{name}_change', f'{path}{PK_PLACEHOLDER}/change/', (PK_PLACEHOLDER,)),
+        )
+
+    def get_model_urls(self, model):
+        urls = self.models.get(model)
+        if urls is None:
+            # Registered after the table was built
+            urls = self.reverse_model(model)
+        return urls
+
+    def changelist(self, model):
+        return self.get_model_urls(model)[0]
+
+    def add(self, model):
+        return self.get_model_urls(model)[1]
+
+    def change(self, model, pk):
+        return self.get_model_urls(model)[2].replace(PK_PLACEHOLDER, str(quote(pk)))
+
+
+def get_registered(registered, label):
+    try:
+        return registered[label]
+    except KeyError:
+        raise LookupError(f'Model {label!r} is not registered.')
+
+
+def iter_named_patterns(patterns, path=''):
+    """
+    Yield ``(name, path)`` for every named pattern in the ``patterns`` tree
+    that takes no arguments, without descending into other namespaces.
+    """
+    for pattern in patterns:
+        if pattern.pattern.regex.groups:
+            continue
+        route = str(pattern.pattern).lstrip('^').rstrip('$')
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace is None:
+                yield from iter_named_patterns(pattern.url_patterns, path + route)
+        elif pattern.name:
+            yield pattern.name, path + route
+
+
+_tables = weakref.WeakKeyDictionary()
+_tables_lock = threading.Lock()
+
+
+def get_url_key():
+    """
+    Return the ``(urlconf, script prefix)`` of the current request.
+    """
+    return get_urlconf(), get_script_prefix()
+
+
+def get_url_table(admin_site, snapshot=None):
+    """
+    Return the URL table of ``admin_site`` for the active language and the
+    current request's URLconf and script prefix, building it on first use
+    (from ``snapshot`` if given).
+    """
+    urlconf, prefix = get_url_key()
+    # reverse() prefixes the language code under i18n_patterns()
+    key = (translation.get_language(), urlconf, prefix)
+    site_tables = _tables.get(admin_site)
+    if site_tables is not None:
+        table = site_tables.get(key)
+        if table is not None:
+            return table
+
+    with _tables_lock:
+        site_tables = _tables.setdefault(admin_site, {})
+        table = site_tables.get(key)
+        if table is None:
+            if snapshot is not None:
+                table = AdminURLTable.from_snapshot(admin_site, urlconf, prefix, snapshot)
+            else:
+                table = AdminURLTable(admin_site, urlconf, prefix)
+            site_tables[key] = table
+    return table
+
+
+def invalidate_url_tables(admin_site=None):
+    """
+    Drop the URL tables of ``admin_site``, or of every site if None.
+    """
+    with _tables_lock:
+        if admin_site is None:
+            _tables.clear()
+        else:
+            _tables.pop(admin_site, None)
@@ -11,4 +11,17 @@ class CoffeeAdminConfig(AppConfig):
         This method is called when Django starts.
         Use this for any admin-specific initialization.
         """
-        pass
+        from . import catalog, permissions, prebuilt, record_index
+
+        # Keep each AdminSite's search catalog in sync with its registry
+        catalog.install_registry_hooks()
+        # Rebuild catalogs and reversed admin URLs when ROOT_URLCONF changes
+        catalog.connect_signals()
+        # Read catalogs prebuilt by coffee_build_index; they are matched
+        # against the registries, which are not filled yet, on first use
+        prebuilt.connect_signals()
+        prebuilt.load_index()
+        # Drop cached permission checks when users, groups or permissions change
+        permissions.connect_signals()
+        # Keep the optional FTS5 record index in sync with saves and deletes
+        record_index.connect_signals()
@@ -0,0 +1,656 @@
+"""
+Precompiled search catalog for an AdminSite.
+
+Walking ``admin_site._registry`` and formatting every model's titles, URLs and
+icons is the same work for every request and every user, so it is done once
+per AdminSite (and active language, URLconf and script prefix) and kept until
+the registry or ``ROOT_URLCONF`` changes.
+Only permission checks remain request-specific; see ``CatalogEntry.permission``.
+
+With ``COFFEE_ADMIN_CATALOG_CACHE`` set, catalogs are also shared between
+worker processes as snapshots in that cache (see ``coffee_admin.shared_cache``).
+Catalogs written to disk by ``manage.py coffee_build_index`` are restored
+without building them at all (see ``coffee_admin.prebuilt``).
+"""
+import hashlib
+import threading
+import weakref
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin import AdminSite
+from django.contrib.admin.sites import all_sites
+from django.core.signals import setting_changed
+from django.urls import NoReverseMatch, reverse
+from django.utils import translation
+from django.utils.functional import cached_property
+
+from .admin_urls import (
+    get_registered,
+    get_url_key,
+    get_url_table,
+    invalidate_url_tables,
+)
+from .conf import get_setting
+from .prebuilt import get_prebuilt_snapshot, load_index
+from .search import SearchIndex
+from .shared_cache import get_or_build, get_shared_cache, make_key
+from .singleflight import SingleFlight
+
+# Titles of the built-in admin views listed as pages
+PAGE_TITLES = {
+    'password_change': 'Change Password',
+}
+
+# Changed whenever the layout of AdminCatalog.snapshot() changes
+SNAPSHOT_FORMAT = 1
+
+
+class EntryData:
+    """
+    The site-independent part of a launcher entry: its texts, icon and the
+    permission it requires. Instances are interned (see ``intern_entry_data``)
+    so every AdminSite registering the same model shares them.
+    """
+    __slots__ = (
+        'title', 'subtitle', 'icon', 'category', 'app_label', 'model',
+        'permission', 'permission_key', 'keywords', 'searchable', '__weakref__',
+    )
+
+    def __init__(self, title, subtitle, icon, category, app_label, model, permission, keywords):
+        self.title = title
+        self.subtitle = subtitle
+        self.icon = icon
+        self.category = category
+        self.app_label = app_label
+        self.model = model
+        self.permission = permission
+        self.permission_key = None
+        if permission is not None and model is not None:
+            self.permission_key = f'{model._meta.label_lower}:{permission}'
+        self.keywords = keywords
+        self.searchable = f'{title} {subtitle} {app_label} {keywords}'.strip().lower()
+
+
+_entry_store = weakref.WeakValueDictionary()
+_entry_store_lock = threading.Lock()
+
+
+def intern_entry_data(*fields):
+    """
+    Return the shared EntryData for ``fields``, creating it if no live
+    catalog uses an identical one yet.
+    """
+    data = _entry_store.get(fields)
+    if data is None:
+        with _entry_store_lock:
+            data = _entry_store.get(fields)
+            if data is None:
+                data = _entry_store[fields] = EntryData(*fields)
+    return data
+
+
+def _shared(name):
+    return property(lambda entry: getattr(entry.data, name))
+
+
+class CatalogEntry:
+    """
+    A single launcher entry of one AdminSite.
+
+    The texts live in a shared, interned ``EntryData``; the entry itself only
+    adds what differs between sites: the URL and the ModelAdmin whose
+    permission hooks decide whether it is shown.
+
+    ``permission`` names the ModelAdmin permission (e.g. ``'add'``) the user
+    must have for the entry to be shown, or is None for entries that are
+    always visible.
+    """
+    __slots__ = ('data', 'url', 'model_admin')
+
+    title = _shared('title')
+    subtitle = _shared('subtitle')
+    icon = _shared('icon')
+    category = _shared('category')
+    app_label = _shared('app_label')
+    model = _shared('model')
+    permission = _shared('permission')
+    permission_key = _shared('permission_key')
+    searchable = _shared('searchable')
+
+    def __init__(self, title, subtitle, url, icon, category, app_label,
+                 model=None, model_admin=None, permission=None, keywords=''):
+        self.data = intern_entry_data(
+            title, subtitle, icon, category, app_label, model, permission, keywords,
+        )
+        self.url = url
+        self.model_admin = model_admin
+
+    @classmethod
+    def from_snapshot(cls, fields, admin_site, registered):
+        """
+        Return the entry described by ``snapshot()`` output, taking the model
+        from ``registered`` (models by label) and its ModelAdmin from
+        ``admin_site``.
+        """
+        title, subtitle, url, icon, category, app_label, label, permission, keywords = fields
+        model = model_admin = None
+        if label is not None:
+            model = get_registered(registered, label)
+            model_admin = admin_site._registry.get(model)
+        return cls(
+            title, subtitle, url, icon, category, app_label,
+            model, model_admin, permission, keywords,
+        )
+
+    def snapshot(self):
+        """
+        Return the entry as a picklable tuple, with the model as its label.
+        """
+        data = self.data
+        label = data.model._meta.label_lower if data.model is not None else None
+        return (
+            data.title, data.subtitle, self.url, data.icon, data.category, data.app_label,
+            label, data.permission, data.keywords,
+        )
+
+    def has_permission(self, request):
+        """
+        Return True if the request's user may see this entry.
+        """
+        if self.permission is None:
+            return True
+        return self.has_model_permission(request, self.permission)
+
+    def has_model_permission(self, request, permission):
+        """
+        Return True if the entry's ModelAdmin grants ``permission`` (e.g.
+        ``'view'``) to the request's user.
+        """
+        try:
+            check = getattr(self.model_admin, f'has_{permission}_permission')
+            return bool(check(request))
+        except Exception:
+            # A broken permission hook hides the entry rather than the whole search
+            return False
+
+    def is_permitted(self, permitted_keys):
+        """
+        Return True if this entry is visible given a user's permitted keys
+        (see ``coffee_admin.permissions.get_permitted_keys``).
+        """
+        return self.permission_key is None or self.permission_key in permitted_keys
+
+    def as_dict(self):
+        data = self.data
+        return {
+            'title': data.title,
+            'subtitle': data.subtitle,
+            'url': self.url,
+            'icon': data.icon,
+            'category': data.category,
+            'app_label': data.app_label,
+        }
+
+
+class AdminCatalog:
+    """
+    All permission-independent launcher entries for one AdminSite.
+
+    ``home`` is the admin index entry; ``entries`` holds the model list and
+    add entries in registry order and ``pages`` the app index pages and the
+    site's other named views. URLs come from ``urls`` (the site's
+    AdminURLTable for the current request by default). ``version`` changes
+    whenever the entries or the ModelAdmin classes behind them change.
+    """
+
+    def __init__(self, admin_site, urls=None):
+        self.admin_site = admin_site
+        self.urls = urls if urls is not None else get_url_table(admin_site)
+        self.home = build_home_entry(admin_site, self.urls)
+        self.entries = build_model_entries(admin_site, self.urls)
+        self.pages = build_page_entries(admin_site, self.urls)
+        self.version = compute_version(admin_site, self)
+
+    @classmethod
+    def from_snapshot(cls, admin_site, snapshot):
+        """
+        Return the catalog of ``admin_site`` restored from ``snapshot()``
+        output, without walking the registry or reversing URLs. Raises
+        LookupError, KeyError or ValueError if the snapshot does not fit the
+        site's registry.
+        """
+        if snapshot['format'] != SNAPSHOT_FORMAT:
+            raise ValueError(f'Unsupported catalog snapshot format {snapshot["format"]!r}.')
+        registered = {model._meta.label_lower: model for model in list(admin_site._registry)}
+        entries = [
+            CatalogEntry.from_snapshot(fields, admin_site, registered)
+            for fields in snapshot['entries']
+        ]
+        model_count = snapshot['model_entries']
+
+        catalog = cls.__new__(cls)
+        catalog.admin_site = admin_site
+        catalog.urls = get_url_table(admin_site, snapshot['urls'])
+        catalog.home = entries[0]
+        catalog.entries = entries[1:model_count + 1]
+        catalog.pages = entries[model_count + 1:]
+        catalog.version = snapshot['version']
+        return catalog
+
+    def snapshot(self):
+        """
+        Return the catalog and its URL table as plain, picklable data.
+        """
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'version': self.version,
+            'urls': self.urls.snapshot(),
+            'entries': [entry.snapshot() for entry in self],
+            'model_entries': len(self.entries),
+        }
+
+    def __iter__(self):
+        yield self.home
+        yield from self.entries
+        yield from self.pages
+
+    def __len__(self):
+        return len(self.entries) + len(self.pages) + 1
+
+    @cached_property
+    def index(self):
+        """
+        The ranked search index, built on the first non-empty query.
+        """
+        return SearchIndex(list(self))
+
+    def search(self, query, limit, predicate=None, offset=0):
+        """
+        Return up to ``limit`` entries matching ``query`` that satisfy
+        ``predicate``, skipping the first ``offset`` of them. An empty query
+        returns entries in catalog order, otherwise results are ranked by
+        relevance. Either way no more than ``offset + limit`` entries are
+        checked against ``predicate``.
+        """
+        if not query:
+            results = []
+            skipped = 0
+            for entry in self:
+                if predicate is None or predicate(entry):
+                    if skipped < offset:
+                        skipped += 1
+                        continue
+                    results.append(entry)
+                    if len(results) >= limit:
+                        break
+            return results
+        return self.index.search(query, limit, predicate, offset=offset)
+
+
+def compute_version(admin_site, entries):
+    """
+    Return a short, stable digest of ``entries`` for use in cache keys.
+    """
+    digest = hashlib.sha1(getattr(admin_site, 'name', 'admin').encode())
+    for entry in entries:
+        model_admin = type(entry.model_admin)
+        digest.update('\x1f'.join((
+            entry.title, entry.subtitle, entry.url, entry.icon, entry.category,
+            entry.app_label, entry.permission or '',
+            f'{model_admin.__module__}.{model_admin.__qualname__}',
+        )).encode())
+    return digest.hexdigest()[:16]
+
+
+def get_catalog_fingerprint(admin_site):
+    """
+    Return a digest of the cheap inputs of the catalog of ``admin_site`` in
+    the active language, URLconf and script prefix: the registry, the
+    ModelAdmin classes, the verbose names of the models and their apps,
+    where the site is mounted and COFFEE_ADMIN_CATALOG_CACHE_VERSION.
+
+    The site's URL patterns are left out, since walking ``get_urls()`` costs
+    a good part of a build. Changed patterns, or different titles after
+    upgrading coffee_admin, only show up in new catalogs once
+    COFFEE_ADMIN_CATALOG_CACHE_VERSION changes or the index is rebuilt.
+    """
+    urlconf, prefix = get_url_key()
+    name = getattr(admin_site, 'name', 'admin')
+    try:
+        index = reverse(f'{name}:index', urlconf=urlconf)
+    except NoReverseMatch:
+        index = ''
+    digest = hashlib.sha1('\x1f'.join((
+        str(SNAPSHOT_FORMAT),
+        str(get_setting('CATALOG_CACHE_VERSION')),
+        name,
+        translation.get_language() or '',
+        str(urlconf or settings.ROOT_URLCONF),
+        prefix,
+        index,
+    )).encode())
+    app_labels = {}
+    for model, model_admin in list(admin_site._registry.items()):
+        opts = model._meta
+        admin_class = type(model_admin)
+        app_labels[opts.app_label] = None
+        digest.update((
+            f'\x1f{opts.label_lower}={admin_class.__module__}.{admin_class.__qualname__}'
+            f'\x1f{opts.verbose_name}\x1f{opts.verbose_name_plural}'
+        ).encode())
+    for app_label in app_labels:
+        try:
+            digest.update(f'\x1f{apps.get_app_config(app_label).verbose_name}'.encode())
+        except LookupError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+def build_home_entry(admin_site, urls):
+    return CatalogEntry(
+        title='Admin Home',
+        subtitle='Django administration index',
+        url=urls.index,
+        icon='🏠',
+        category='navigation',
+        app_label='admin',
+        keywords='home index',
+    )
+
+
+def build_model_entries(admin_site, urls):
+    """
+    Return the list and add entries for every model registered on ``admin_site``.
+    """
+    entries = []
+
+    for model, model_admin in list(admin_site._registry.items()):
+        try:
+            app_label = model._meta.app_label
+            model_name = model._meta.model_name
+
+            # Safely get verbose names with fallbacks
+            verbose_name = getattr(model._meta, 'verbose_name', model_name.replace('_', ' '))
+            verbose_name_plural = getattr(model._meta, 'verbose_name_plural', verbose_name + 's')
+            verbose_name = str(verbose_name)
+            verbose_name_plural = str(verbose_name_plural)
+
+            list_entry = CatalogEntry(
+                title=verbose_name_plural.title(),
+                subtitle=f'View all {verbose_name_plural}',
+                url=urls.changelist(model),
+                icon=get_model_icon(app_label, model_name),
+                category='models',
+                app_label=app_label,
+                model=model,
+                model_admin=model_admin,
+            )
+            add_entry = CatalogEntry(
+                title=f'Add {verbose_name.title()}',
+                subtitle=f'Create a new {verbose_name}',
+                url=urls.add(model),
+                icon='➕',
+                category='actions',
+                app_label=app_label,
+                model=model,
+                model_admin=model_admin,
+                permission='add',
+            )
+        except Exception:
+            # Skip models that cause errors
+            continue
+        entries.append(list_entry)
+        entries.append(add_entry)
+
+    return entries
+
+
+def build_page_entries(admin_site, urls):
+    """
+    Return entries for the app index pages and the other parameterless named
+    views of ``admin_site`` (see ``AdminURLTable.pages``). Views added by a
+    ModelAdmin require its view permission.
+    """
+    entries = []
+    for app_label, url in urls.apps.items():
+        try:
+            app_name = str(apps.get_app_config(app_label).verbose_name)
+        except LookupError:
+            app_name = app_label.replace('_', ' ').title()
+        entries.append(CatalogEntry(
+            title=app_name,
+            subtitle=f'Browse {app_name} models',
+            url=url,
+            icon='📁',
+            category='apps',
+            app_label=app_label,
+        ))
+
+    for name, url, model in urls.pages:
+        if model is None:
+            entries.append(CatalogEntry(
+                title=PAGE_TITLES.get(name, name.replace('_', ' ').title()),
+                subtitle='Admin page',
+                url=url,
+                icon='🔗',
+                category='pages',
+                app_label='admin',
+            ))
+            continue
+        opts = model._meta
+        action = name[len(f'{opts.app_label}_{opts.model_name}_'):].replace('_', ' ')
+        verbose_name_plural = str(opts.verbose_name_plural)
+        entries.append(CatalogEntry(
+            title=f'{action} {verbose_name_plural}'.title(),
+            subtitle=f'Custom {verbose_name_plural} view',
+            url=url,
+            icon=get_model_icon(opts.app_label, opts.model_name),
+            category='pages',
+            app_label=opts.app_label,
+            model=model,
+            model_admin=admin_site._registry.get(model),
+            permission='view',
+        ))
+    return entries
+
+
+_catalogs = weakref.WeakKeyDictionary()
+_catalogs_lock = threading.Lock()
+# Changed by every invalidation, so catalogs loaded meanwhile are not kept
+_catalogs_generation = 0
+# Catalogs being loaded; the lock is never held while one is loaded, since
+# that may wait for another process through the shared cache
+_catalog_flights = SingleFlight()
+
+
+def get_catalog_key():
+    return (translation.get_language(), *get_url_key())
+
+
+def get_loaded_catalog(admin_site):
+    """
+    Return the catalog ``get_catalog()`` would return if it is already
+    built, or None. Never builds or waits, so async code may call it.
+    """
+    site_catalogs = _catalogs.get(admin_site)
+    if site_catalogs is None:
+        return None
+    return site_catalogs.get(get_catalog_key())
+
+
+def get_catalog(admin_site):
+    """
+    Return the catalog for ``admin_site`` in the active language and for the
+    current URLconf and script prefix, building it on first use.
+    """
+    catalog = get_loaded_catalog(admin_site)
+    if catalog is not None:
+        return catalog
+    key = get_catalog_key()
+
+    def load():
+        with _catalogs_lock:
+            catalog = _catalogs.get(admin_site, {}).get(key)
+            generation = _catalogs_generation
+        if catalog is not None:
+            return catalog
+        catalog = load_catalog(admin_site)
+        with _catalogs_lock:
+            if generation != _catalogs_generation:
+                # Invalidated while it was loaded; use it for this request only
+                return catalog
+            return _catalogs.setdefault(admin_site, {}).setdefault(key, catalog)
+
+    return _catalog_flights.do((admin_site, key), load)
+
+
+def load_catalog(admin_site):
+    """
+    Build the catalog of ``admin_site``, or restore it from the snapshot
+    written by ``coffee_build_index`` or stored by another process in the
+    COFFEE_ADMIN_CATALOG_CACHE cache.
+    """
+    cache = get_shared_cache()
+    if cache is None and not load_index():
+        return AdminCatalog(admin_site)
+
+    fingerprint = get_catalog_fingerprint(admin_site)
+    snapshot = get_prebuilt_snapshot(fingerprint)
+    if snapshot is not None:
+        try:
+            return AdminCatalog.from_snapshot(admin_site, snapshot)
+        except (LookupError, KeyError, TypeError, ValueError):
+            # Written for a different registry after all; build it instead
+            pass
+    if cache is None:
+        return AdminCatalog(admin_site)
+
+    built = []
+
+    def build():
+        built.append(AdminCatalog(admin_site))
+        return built[0].snapshot()
+
+    key = make_key('catalog', fingerprint)
+    snapshot = get_or_build(cache, key, build, get_setting('CATALOG_CACHE_TIMEOUT'))
+    if built:
+        return built[0]
+    try:
+        return AdminCatalog.from_snapshot(admin_site, snapshot)
+    except (LookupError, KeyError, TypeError, ValueError):
+        # Stored by a process with a different registry after all
+        return AdminCatalog(admin_site)
+
+
+def find_admin_site(name):
+    """
+    Return the AdminSite instance named ``name``, or None.
+    """
+    for admin_site in list(all_sites):
+        if admin_site.name == name:
+            return admin_site
+    return None
+
+
+def invalidate_catalog(admin_site=None):
+    """
+    Drop the cached catalog and URL tables for ``admin_site``, or for every
+    site if None.
+    """
+    global _catalogs_generation
+    with _catalogs_lock:
+        _catalogs_generation += 1
+        if admin_site is None:
+            _catalogs.clear()
+        else:
+            _catalogs.pop(admin_site, None)
+    invalidate_url_tables(admin_site)
+
+
+def _setting_changed(setting, **kwargs):
+    # Admin URLs are reversed against ROOT_URLCONF
+    if setting == 'ROOT_URLCONF':
+        invalidate_catalog()
+
+
+def connect_signals():
+    """
+    Rebuild catalogs and URL tables when ``ROOT_URLCONF`` is changed, e.g. by
+    ``override_settings`` in tests.
+    """
+    setting_changed.connect(_setting_changed, dispatch_uid='coffee_admin.catalog')
+
+
+def install_registry_hooks():
+    """
+    Wrap ``AdminSite.register`` and ``AdminSite.unregister`` so that changing
+    a site's registry invalidates its catalog. Safe to call more than once.
+    """
+    if getattr(AdminSite, '_coffee_admin_hooked', False):
+        return
+
+    original_register = AdminSite.register
+    original_unregister = AdminSite.unregister
+
+    def register(self, *args, **kwargs):
+        try:
+            return original_register(self, *args, **kwargs)
+        finally:
+            invalidate_catalog(self)
+
+    def unregister(self, *args, **kwargs):
+        try:
+            return original_unregister(self, *args, **kwargs)
+        finally:
+            invalidate_catalog(self)
+
+    register.__wrapped__ = original_register
+    unregister.__wrapped__ = original_unregister
+    AdminSite.register = register
+    AdminSite.unregister = unregister
+    AdminSite._coffee_admin_hooked = True
+
+
+def get_model_icon(app_label, model_name):
+    """
+    Return an icon emoji for a model based on common patterns.
+    """
+    icon_map = {
+        'auth': {
+            'user': '👤',
+            'group': '👥',
+            'permission': '🔐',
+        },
+        'contenttypes': {
+            'contenttype': '📋',
+        },
+        'sessions': {
+            'session': '🔑',
+        },
+        'sites': {
+            'site': '🌐',
+        },
+        'admin': {
+            'logentry': '📝',
+        },
+    }
+
+    # Try to find specific icon for this model
+    if app_label in icon_map and model_name in icon_map[app_label]:
+        return icon_map[app_label][model_name]
+
+    # Generic icons based on app
+    app_icons = {
+        'auth': '🔐',
+        'contenttypes': '📋',
+        'sessions': '🔑',
+        'sites': '🌐',
+        'admin': '⚙️',
+    }
+
+    if app_label in app_icons:
+        return app_icons[app_label]
+
+    # Default icon
+    return '📦'
@@ -0,0 +1,92 @@
+"""
+Settings for django-coffee-admin.
+
+Every setting is optional. Override a default by defining it in your Django
+settings with the ``COFFEE_ADMIN_`` prefix, for example::
+
+    COFFEE_ADMIN_PERMISSION_CACHE_SIZE = 5000
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Number of (user, permission fingerprint) entries kept in the per-process
+    # permission cache. 0 disables the cache.
+    'PERMISSION_CACHE_SIZE': 1000,
+    # max-age (seconds) of the private Cache-Control header on search
+    # responses. 0 makes browsers revalidate with If-None-Match every time.
+    'SEARCH_CACHE_MAX_AGE': 0,
+    # Add a Server-Timing header with per-phase durations to search responses.
+    'SERVER_TIMING': False,
+    # Callable, or dotted path to one, called with the metrics of every search
+    # request (see coffee_admin.metrics). None disables it.
+    'METRICS_CALLBACK': None,
+    # Alias of a Django cache shared by all worker processes, used to share
+    # catalogs between them. None keeps every catalog in its own process.
+    'CATALOG_CACHE': None,
+    # Seconds after which a shared catalog is rebuilt. One process rebuilds
+    # it while the others keep using the previous copy.
+    'CATALOG_CACHE_TIMEOUT': 3600,
+    # Mixed into shared cache keys; set it to your release to make a deploy
+    # that changes ModelAdmin code start with fresh catalogs.
+    'CATALOG_CACHE_VERSION': '',
+    # File written by `manage.py coffee_build_index`. Worker processes restore
+    # catalogs from it instead of building them, while their fingerprint matches.
+    'CATALOG_INDEX_PATH': None,
+    # Also share permitted entry sets through CATALOG_CACHE, so permission
+    # changes invalidate them in every process.
+    'SHARE_PERMISSIONS': False,
+    # Callable, or dotted path to one, encoding launcher responses as JSON
+    # (returning str or bytes). None uses orjson if installed, else the
+    # standard library.
+    'JSON_ENCODER': None,
+    # Largest page size a client may request with the search ``limit``
+    # parameter.
+    'SEARCH_MAX_LIMIT': 100,
+    # Search requests per second each user may make, as a token bucket kept
+    # by every worker process. Requests over the limit get 429 Too Many
+    # Requests with Retry-After. None disables throttling.
+    'SEARCH_THROTTLE_RATE': None,
+    # Number of search requests a user may make at once before the rate
+    # applies.
+    'SEARCH_THROTTLE_BURST': 30,
+    # Let concurrent identical searches in a process wait for one computation
+    # of the response instead of each computing it.
+    'COALESCE_SEARCHES': True,
+    # Let superusers profile a search request by adding ``profile=1`` to it
+    # (see coffee_admin.profiling). Leave disabled unless you need it.
+    'PROFILING': False,
+    # Directory profiled requests write their full cProfile output to. None
+    # only returns the summary in the response.
+    'PROFILE_DIR': None,
+    # Number of functions, by cumulative time, listed in a profile summary.
+    'PROFILE_FUNCTIONS': 30,
+    # Add row counts to model results, computed in a background thread from
+    # database statistics (see coffee_admin.counts).
+    'MODEL_COUNTS': False,
+    # Seconds before a row count is computed again. Until then the previous
+    # count is shown.
+    'MODEL_COUNTS_TTL': 300,
+    # Tables the database estimates below this many rows, or cannot estimate,
+    # are counted exactly.
+    'MODEL_COUNTS_EXACT_BELOW': 10000,
+    # Also search records through each ModelAdmin's search_fields.
+    'RECORD_SEARCH': False,
+    # Queries shorter than this do not trigger a record search.
+    'RECORD_SEARCH_MIN_QUERY_LENGTH': 2,
+    # Maximum number of records fetched per model.
+    'RECORD_SEARCH_LIMIT': 5,
+    # Global deadline (seconds) for all per-model record queries.
+    'RECORD_SEARCH_TIMEOUT': 0.5,
+    # Size of the record search thread pool. 0 runs the queries inline.
+    'RECORD_SEARCH_WORKERS': 4,
+    # Path of the SQLite FTS5 record index used for models whose ModelAdmin
+    # sets coffee_record_index = True. None disables the index.
+    'RECORD_INDEX_PATH': None,
+}
+
+
+def get_setting(name):
+    """
+    Return the value of ``COFFEE_ADMIN_<name>``, falling back to its default.
+    """
+    return getattr(settings, f'COFFEE_ADMIN_{name}', DEFAULTS[name])
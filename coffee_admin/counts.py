@@ -0,0 +1,186 @@
+"""
+Row-count badges for model results ("Orders (2.3M)").
+
+Counting every registered model on each search would cost one ``COUNT(*)``
+per model per keystroke, so counts are never computed on the request path.
+With ``COFFEE_ADMIN_MODEL_COUNTS`` enabled, the search and catalog views
+attach whatever counts this process already knows to model list entries and
+ask a single background thread to (re)compute missing counts and counts
+older than ``COFFEE_ADMIN_MODEL_COUNTS_TTL``. The first responses after
+startup carry no counts; later ones do. Counts are only attached for users
+who may view the model's rows (see ``permissions.get_view_key``).
+
+Counts come from the database's own statistics where it keeps them:
+``pg_class.reltuples`` on PostgreSQL, ``information_schema.TABLES`` on
+MySQL and MariaDB, and ``sqlite_stat1`` on SQLite after ``ANALYZE``. Tables
+estimated below ``COFFEE_ADMIN_MODEL_COUNTS_EXACT_BELOW`` rows, and tables
+without statistics, are counted exactly with the model's default manager.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, connections, router
+
+from .conf import get_setting
+from .permissions import get_view_key
+from .records import run_in_worker
+
+_counts = {}
+_pending = set()
+_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the single-threaded pool counts are computed on.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='coffee-admin-counts',
+                )
+    return _executor
+
+
+def get_counts(models):
+    """
+    Return ``{model label: row count}`` for the known counts of ``models``
+    and schedule a background refresh of the missing and expired ones. Never
+    queries the database itself.
+    """
+    now = time.monotonic()
+    counts = {}
+    stale = []
+    with _lock:
+        for model in models:
+            label = model._meta.label_lower
+            known = _counts.get(label)
+            if known is not None and known[0] is not None:
+                counts[label] = known[0]
+            if (known is None or known[1] <= now) and label not in _pending:
+                _pending.add(label)
+                stale.append(model)
+    if stale:
+        try:
+            get_executor().submit(run_in_worker, refresh_counts, stale)
+        except RuntimeError:
+            # The pool is shut down at interpreter exit
+            with _lock:
+                _pending.difference_update(model._meta.label_lower for model in stale)
+    return counts
+
+
+def refresh_counts(models):
+    """
+    Count the rows of ``models`` and store the results.
+    """
+    ttl = get_setting('MODEL_COUNTS_TTL')
+    for model in models:
+        label = model._meta.label_lower
+        try:
+            count = count_rows(model)
+        except Exception:
+            # No badge for this model until the next refresh
+            count = None
+        with _lock:
+            _counts[label] = (count, time.monotonic() + ttl)
+            _pending.discard(label)
+
+
+def count_rows(model):
+    """
+    Return the number of rows of ``model``: the database's estimate for
+    large tables, an exact count for small ones.
+    """
+    using = router.db_for_read(model)
+    estimate = estimate_rows(model, using)
+    if estimate is None or estimate < get_setting('MODEL_COUNTS_EXACT_BELOW'):
+        return model._default_manager.using(using).count()
+    return estimate
+
+
+def estimate_rows(model, using):
+    """
+    Return the database's row estimate for the table of ``model``, or None
+    if it has none.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)'
+        params = [connection.ops.quote_name(table)]
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+        params = [table]
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+        params = [table]
+    else:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # e.g. sqlite_stat1 does not exist before the first ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    try:
+        # sqlite_stat1 stores "rows [rows per index key ...]"
+        estimate = int(float(str(row[0]).split()[0]))
+    except (IndexError, ValueError):
+        return None
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return estimate if estimate >= 0 else None
+
+
+def get_catalog_counts(catalog):
+    """
+    Return the known row counts of the models listed in ``catalog``, or an
+    empty dict if COFFEE_ADMIN_MODEL_COUNTS is disabled.
+    """
+    if not get_setting('MODEL_COUNTS'):
+        return {}
+    return get_counts([entry.model for entry in catalog.entries if entry.category == 'models'])
+
+
+def get_counts_key(counts):
+    """
+    Return a string identifying ``counts``, for response ETags.
+    """
+    return ','.join(f'{label}={count}' for label, count in sorted(counts.items()))
+
+
+def add_counts(entries, results, counts, permitted):
+    """
+    Add a ``count`` to each result of ``results`` built from a model list
+    entry of ``entries`` whose count is in ``counts``, if the user's
+    ``permitted`` keys allow viewing the model's rows.
+    """
+    if not counts:
+        return
+    for entry, result in zip(entries, results):
+        if entry.category == 'models' and get_view_key(entry.model) in permitted:
+            count = counts.get(entry.model._meta.label_lower)
+            if count is not None:
+                result['count'] = count
+
+
+def clear_counts():
+    """
+    Forget every known count.
+    """
+    with _lock:
+        _counts.clear()
+        _pending.clear()
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.contrib.admin.sites import all_sites
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import get_script_prefix, set_script_prefix
+from django.utils import translation
+
+from coffee_admin.catalog import AdminCatalog, get_catalog_fingerprint
+from coffee_admin.conf import get_setting
+from coffee_admin.prebuilt import write_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the Coffee Admin catalog of every AdminSite and write it to '
+        'COFFEE_ADMIN_CATALOG_INDEX_PATH, so worker processes start without building it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='File to write (default: COFFEE_ADMIN_CATALOG_INDEX_PATH).',
+        )
+        parser.add_argument(
+            '--language', action='append', dest='languages', metavar='LANGUAGE',
+            help='Build catalogs for this language; repeatable (default: LANGUAGE_CODE).',
+        )
+        parser.add_argument(
+            '--script-prefix',
+            help='Script prefix the site is served under (default: FORCE_SCRIPT_NAME or /).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or get_setting('CATALOG_INDEX_PATH')
+        if not path:
+            raise CommandError('Set COFFEE_ADMIN_CATALOG_INDEX_PATH or pass --path.')
+
+        languages = options['languages'] or [settings.LANGUAGE_CODE]
+        previous_prefix = get_script_prefix()
+        if options['script_prefix']:
+            prefix = options['script_prefix']
+            set_script_prefix(prefix if prefix.endswith('/') else f'{prefix}/')
+
+        snapshots = {}
+        try:
+            for admin_site in sorted(all_sites, key=lambda site: site.name):
+                for language in languages:
+                    with translation.override(language):
+                        fingerprint = get_catalog_fingerprint(admin_site)
+                        catalog = AdminCatalog(admin_site)
+                        snapshots[fingerprint] = catalog.snapshot()
+                    self.stdout.write(
+                        f'Built {len(catalog)} entries for {admin_site.name} ({language}).'
+                    )
+        finally:
+            set_script_prefix(previous_prefix)
+
+        try:
+            write_index(path, snapshots)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not write {path}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(snapshots)} catalogs to {path}.'))
@@ -0,0 +1,69 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from coffee_admin.record_index import build_row, get_indexed_models, get_record_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the Coffee Admin FTS5 record index for models whose ModelAdmin '
+        'sets coffee_record_index = True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='app_label.ModelName',
+            help='Only reindex these models (default: every opted-in model).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of records read and written per batch (default: 1000).',
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Update entries in place instead of clearing each model first.',
+        )
+
+    def handle(self, *args, **options):
+        record_index = get_record_index()
+        if record_index is None:
+            raise CommandError('Set COFFEE_ADMIN_RECORD_INDEX_PATH to use the record index.')
+
+        indexed_models = get_indexed_models()
+        if options['models']:
+            selected = {}
+            for label in options['models']:
+                try:
+                    model = apps.get_model(label)
+                except (LookupError, ValueError) as e:
+                    raise CommandError(str(e))
+                if model not in indexed_models:
+                    raise CommandError(f'{label} is not registered with coffee_record_index = True.')
+                selected[model] = indexed_models[model]
+            indexed_models = selected
+
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        for model, model_admin in indexed_models.items():
+            label = model._meta.label_lower
+            if not options['keep']:
+                record_index.clear(label)
+
+            # Keyset pagination keeps every chunk query cheap on large tables
+            count = 0
+            queryset = model._default_manager.order_by('pk')
+            last_pk = None
+            while True:
+                chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                objects = list(chunk[:chunk_size])
+                if not objects:
+                    break
+                record_index.index(build_row(model_admin, obj) for obj in objects)
+                count += len(objects)
+                last_pk = objects[-1].pk
+
+            self.stdout.write(f'Indexed {count} {label} records.')
+
+        self.stdout.write(self.style.SUCCESS('Record index is up to date.'))
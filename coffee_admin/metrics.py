@@ -0,0 +1,153 @@
+"""
+Per-request timing of the search endpoint.
+
+When enabled, SearchAdminUrlsView times each phase of a request (catalog
+lookup, permission checks, ranking, record search, serialization) and
+counts the database queries it runs. The timings are sent to the browser in
+a ``Server-Timing`` header (``COFFEE_ADMIN_SERVER_TIMING``) and published to
+collectors through the ``search_request_finished`` signal and the
+``COFFEE_ADMIN_METRICS_CALLBACK`` function.
+
+With none of these in use the view gets ``NULL_TIMER``, whose methods do
+nothing, so timing costs a couple of attribute lookups per request.
+"""
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from django.db import connections
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+from .conf import get_setting
+
+# Sent after every timed search request. Receivers get the view class as
+# sender and the keyword arguments request, query, timings ({phase: seconds}),
+# result_count and query_count (None where queries could not be counted).
+search_request_finished = Signal()
+
+NULL_PHASE = nullcontext()
+
+
+class SearchTimer:
+    """
+    Collects phase durations, the result count and the number of database
+    queries run by the current thread for one search request.
+    """
+    __slots__ = ('timings', 'result_count', 'query_count', 'header', '_started', '_wrappers')
+
+    enabled = True
+
+    def __init__(self, count_queries=True):
+        self.timings = {}
+        self.result_count = None
+        self.query_count = None
+        self.header = get_setting('SERVER_TIMING')
+        self._started = time.perf_counter()
+        self._wrappers = ExitStack()
+        if count_queries:
+            self.query_count = 0
+            for connection in connections.all():
+                self._wrappers.enter_context(connection.execute_wrapper(self._count_query))
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.query_count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - started
+
+    def count_results(self, count):
+        self.result_count = count
+
+    def finish(self):
+        """
+        Stop counting queries and record the total duration. Safe to call
+        more than once; only the first call counts.
+        """
+        if 'total' not in self.timings:
+            self._wrappers.close()
+            self.timings['total'] = time.perf_counter() - self._started
+
+    def add_header(self, response):
+        """
+        Add the phases timed so far to ``response`` as a Server-Timing header.
+        """
+        if self.header:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.timings.items()
+            )
+
+    def publish(self, sender, request, query):
+        """
+        Send the metrics to the ``search_request_finished`` signal and the
+        configured metrics callback.
+        """
+        metrics = {
+            'request': request,
+            'query': query,
+            'timings': dict(self.timings),
+            'result_count': self.result_count,
+            'query_count': self.query_count,
+        }
+        # A failing collector must not break the launcher
+        search_request_finished.send_robust(sender=sender, **metrics)
+        callback = get_metrics_callback()
+        if callback is not None:
+            try:
+                callback(**metrics)
+            except Exception:
+                pass
+
+
+class NullTimer:
+    """
+    Stand-in for SearchTimer when no one consumes the timings.
+    """
+    __slots__ = ()
+
+    enabled = False
+
+    def phase(self, name):
+        return NULL_PHASE
+
+    def count_results(self, count):
+        pass
+
+    def finish(self):
+        pass
+
+    def add_header(self, response):
+        pass
+
+    def publish(self, sender, request, query):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def get_metrics_callback():
+    """
+    Return the COFFEE_ADMIN_METRICS_CALLBACK callable (given as a callable or
+    a dotted path), or None.
+    """
+    callback = get_setting('METRICS_CALLBACK')
+    if isinstance(callback, str):
+        callback = import_string(callback)
+    return callback
+
+
+def start_timer(count_queries=True):
+    """
+    Return a running SearchTimer if Server-Timing, the metrics callback or a
+    ``search_request_finished`` receiver is configured, else NULL_TIMER.
+    """
+    if get_setting('SERVER_TIMING') or get_setting('METRICS_CALLBACK') or \
+            search_request_finished.has_listeners():
+        return SearchTimer(count_queries=count_queries)
+    return NULL_TIMER
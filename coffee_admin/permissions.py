@@ -0,0 +1,289 @@
+"""
+Per-user cache of launcher permission checks.
+
+``ModelAdmin.has_add_permission()`` may hit the database, and custom
+ModelAdmins can make it arbitrarily expensive. The set of permitted catalog
+entries is therefore computed once per user and kept in a bounded LRU cache
+keyed on the catalog version, the user id and a permission fingerprint.
+
+Entries are invalidated from ``post_save``/``post_delete`` on the user model,
+``Group`` and ``Permission`` and from ``m2m_changed`` on the group and
+permission relations (see ``connect_signals``). The cache is per process:
+permission changes made in another process are picked up there only.
+
+With ``COFFEE_ADMIN_SHARE_PERMISSIONS`` the permitted sets are also stored in
+the ``COFFEE_ADMIN_CATALOG_CACHE`` cache, and the fingerprint uses generation
+counters kept in that cache. Every process then sees every invalidation, at
+the cost of one cache lookup per request.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .conf import get_setting
+from .shared_cache import get_shared_cache, make_key
+
+
+class PermissionCache:
+    """
+    A thread-safe LRU mapping of ``(catalog version, user id, fingerprint,
+    counts enabled)`` to frozensets of permitted ``CatalogEntry.permission_key``
+    values.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = itertools.count()
+        self.generation = next(self._generation)
+        self.user_generations = {}
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, maxsize):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """
+        Drop every entry for ``user_id`` and change their fingerprint.
+        """
+        with self._lock:
+            self.user_generations[user_id] = next(self._generation)
+            for key in [key for key in self._data if key[1] == user_id]:
+                del self._data[key]
+
+    def clear(self):
+        """
+        Drop every entry and change every user's fingerprint.
+        """
+        with self._lock:
+            self._data.clear()
+            self.user_generations.clear()
+            self.generation = next(self._generation)
+
+    def __len__(self):
+        return len(self._data)
+
+
+permission_cache = PermissionCache()
+
+
+def get_shared_permission_cache():
+    """
+    Return the shared cache if COFFEE_ADMIN_SHARE_PERMISSIONS is enabled.
+    """
+    if not get_setting('SHARE_PERMISSIONS'):
+        return None
+    return get_shared_cache()
+
+
+def get_generation_keys(user_id):
+    return make_key('permissions', 'generation'), make_key('permissions', 'generation', user_id)
+
+
+def get_permission_fingerprint(user):
+    """
+    Return a short string that changes whenever the cached permissions of
+    ``user`` may have changed.
+    """
+    flags = '%d.%d.%d' % (user.is_active, user.is_staff, user.is_superuser)
+    cache = get_shared_permission_cache()
+    if cache is not None:
+        keys = get_generation_keys(user.pk)
+        try:
+            generations = cache.get_many(keys)
+        except Exception:
+            # Fall back to this process's own generations
+            pass
+        else:
+            return '%s-s%d.%d' % (flags, generations.get(keys[0], 0), generations.get(keys[1], 0))
+    return '%s-%d.%d' % (
+        flags,
+        permission_cache.generation,
+        permission_cache.user_generations.get(user.pk, 0),
+    )
+
+
+def bump_shared_generation(user_id=None):
+    """
+    Change the shared fingerprint of ``user_id``, or of every user if None,
+    so that other processes stop using their cached permitted sets.
+    """
+    cache = get_shared_permission_cache()
+    if cache is None:
+        return
+    key = get_generation_keys(user_id)[0 if user_id is None else 1]
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key)
+    except Exception:
+        # The entries still expire after COFFEE_ADMIN_CATALOG_CACHE_TIMEOUT
+        pass
+
+
+def get_view_key(model):
+    """
+    Return the permitted key granted to users who may view ``model``. Only
+    checked while COFFEE_ADMIN_MODEL_COUNTS is enabled.
+    """
+    return f'{model._meta.label_lower}:view'
+
+
+def get_permitted_keys(request, catalog):
+    """
+    Return the frozenset of ``permission_key`` values of the gated entries in
+    ``catalog`` that the request's user may see.
+    """
+    permitted = get_cached_permitted_keys(request, catalog)
+    if permitted is None:
+        permitted = compute_permitted_keys(request, catalog)
+    return permitted
+
+
+def get_cached_permitted_keys(request, catalog):
+    """
+    Return the cached permitted keys for the request's user, or None.
+    Never runs permission checks, but reads the shared cache if
+    COFFEE_ADMIN_SHARE_PERMISSIONS is enabled, so async code may only call
+    it directly when that setting is off.
+    """
+    key = _get_cache_key(request, catalog)
+    if key is None:
+        return None
+    permitted = permission_cache.get(key)
+    if permitted is None:
+        cache = get_shared_permission_cache()
+        if cache is not None:
+            try:
+                permitted = cache.get(make_key('permissions', *key))
+            except Exception:
+                return None
+            if permitted is not None:
+                permission_cache.set(key, permitted, get_setting('PERMISSION_CACHE_SIZE'))
+    return permitted
+
+
+def compute_permitted_keys(request, catalog):
+    """
+    Run the permission checks for every gated entry and cache the result.
+    """
+    # Taken before the checks run: if the user is invalidated meanwhile, the
+    # result is stored under the old fingerprint and never used again
+    key = _get_cache_key(request, catalog)
+    counts = get_setting('MODEL_COUNTS')
+    permitted = set()
+    for entry in catalog:
+        if entry.permission_key is not None:
+            if entry.has_permission(request):
+                permitted.add(entry.permission_key)
+        elif counts and entry.category == 'models':
+            # Model lists are always listed, but their row counts are only
+            # shown to users who may view the rows
+            view_key = get_view_key(entry.model)
+            if view_key not in permitted and entry.has_model_permission(request, 'view'):
+                permitted.add(view_key)
+    permitted = frozenset(permitted)
+    if key is not None:
+        permission_cache.set(key, permitted, get_setting('PERMISSION_CACHE_SIZE'))
+        cache = get_shared_permission_cache()
+        if cache is not None:
+            try:
+                cache.set(
+                    make_key('permissions', *key), permitted,
+                    get_setting('CATALOG_CACHE_TIMEOUT'),
+                )
+            except Exception:
+                # Other processes compute it themselves
+                pass
+    return permitted
+
+
+def _get_cache_key(request, catalog):
+    user = request.user
+    if not get_setting('PERMISSION_CACHE_SIZE') or user.pk is None:
+        return None
+    # View keys for row counts are only checked while counts are enabled
+    return (
+        catalog.version, user.pk, get_permission_fingerprint(user),
+        bool(get_setting('MODEL_COUNTS')),
+    )
+
+
+def invalidate_user(user_id):
+    permission_cache.invalidate_user(user_id)
+    bump_shared_generation(user_id)
+
+
+def invalidate_all():
+    permission_cache.clear()
+    bump_shared_generation()
+
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def _permissions_changed(sender, **kwargs):
+    invalidate_all()
+
+
+def _user_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        # user.groups / user.user_permissions changed
+        invalidate_user(instance.pk)
+    elif pk_set:
+        # group.user_set / permission.user_set changed
+        for user_id in pk_set:
+            invalidate_user(user_id)
+    else:
+        # Reverse clear() does not report which users were affected
+        invalidate_all()
+
+
+def _group_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_all()
+
+
+def connect_signals():
+    """
+    Connect the cache invalidation handlers. Called from ``AppConfig.ready()``.
+    """
+    user_model = get_user_model()
+    dispatch_uid = 'coffee_admin.permissions'
+
+    for signal in (post_save, post_delete):
+        signal.connect(_user_changed, sender=user_model, dispatch_uid=dispatch_uid)
+        for model in (Group, Permission):
+            signal.connect(_permissions_changed, sender=model, dispatch_uid=dispatch_uid)
+
+    for field_name in ('groups', 'user_permissions'):
+        try:
+            through = user_model._meta.get_field(field_name).remote_field.through
+        except Exception:
+            # Custom user models need not have group or permission relations
+            continue
+        m2m_changed.connect(_user_relation_changed, sender=through, dispatch_uid=dispatch_uid)
+
+    m2m_changed.connect(
+        _group_permissions_changed,
+        sender=Group.permissions.through,
+        dispatch_uid=dispatch_uid,
+    )
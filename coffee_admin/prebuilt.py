@@ -0,0 +1,122 @@
+"""
+Catalog snapshots prebuilt by ``manage.py coffee_build_index``.
+
+The command builds the catalog and URL table of every AdminSite and writes
+their snapshots to ``COFFEE_ADMIN_CATALOG_INDEX_PATH``, keyed by catalog
+fingerprint (see ``coffee_admin.catalog.get_catalog_fingerprint``). Worker
+processes read the file once at startup; the first catalog a worker needs is
+then restored from it instead of being built, as long as its fingerprint
+matches. The fingerprint only covers cheap inputs -- the registry, verbose
+names and where each site is mounted -- not the sites' URL patterns or every
+line of code; rerun the command on each deploy, or set
+``COFFEE_ADMIN_CATALOG_CACHE_VERSION`` to the release.
+
+The file is a short header followed by the snapshots encoded with
+``marshal``, which reads plain data much faster than pickle and cannot
+create arbitrary objects.
+"""
+import marshal
+import os
+import tempfile
+import threading
+
+from django.core.signals import setting_changed
+
+from .conf import get_setting
+
+# Start of every index file
+MAGIC = b'COFFEEIX'
+# Bumped whenever the layout of the file changes
+INDEX_FORMAT = 1
+# marshal format version the file is written with
+MARSHAL_VERSION = 4
+
+_snapshots = None
+_snapshots_lock = threading.Lock()
+
+
+def write_index(path, snapshots):
+    """
+    Write ``snapshots``, a dict of catalog snapshots by fingerprint, to
+    ``path``. The file is replaced atomically, so running workers never read
+    a partial file.
+    """
+    data = MAGIC + marshal.dumps({
+        'format': INDEX_FORMAT,
+        'catalogs': snapshots,
+    }, MARSHAL_VERSION)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.coffee-index-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_index(path):
+    """
+    Return the snapshots stored in the index file at ``path``, or an empty
+    dict if the file is missing, unreadable or written in another format.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return {}
+    if not data.startswith(MAGIC):
+        return {}
+    try:
+        index = marshal.loads(data[len(MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return {}
+    if not isinstance(index, dict) or index.get('format') != INDEX_FORMAT:
+        return {}
+    catalogs = index.get('catalogs')
+    return catalogs if isinstance(catalogs, dict) else {}
+
+
+def load_index():
+    """
+    Read COFFEE_ADMIN_CATALOG_INDEX_PATH, once per process. Called from
+    ``CoffeeAdminConfig.ready()``, before the admin registries are filled;
+    snapshots are only matched against them when a catalog is first needed.
+    """
+    global _snapshots
+    if _snapshots is None:
+        with _snapshots_lock:
+            if _snapshots is None:
+                path = get_setting('CATALOG_INDEX_PATH')
+                _snapshots = read_index(path) if path else {}
+    return _snapshots
+
+
+def get_prebuilt_snapshot(fingerprint):
+    """
+    Return the prebuilt catalog snapshot with ``fingerprint``, or None.
+    """
+    return load_index().get(fingerprint)
+
+
+def reset_index():
+    """
+    Forget the loaded index file; it is read again on next use.
+    """
+    global _snapshots
+    with _snapshots_lock:
+        _snapshots = None
+
+
+def _setting_changed(setting, **kwargs):
+    if setting == 'COFFEE_ADMIN_CATALOG_INDEX_PATH':
+        reset_index()
+
+
+def connect_signals():
+    """
+    Read the index file again when COFFEE_ADMIN_CATALOG_INDEX_PATH is changed,
+    e.g. by ``override_settings`` in tests.
+    """
+    setting_changed.connect(_setting_changed, dispatch_uid='coffee_admin.prebuilt')
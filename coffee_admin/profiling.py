@@ -0,0 +1,182 @@
+"""
+On-demand profiling of search requests.
+
+With ``COFFEE_ADMIN_PROFILING = True``, a superuser can add ``profile=1`` to
+a SearchAdminUrlsView request. The request is then run under cProfile with
+its SQL queries recorded, and the response is replaced by a JSON report::
+
+    {
+        "status": 200,
+        "response": {...the normal response body...},
+        "profile": {
+            "total": 0.0123,
+            "functions": [{"function": "catalog.py:426(get_catalog)",
+                           "calls": 1, "own_time": 0.0001, "cumulative_time": 0.008}, ...],
+            "queries": [{"sql": "SELECT ...", "time": 0.0004}, ...],
+            "query_count": 3,
+            "file": "search-20250101-120000-1-3f2a9c1b.prof"
+        }
+    }
+
+With ``COFFEE_ADMIN_PROFILE_DIR`` set, the full profile is also written to
+that directory for ``python -m pstats`` or snakeviz; ``file`` names it.
+
+Queries are recorded for the request thread only: record queries run by
+the record search thread pool are not listed (set
+``COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0`` while profiling to include them).
+Before Python 3.12 the same goes for the functions. From Python 3.12
+cProfile uses ``sys.monitoring``, which covers every thread of the process,
+so the functions may include work done for other requests meanwhile.
+
+Only one request is profiled at a time. A request that waited more than
+``LOCK_WAIT`` seconds for another one, or that finds another profiling tool
+(a debugger, coverage) active, gets its normal response instead.
+
+The view imports this module only for profiled requests, so profiling costs
+nothing while it is disabled.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.db import connections
+from django.utils.cache import add_never_cache_headers
+
+from .conf import get_setting
+from .serializers import json_response
+
+# Seconds a profiled request waits for the one being profiled
+LOCK_WAIT = 10.0
+
+_lock = threading.Lock()
+
+
+class QueryRecorder:
+    """
+    Records the SQL and duration of queries run by the current thread.
+    """
+    __slots__ = ('queries',)
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({'sql': sql, 'time': time.perf_counter() - started})
+
+
+def profile_response(request, get_response):
+    """
+    Call ``get_response()`` under cProfile, recording its queries, and
+    return a JSON report of the profile wrapping the response it returned.
+    Returns the response itself if the request could not be profiled.
+    """
+    profiler = None
+    if _lock.acquire(timeout=LOCK_WAIT):
+        profiler = start_profiler()
+        if profiler is None:
+            _lock.release()
+    if profiler is None:
+        # Another request is still being profiled, or another tool is active
+        return get_response()
+
+    recorder = QueryRecorder()
+    started = time.perf_counter()
+    try:
+        with ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(recorder))
+            response = get_response()
+            # Streamed responses do their work while being consumed
+            content = b''.join(response) if response.streaming else response.content
+    finally:
+        profiler.disable()
+        _lock.release()
+    total = time.perf_counter() - started
+
+    report = {
+        'total': total,
+        'functions': get_hot_functions(profiler, get_setting('PROFILE_FUNCTIONS')),
+        'queries': recorder.queries,
+        'query_count': len(recorder.queries),
+        'file': None,
+    }
+    directory = get_setting('PROFILE_DIR')
+    if directory:
+        try:
+            report['file'] = save_profile(profiler, directory, request)
+        except OSError as e:
+            report['file_error'] = str(e)
+
+    profiled = json_response({
+        'status': response.status_code,
+        'response': decode_content(response, content),
+        'profile': report,
+    })
+    add_never_cache_headers(profiled)
+    return profiled
+
+
+def start_profiler():
+    """
+    Return an enabled cProfile profiler, or None if another profiling tool
+    is active.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+: "Another profiling tool is already active"
+        return None
+    return profiler
+
+
+def get_hot_functions(profiler, limit):
+    """
+    Return the ``limit`` functions with the highest cumulative time.
+    """
+    stats = pstats.Stats(profiler).stats
+    functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            'function': pstats.func_std_string((os.path.basename(filename), line, name)),
+            'calls': calls,
+            'own_time': own_time,
+            'cumulative_time': cumulative_time,
+        }
+        for (filename, line, name), (_, calls, own_time, cumulative_time, _) in
+        functions[:limit]
+    ]
+
+
+def save_profile(profiler, directory, request):
+    """
+    Write the full profile to ``directory`` and return its file name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = 'search-{}-{}-{}.prof'.format(
+        time.strftime('%Y%m%d-%H%M%S'), request.user.pk, uuid.uuid4().hex[:8],
+    )
+    profiler.dump_stats(os.path.join(directory, name))
+    return name
+
+
+def decode_content(response, content):
+    """
+    Return the body of the profiled response: parsed JSON, text for streams,
+    or None if it is empty.
+    """
+    if not content:
+        return None
+    text = content.decode(response.charset)
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(text)
+    return text
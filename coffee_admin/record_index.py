@@ -0,0 +1,288 @@
+"""
+SQLite FTS5 sidecar index of admin records.
+
+Running ``icontains`` lookups over ``search_fields`` on large tables for every
+keystroke is expensive. Models whose ModelAdmin sets
+``coffee_record_index = True`` can instead be indexed in a local SQLite FTS5
+database at ``COFFEE_ADMIN_RECORD_INDEX_PATH``; record search then queries
+that file, and the primary database only to check the hits against
+``ModelAdmin.get_queryset()`` by primary key.
+
+The index is kept up to date from ``post_save``/``post_delete``: rows are
+read and indexed once the transaction commits. Failing to update it is
+logged and never fails the write itself. It can be (re)built in chunks with::
+
+    python manage.py coffee_index_records
+"""
+import logging
+import sqlite3
+import threading
+
+from django.contrib.admin.sites import all_sites
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .conf import get_setting
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS record_keys (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    pk TEXT NOT NULL,
+    UNIQUE (model, pk)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS records USING fts5(
+    title, content, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Characters ModelAdmin.search_fields may use as lookup prefixes
+SEARCH_FIELD_PREFIXES = '^=@'
+
+logger = logging.getLogger(__name__)
+
+
+class RecordIndex:
+    """
+    A thread-safe handle on the FTS5 index file at ``path``.
+    Each thread gets its own SQLite connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.executescript(SCHEMA)
+            except sqlite3.OperationalError as e:
+                connection.close()
+                raise ImproperlyConfigured(
+                    f'COFFEE_ADMIN_RECORD_INDEX_PATH requires SQLite with FTS5: {e}'
+                )
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def index(self, rows):
+        """
+        Add or replace ``(model_label, pk, title, content)`` rows in one
+        transaction.
+        """
+        with self.connection as connection:
+            for model_label, pk, title, content in rows:
+                connection.execute(
+                    'INSERT OR IGNORE INTO record_keys (model, pk) VALUES (?, ?)',
+                    (model_label, str(pk)),
+                )
+                (rowid,) = connection.execute(
+                    'SELECT id FROM record_keys WHERE model = ? AND pk = ?',
+                    (model_label, str(pk)),
+                ).fetchone()
+                connection.execute('DELETE FROM records WHERE rowid = ?', (rowid,))
+                connection.execute(
+                    'INSERT INTO records (rowid, title, content) VALUES (?, ?, ?)',
+                    (rowid, title, content),
+                )
+
+    def remove(self, model_label, pk):
+        with self.connection as connection:
+            row = connection.execute(
+                'SELECT id FROM record_keys WHERE model = ? AND pk = ?',
+                (model_label, str(pk)),
+            ).fetchone()
+            if row is not None:
+                connection.execute('DELETE FROM records WHERE rowid = ?', row)
+                connection.execute('DELETE FROM record_keys WHERE id = ?', row)
+
+    def clear(self, model_label=None):
+        with self.connection as connection:
+            if model_label is None:
+                connection.execute('DELETE FROM records')
+                connection.execute('DELETE FROM record_keys')
+            else:
+                connection.execute(
+                    'DELETE FROM records WHERE rowid IN '
+                    '(SELECT id FROM record_keys WHERE model = ?)',
+                    (model_label,),
+                )
+                connection.execute('DELETE FROM record_keys WHERE model = ?', (model_label,))
+
+    def search(self, query, model_labels, limit):
+        """
+        Return up to ``limit`` ``(model_label, pk, title)`` matches for
+        ``query`` among ``model_labels``, best first. Every query word is
+        matched as a prefix.
+        """
+        match = build_match_expression(query)
+        if not match or not model_labels:
+            return []
+        placeholders = ', '.join('?' * len(model_labels))
+        return self.connection.execute(
+            'SELECT k.model, k.pk, r.title FROM records r '
+            'JOIN record_keys k ON k.id = r.rowid '
+            f'WHERE records MATCH ? AND k.model IN ({placeholders}) '
+            'ORDER BY r.rank LIMIT ?',
+            (match, *model_labels, limit),
+        ).fetchall()
+
+
+def build_match_expression(query):
+    """
+    Turn free text into an FTS5 expression matching every word as a prefix.
+    """
+    words = [word.replace('"', '""') for word in query.split()]
+    return ' '.join(f'"{word}"*' for word in words if word.strip('"'))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_record_index():
+    """
+    Return the configured RecordIndex, or None if
+    ``COFFEE_ADMIN_RECORD_INDEX_PATH`` is not set.
+    """
+    global _index
+    path = get_setting('RECORD_INDEX_PATH')
+    if not path:
+        return None
+    if _index is None or _index.path != str(path):
+        with _index_lock:
+            if _index is None or _index.path != str(path):
+                _index = RecordIndex(str(path))
+    return _index
+
+
+def is_indexed(model_admin):
+    """
+    Return True if ``model_admin`` opted in to the record index.
+    """
+    return bool(getattr(model_admin, 'coffee_record_index', False))
+
+
+def get_indexed_admins(model):
+    """
+    Return the opted-in ModelAdmins registered for ``model`` on any site.
+    """
+    admins = []
+    for site in all_sites:
+        model_admin = site._registry.get(model)
+        if model_admin is not None and is_indexed(model_admin):
+            admins.append(model_admin)
+    return admins
+
+
+def get_indexed_models():
+    """
+    Return ``{model: model_admin}`` for every opted-in model on any site.
+    """
+    models = {}
+    for site in all_sites:
+        for model, model_admin in site._registry.items():
+            if is_indexed(model_admin):
+                models.setdefault(model, model_admin)
+    return models
+
+
+def build_row(model_admin, obj):
+    """
+    Return the ``(model_label, pk, title, content)`` index row of ``obj``,
+    with ``content`` taken from the ModelAdmin's ``search_fields``.
+    """
+    values = [str(obj)]
+    for field in model_admin.search_fields:
+        value = resolve_search_field(obj, field.lstrip(SEARCH_FIELD_PREFIXES))
+        if value not in (None, ''):
+            values.append(str(value))
+    return (obj._meta.label_lower, obj.pk, str(obj), ' '.join(values))
+
+
+def resolve_search_field(obj, field_path):
+    """
+    Follow a ``search_fields`` path such as ``customer__email`` on ``obj``.
+    Multi-valued relations are not followed.
+    """
+    value = obj
+    for name in field_path.split('__'):
+        if value is None:
+            return None
+        try:
+            value = getattr(value, name)
+        except Exception:
+            # Lookups such as __iexact or unsupported paths
+            return None
+        if hasattr(value, 'all') and hasattr(value, 'model'):
+            return None
+    return value
+
+
+def update_index(method, *args):
+    """
+    Call ``method`` of the record index with ``args``, logging instead of
+    raising any error.
+    """
+    try:
+        getattr(get_record_index(), method)(*args)
+    except Exception:
+        # Runs after the host app's write committed; a broken or locked index
+        # must not fail it. coffee_index_records rebuilds the missed entries.
+        logger.exception('Could not update the Coffee Admin record index')
+
+
+def reindex_instance(model, pk, using):
+    """
+    Index the committed state of the ``model`` row with primary key ``pk``,
+    logging instead of raising any error.
+    """
+    try:
+        admins = get_indexed_admins(model)
+        obj = model._default_manager.using(using).filter(pk=pk).first()
+        row = build_row(admins[0], obj) if admins and obj is not None else None
+    except Exception:
+        # e.g. a __str__ or search_fields path that raises for this row
+        logger.exception('Could not update the Coffee Admin record index')
+        return
+    if row is not None:
+        update_index('index', [row])
+
+
+def _instance_saved(sender, instance, using, raw=False, **kwargs):
+    if raw:
+        return
+    if get_indexed_admins(sender):
+        # The row is built after commit, so the save neither runs the
+        # search_fields queries nor fails when building it does
+        pk = instance.pk
+        transaction.on_commit(lambda: reindex_instance(sender, pk, using), using=using)
+
+
+def _instance_deleted(sender, instance, using, **kwargs):
+    if get_indexed_admins(sender):
+        model_label, pk = instance._meta.label_lower, instance.pk
+        transaction.on_commit(lambda: update_index('remove', model_label, pk), using=using)
+
+
+def connect_signals():
+    """
+    Keep the index in sync with saves and deletes when it is configured.
+    Connected for all senders because admin registration happens after
+    ``AppConfig.ready()``; unindexed models return after a dict lookup.
+    """
+    if not get_setting('RECORD_INDEX_PATH'):
+        return
+    dispatch_uid = 'coffee_admin.record_index'
+    post_save.connect(_instance_saved, dispatch_uid=dispatch_uid)
+    post_delete.connect(_instance_deleted, dispatch_uid=dispatch_uid)
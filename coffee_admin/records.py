@@ -0,0 +1,268 @@
+"""
+Object-level record search for the launcher.
+
+``RecordSearchProvider`` runs each searchable ModelAdmin's own
+``get_search_results()`` for the query, so records are found exactly as the
+admin changelist search would find them. The per-model queries run
+concurrently on a bounded, process-wide thread pool, each limited to a few
+rows, under a global deadline: models that miss it are left out and the
+result is marked partial instead of delaying the response.
+
+Models whose ModelAdmin opted in to the FTS5 sidecar index (see
+``coffee_admin.record_index``) are searched in that index instead; the hits
+are then checked against ``ModelAdmin.get_queryset()`` by primary key.
+
+Record search is disabled unless ``COFFEE_ADMIN_RECORD_SEARCH`` is True.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from django.db import connections
+
+from .conf import get_setting
+from .permissions import get_permission_fingerprint, permission_cache
+from .record_index import get_record_index, is_indexed
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the shared record search thread pool, or None if
+    ``COFFEE_ADMIN_RECORD_SEARCH_WORKERS`` is 0 (run queries inline).
+    """
+    global _executor
+    workers = get_setting('RECORD_SEARCH_WORKERS')
+    if not workers:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='coffee-admin-records',
+                )
+    return _executor
+
+
+class RecordSearchProvider:
+    """
+    Search the records of every model in ``catalog`` whose ModelAdmin
+    defines ``search_fields`` and which the user may view.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def get_searchable_entries(self, request):
+        """
+        Return the catalog list entries whose records the user may search.
+        View permissions are cached alongside the catalog permissions.
+        """
+        user = request.user
+        cache_key = None
+        if get_setting('PERMISSION_CACHE_SIZE') and user.pk is not None:
+            cache_key = (
+                f'{self.catalog.version}:records', user.pk, get_permission_fingerprint(user),
+            )
+            labels = permission_cache.get(cache_key)
+            if labels is not None:
+                return [
+                    entry for entry in self.list_entries()
+                    if entry.model._meta.label_lower in labels
+                ]
+
+        entries = []
+        for entry in self.list_entries():
+            try:
+                model_admin = entry.model_admin
+                if model_admin.get_search_fields(request) and \
+                        model_admin.has_view_or_change_permission(request):
+                    entries.append(entry)
+            except Exception:
+                continue
+
+        if cache_key is not None:
+            permission_cache.set(
+                cache_key,
+                frozenset(entry.model._meta.label_lower for entry in entries),
+                get_setting('PERMISSION_CACHE_SIZE'),
+            )
+        return entries
+
+    def list_entries(self):
+        return [entry for entry in self.catalog.entries if entry.category == 'models']
+
+    def search(self, request, query, limit):
+        """
+        Return ``(results, partial)`` with up to ``limit`` record results.
+        ``partial`` is True if any model's query missed the deadline.
+        """
+        batches = self.iter_search(request, query)
+        results = [result for batch in batches for result in batch]
+        results.sort(key=lambda result: rank_record(result, query))
+        return results[:limit], batches.partial
+
+    def iter_search(self, request, query):
+        """
+        Return an iterator yielding each model's record results as soon as
+        its query completes. Once exhausted, its ``partial`` attribute tells
+        whether any model missed the deadline.
+        """
+        return RecordBatches(
+            self.get_searchable_entries(request), request, query, self.catalog.urls,
+        )
+
+
+class RecordBatches:
+    """
+    Iterator over per-model record result lists, see
+    ``RecordSearchProvider.iter_search()``.
+    """
+
+    def __init__(self, entries, request, query, urls):
+        self.entries = entries
+        self.request = request
+        self.query = query
+        self.urls = urls
+        self.partial = False
+        self._iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = self._run()
+        return next(self._iterator)
+
+    def _run(self):
+        request, query, urls = self.request, self.query, self.urls
+        per_model_limit = get_setting('RECORD_SEARCH_LIMIT')
+        deadline = time.monotonic() + get_setting('RECORD_SEARCH_TIMEOUT')
+        entries = self.entries
+
+        # Models in the FTS sidecar index are answered from it, first
+        record_index = get_record_index()
+        if record_index is not None:
+            indexed = {
+                entry.model._meta.label_lower: entry
+                for entry in entries if is_indexed(entry.model_admin)
+            }
+            if indexed:
+                entries = [entry for entry in entries if not is_indexed(entry.model_admin)]
+                matches = record_index.search(
+                    query, list(indexed), per_model_limit * len(indexed),
+                )
+                visible = get_visible_pks(request, indexed, matches)
+                yield [
+                    record_result(indexed[model_label], pk, title, urls)
+                    for model_label, pk, title in matches
+                    if (model_label, pk) in visible
+                ]
+
+        executor = get_executor()
+        if executor is None:
+            for entry in entries:
+                if time.monotonic() >= deadline:
+                    self.partial = True
+                    return
+                objects = search_model(request, entry, query, per_model_limit)
+                yield [record_result(entry, obj.pk, str(obj), urls) for obj in objects]
+            return
+
+        futures = {
+            executor.submit(
+                run_in_worker, search_model, request, entry, query, per_model_limit,
+            ): entry
+            for entry in entries
+        }
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                entry = futures[future]
+                yield [record_result(entry, obj.pk, str(obj), urls) for obj in future.result()]
+        except FuturesTimeoutError:
+            self.partial = True
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def get_visible_pks(request, entries, matches):
+    """
+    Return the ``(model_label, pk)`` pairs of the index ``matches`` that the
+    ModelAdmin's ``get_queryset(request)`` includes, so that row-level
+    scoping (tenants, owners) applies to indexed models too. Costs one
+    primary key lookup per model with matches.
+    """
+    pks_by_label = {}
+    for model_label, pk, title in matches:
+        pks_by_label.setdefault(model_label, []).append(pk)
+
+    visible = set()
+    for model_label, pks in pks_by_label.items():
+        entry = entries[model_label]
+        try:
+            queryset = entry.model_admin.get_queryset(request)
+            found = queryset.filter(pk__in=pks).values_list('pk', flat=True)
+            visible.update((model_label, str(pk)) for pk in found)
+        except Exception:
+            # A failing model should not break the whole search
+            continue
+    return visible
+
+
+def search_model(request, entry, query, limit):
+    """
+    Return up to ``limit`` objects of ``entry.model`` matching ``query``
+    through its ModelAdmin's ``get_search_results()``.
+    """
+    model_admin = entry.model_admin
+    try:
+        queryset = model_admin.get_queryset(request)
+        queryset, may_have_duplicates = model_admin.get_search_results(request, queryset, query)
+        if may_have_duplicates:
+            queryset = queryset.distinct()
+        return list(queryset[:limit])
+    except Exception:
+        # A failing model should not break the whole search
+        return []
+
+
+def run_in_worker(func, *args):
+    """
+    Run ``func`` on a pool thread and release the thread's database
+    connections afterwards so they are not leaked across tasks.
+    """
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def record_result(entry, pk, title, urls):
+    opts = entry.model._meta
+    return {
+        'title': title,
+        'subtitle': f'{str(opts.verbose_name).title()} · {entry.app_label}',
+        'url': urls.change(entry.model, pk),
+        'icon': entry.icon,
+        'category': 'records',
+        'app_label': entry.app_label,
+    }
+
+
+def rank_record(result, query):
+    """
+    Sort key putting exact, then prefix, then other title matches first.
+    """
+    title = result['title'].lower()
+    if title == query:
+        return 0
+    if title.startswith(query):
+        return 1
+    if query in title:
+        return 2
+    return 3
@@ -0,0 +1,216 @@
+"""
+Ranked fuzzy search over launcher entries.
+
+``SearchIndex`` keeps an inverted index of word tokens (kept sorted for prefix
+lookups) and padded character trigrams. A query only scores the entries that
+share a token prefix or enough trigrams with it, so the cost depends on the
+number of plausible matches rather than on the size of the catalog.
+
+Scoring, per query token and best matching entry token:
+    exact token > acronym > prefix > substring > fuzzy (subsequence/trigram)
+Tokens from an entry's title weigh more than tokens from its subtitle or app
+label. All query tokens must match for an entry to be returned.
+"""
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+TITLE_WEIGHT = 1.0
+OTHER_WEIGHT = 0.5
+
+EXACT_SCORE = 100
+ACRONYM_SCORE = 90
+PREFIX_SCORE = 80
+SUBSTRING_SCORE = 50
+SUBSEQUENCE_SCORE = 30
+TRIGRAM_SCORE = 20
+LEADING_WORD_BONUS = 10
+TITLE_PREFIX_BONUS = 50
+
+# Fraction of a query token's trigrams an entry must share to be considered
+MIN_TRIGRAM_OVERLAP = 0.3
+# Minimum trigram similarity for a typo-tolerant match
+MIN_TRIGRAM_SIMILARITY = 0.45
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_subsequence(needle, haystack):
+    it = iter(haystack)
+    return all(char in it for char in needle)
+
+
+@lru_cache(maxsize=4096)
+def analyze(title, subtitle, app_label):
+    """
+    Return ``(lowercase title, tokens, acronym)`` for an entry's texts.
+    ``tokens`` is a tuple of ``(token, weight, is_leading_title_word)``.
+
+    Cached, so an entry shown on several AdminSites is tokenized once and
+    every site's index shares the result.
+    """
+    title_tokens = tokenize(title)
+    other_tokens = tokenize(f'{subtitle} {app_label}')
+    tokens = tuple(
+        (token, TITLE_WEIGHT, i == 0) for i, token in enumerate(title_tokens)
+    ) + tuple(
+        (token, OTHER_WEIGHT, False) for token in other_tokens if token not in title_tokens
+    )
+    return title.lower(), tokens, ''.join(token[0] for token in title_tokens)
+
+
+class IndexedEntry:
+    """
+    Token data for one entry, see ``analyze()``.
+    """
+    __slots__ = ('entry', 'position', 'title', 'tokens', 'acronym')
+
+    def __init__(self, entry, position):
+        self.entry = entry
+        self.position = position
+        self.title, self.tokens, self.acronym = analyze(
+            entry.title, entry.subtitle, entry.app_label,
+        )
+
+
+class SearchIndex:
+    """
+    Inverted token/trigram index over a sequence of catalog entries.
+    """
+
+    def __init__(self, entries):
+        self.entries = [IndexedEntry(entry, i) for i, entry in enumerate(entries)]
+        postings = defaultdict(set)
+        trigram_postings = defaultdict(set)
+
+        for indexed in self.entries:
+            for token, _weight, _leading in indexed.tokens:
+                postings[token].add(indexed.position)
+                for gram in trigrams(token):
+                    trigram_postings[gram].add(indexed.position)
+            if len(indexed.acronym) > 1:
+                postings[indexed.acronym].add(indexed.position)
+
+        self.vocabulary = sorted(postings)
+        self.postings = dict(postings)
+        self.trigram_postings = dict(trigram_postings)
+
+    def candidates(self, query_token):
+        """
+        Return the positions of entries that may match ``query_token``.
+        """
+        found = set()
+
+        # Every vocabulary token starting with the query token
+        vocabulary = self.vocabulary
+        for index in range(bisect_left(vocabulary, query_token), len(vocabulary)):
+            token = vocabulary[index]
+            if not token.startswith(query_token):
+                break
+            found.update(self.postings[token])
+
+        # Entries sharing enough trigrams (substring and fuzzy matches)
+        grams = trigrams(query_token)
+        needed = max(1, int(len(grams) * MIN_TRIGRAM_OVERLAP + 0.5))
+        counts = defaultdict(int)
+        for gram in grams:
+            for position in self.trigram_postings.get(gram, ()):
+                counts[position] += 1
+        found.update(position for position, count in counts.items() if count >= needed)
+
+        return found
+
+    def score_token(self, query_token, indexed):
+        best = 0
+        if len(query_token) > 1 and indexed.acronym.startswith(query_token):
+            best = ACRONYM_SCORE if indexed.acronym == query_token else ACRONYM_SCORE - 20
+
+        query_grams = None
+        for token, weight, leading in indexed.tokens:
+            if token == query_token:
+                score = EXACT_SCORE
+            elif token.startswith(query_token):
+                score = PREFIX_SCORE
+            elif query_token in token:
+                score = SUBSTRING_SCORE
+            elif token[0] == query_token[0] and is_subsequence(query_token, token):
+                score = SUBSEQUENCE_SCORE * len(query_token) / len(token)
+            else:
+                if query_grams is None:
+                    query_grams = trigrams(query_token)
+                token_grams = trigrams(token)
+                similarity = len(query_grams & token_grams) / len(query_grams | token_grams)
+                if similarity < MIN_TRIGRAM_SIMILARITY:
+                    continue
+                score = TRIGRAM_SCORE * similarity
+            if leading:
+                score += LEADING_WORD_BONUS
+            score *= weight
+            if score > best:
+                best = score
+        return best
+
+    def score(self, query, query_tokens, indexed):
+        """
+        Return the score of ``indexed`` for the query, or 0 if any token misses.
+        """
+        total = 0
+        for query_token in query_tokens:
+            score = self.score_token(query_token, indexed)
+            if not score:
+                return 0
+            total += score
+        if indexed.title.startswith(query):
+            total += TITLE_PREFIX_BONUS
+        return total
+
+    def search(self, query, limit, predicate=None, offset=0):
+        """
+        Return up to ``limit`` entries ranked by relevance for ``query``,
+        skipping the ``offset`` best ones.
+
+        ``predicate`` is called lazily, best match first, so expensive checks
+        such as permissions only run for entries that could make the cut.
+        """
+        query = query.lower().strip()
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        positions = None
+        for query_token in query_tokens:
+            found = self.candidates(query_token)
+            positions = found if positions is None else positions & found
+            if not positions:
+                return []
+
+        heap = []
+        for position in positions:
+            indexed = self.entries[position]
+            score = self.score(query, query_tokens, indexed)
+            if score:
+                heap.append((-score, position))
+        heapq.heapify(heap)
+
+        results = []
+        skipped = 0
+        while heap and len(results) < limit:
+            _score, position = heapq.heappop(heap)
+            entry = self.entries[position].entry
+            if predicate is None or predicate(entry):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                results.append(entry)
+        return results
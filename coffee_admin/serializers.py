@@ -0,0 +1,162 @@
+"""
+Serialization of launcher responses.
+
+Responses are encoded by a pluggable ``dumps`` function
+(``COFFEE_ADMIN_JSON_ENCODER``). By default orjson is used when it is
+installed, and the standard library encoder otherwise.
+
+Result lists are sent either verbose, one object per result, or, when the
+client asks for ``format=compact``, in a columnar form that does not repeat
+keys and stores the few distinct icons, categories and app labels once::
+
+    {
+        "fields": ["title", "subtitle", "url", "icon", "category", "app_label"],
+        "tables": {"icon": ["👤", ...], "category": ["models", ...], ...},
+        "rows": [["Users", "Manage users", "/admin/auth/user/", 0, 0, 0], ...]
+    }
+
+Columns listed in ``tables`` hold an index into their table.
+Optional columns such as ``count`` are appended only when a result has them.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from .conf import get_setting
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Response formats a client can ask for with ``?format=``
+RESPONSE_FORMATS = ('verbose', 'compact')
+
+# Columns of a compact result list, in row order
+COMPACT_FIELDS = ('title', 'subtitle', 'url', 'icon', 'category', 'app_label')
+# Columns with few distinct values, sent as indexes into a table
+COMPACT_TABLES = ('icon', 'category', 'app_label')
+# Columns added after COMPACT_FIELDS only if some result has them; rows
+# without the value hold null
+COMPACT_OPTIONAL_FIELDS = ('count',)
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def json_dumps(data):
+    """
+    Encode ``data`` with the standard library, handling lazy translations,
+    dates and decimals like JsonResponse.
+    """
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def orjson_dumps(data):
+    """
+    Encode ``data`` with orjson, falling back to DjangoJSONEncoder for the
+    types orjson does not know, such as lazy translations.
+    """
+    return orjson.dumps(data, default=_django_encoder.default)
+
+
+def get_dumps():
+    """
+    Return the configured ``dumps`` function: COFFEE_ADMIN_JSON_ENCODER (a
+    callable or a dotted path to one), else orjson if installed, else the
+    standard library.
+    """
+    dumps = get_setting('JSON_ENCODER')
+    if dumps is None:
+        return orjson_dumps if orjson is not None else json_dumps
+    if isinstance(dumps, str):
+        dumps = import_string(dumps)
+    return dumps
+
+
+def dumps(data):
+    """
+    Encode ``data`` as a JSON string with the configured encoder.
+    """
+    encoded = get_dumps()(data)
+    if isinstance(encoded, bytes):
+        return encoded.decode()
+    return encoded
+
+
+def encode(data):
+    """
+    Encode ``data`` with the configured encoder, as str or bytes.
+    """
+    return get_dumps()(data)
+
+
+def json_response(data, status=200):
+    """
+    Return an application/json HttpResponse for ``data``, encoded with the
+    configured encoder.
+    """
+    return encoded_response(encode(data), status=status)
+
+
+def encoded_response(encoded, status=200):
+    """
+    Return an application/json HttpResponse with an already encoded body.
+    """
+    return HttpResponse(encoded, status=status, content_type='application/json')
+
+
+def compact_results(results):
+    """
+    Return ``results`` (a list of result dicts) in the compact columnar form.
+    """
+    tables = {field: [] for field in COMPACT_TABLES}
+    codes = {field: {} for field in COMPACT_TABLES}
+    fields = COMPACT_FIELDS + tuple(
+        field for field in COMPACT_OPTIONAL_FIELDS
+        if any(field in result for result in results)
+    )
+    rows = []
+    for result in results:
+        row = []
+        for field in fields:
+            value = result.get(field)
+            if field in codes:
+                field_codes = codes[field]
+                code = field_codes.get(value)
+                if code is None:
+                    code = field_codes[value] = len(tables[field])
+                    tables[field].append(value)
+                value = code
+            row.append(value)
+        rows.append(row)
+    return {'fields': list(fields), 'tables': tables, 'rows': rows}
+
+
+def expand_results(compact):
+    """
+    Return the result dicts encoded in a compact result list.
+    """
+    fields = compact['fields']
+    tables = compact['tables']
+    results = []
+    for row in compact['rows']:
+        result = {}
+        for field, value in zip(fields, row):
+            if field in tables:
+                value = tables[field][value]
+            elif value is None and field in COMPACT_OPTIONAL_FIELDS:
+                continue
+            result[field] = value
+        results.append(result)
+    return results
+
+
+def format_results(results, response_format):
+    """
+    Return ``results`` as sent in the ``response_format`` format.
+    """
+    if response_format == 'compact':
+        return compact_results(results)
+    return results
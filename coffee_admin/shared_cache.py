@@ -0,0 +1,102 @@
+"""
+Launcher data shared between worker processes through Django's cache framework.
+
+Each worker process keeps its own catalogs (and permission sets) in memory.
+With ``COFFEE_ADMIN_CATALOG_CACHE`` set to a cache alias, a process that
+has no catalog for an AdminSite first looks for a snapshot stored by
+another process, so a freshly started worker does not walk the registry
+and reverse every admin URL itself.
+
+Keys include a fingerprint of whatever the stored value was built from, so
+a deploy that changes the registry, URLconf or COFFEE_ADMIN_CATALOG_CACHE_VERSION
+never reads an outdated value.
+
+Stampedes are avoided with a lock taken through ``cache.add()``:
+
+* On a cold miss the process holding the lock builds the value; the others
+  poll for it for up to ``LOCK_WAIT`` seconds before building it themselves
+  without storing it.
+* Values are stored for twice their timeout. Once a value is older than its
+  timeout, the first process to take the lock rebuilds it while everyone else
+  keeps using the previous copy.
+
+A cache backend that raises is treated as a miss, so a broken cache slows the
+launcher down but does not break it.
+"""
+import time
+
+from django.core.cache import caches
+
+from .conf import get_setting
+
+# Prefix of every key written by coffee_admin
+KEY_PREFIX = 'coffee_admin'
+# Seconds a rebuild lock is held at most
+LOCK_TIMEOUT = 30
+# Seconds a process waits for another process to store a value
+LOCK_WAIT = 2.0
+# Seconds between polls while waiting
+POLL_INTERVAL = 0.05
+
+
+def get_shared_cache():
+    """
+    Return the COFFEE_ADMIN_CATALOG_CACHE cache, or None if it is not set.
+    """
+    alias = get_setting('CATALOG_CACHE')
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def make_key(*parts):
+    return ':'.join((KEY_PREFIX,) + tuple(str(part) for part in parts))
+
+
+def get_or_build(cache, key, build, timeout):
+    """
+    Return the value stored under ``key``, calling ``build()`` to create or
+    refresh it. Only the process holding the key's lock stores a new value.
+    """
+    lock_key = f'{key}:lock'
+    try:
+        stored = cache.get(key)
+        if stored is not None and time.time() < stored[0]:
+            return stored[1]
+        # Missing or due for a refresh: only the lock holder rebuilds it
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    except Exception:
+        # An unavailable cache behaves like an empty one
+        return build()
+
+    if locked:
+        try:
+            value = build()
+            _quietly(cache.set, key, (time.time() + timeout, value), timeout * 2)
+        finally:
+            _quietly(cache.delete, lock_key)
+        return value
+
+    if stored is not None:
+        # Another process is refreshing it; the previous copy will do
+        return stored[1]
+
+    # Another process is building the value; give it a moment
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            stored = cache.get(key)
+        except Exception:
+            break
+        if stored is not None:
+            return stored[1]
+    return build()
+
+
+def _quietly(method, *args):
+    try:
+        method(*args)
+    except Exception:
+        # The value was built; failing to share it only costs other processes
+        pass
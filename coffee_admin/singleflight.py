@@ -0,0 +1,71 @@
+"""
+Coalescing of identical concurrent computations within a process.
+
+When several threads ask for the same search response at once (staff opening
+the launcher right after a deploy, or a client retrying aggressively), only
+the first computes it; the others wait for its result instead of repeating
+the work. Nothing is kept once the computation has finished.
+"""
+import threading
+
+# Seconds a waiting thread gives the computation before doing it itself
+WAIT_TIMEOUT = 5.0
+
+
+class Call:
+    """
+    One computation in progress, and the threads waiting for it.
+    """
+    __slots__ = ('done', 'result', 'failed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time; concurrent callers with
+    the same key share its result.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """
+        Return ``compute()``, or the result of the identical computation
+        another thread is already running for ``key``. If that computation
+        fails or takes longer than ``WAIT_TIMEOUT``, waiting threads compute
+        their own result, so its errors are raised only in its own thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+
+        if not leader:
+            if call.done.wait(WAIT_TIMEOUT) and not call.failed:
+                return call.result
+            return compute()
+
+        try:
+            call.result = compute()
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def __len__(self):
+        return len(self._calls)
+
+
+# Search responses computed by this process
+search_flights = SingleFlight()
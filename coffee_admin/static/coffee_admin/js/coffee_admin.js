@@ -1,14 +1,26 @@
 /**
  * Coffee Admin JavaScript
  *
- * This file is loaded on every Django admin page.
+ * Admin pages load the small loader.js, which loads this file the first
+ * time the launcher is opened. It can also be included directly.
  * Add your custom admin JavaScript functionality here.
  *
  * Features:
  * - Configurable keystroke listener (default: Ctrl+D)
  * - Spotlight/Alfred-style launcher UI
  * - Real-time search of Django admin URLs
- * - Debounced API requests (300ms delay)
+ * - Catalog fetched on the first launcher open (or when idle, if loaded
+ *   ahead of use) and revalidated (If-None-Match) on every open, then filtered
+ *   locally; falls back to the search API
+ * - Debounced API requests, streamed as NDJSON so navigation results
+ *   render before slower record results. The debounce window follows the
+ *   measured response time of recent searches.
+ * - Results rendered a page at a time; more load on scroll (locally or
+ *   through the search API's cursor)
+ * - Recent server responses cached per query (LRU); a query that extends
+ *   a cached query with a complete result set is answered locally
+ * - Virtualized result list: only the rows in view exist in the DOM, and
+ *   row nodes are reused across responses, keyed by URL
  * - Keyboard navigation (Arrow Up/Down, Enter to select)
  * - Automatic navigation to selected results
  *
@@ -29,13 +41,46 @@
 (function() {
     'use strict';
 
+    // Settings made on the CoffeeAdmin object of loader.js, if any
+    var preset = window.CoffeeAdmin || {};
+
     // Keystroke configuration
-    var keystrokeConfig = {
+    var keystrokeConfig = Object.assign({
         altKey: false,
         ctrlKey: true,
         shiftKey: false,
         key: 'd'  // The key to listen for (case-insensitive)
-    };
+    }, preset.keystroke);
+
+    // Server endpoints (override for custom admin sites). `site` names the
+    // AdminSite to search; the template sets it to the current admin site.
+    var currentScript = document.currentScript;
+    var endpointConfig = Object.assign({
+        search: '/admin/coffee/search/',
+        catalog: '/admin/coffee/catalog/',
+        site: (currentScript && currentScript.dataset.site) || null
+    }, preset.endpoints);
+
+    // Number of results rendered (and requested from the server) per page
+    var pageSize = 20;
+
+    // Bounds (milliseconds) of the search debounce window, which follows
+    // the average response time of recent searches. `initial` is used until
+    // a search has been timed.
+    var debounceConfig = Object.assign({
+        min: 50,
+        max: 400,
+        initial: 300
+    }, preset.debounce);
+    var searchLatency = null;  // Moving average of search response times
+
+    // Fetch the catalog when the browser is idle after loading, so the
+    // first keystroke is answered locally. Only applies when this file loads
+    // before the launcher is opened (loader.js with data-preload="load");
+    // otherwise opening the launcher fetches the catalog.
+    var prefetchConfig = Object.assign({
+        onIdle: true
+    }, preset.prefetch);
 
     // Launcher state
     var launcherElement = null;
@@ -45,13 +90,35 @@
     var currentSearchRequest = null;
     var selectedResultIndex = -1;  // Track selected result for keyboard navigation
 
-    // Initialize when DOM is ready
-    document.addEventListener('DOMContentLoaded', function() {
-        console.log('Coffee Admin JavaScript loaded');
+    // Catalog state for local filtering
+    var catalogEntries = null;
+    var catalogEtag = null;
+    var catalogRequest = null;
+    var recordSearch = null;  // {minLength: n} when the server searches records
 
-        // Add your custom initialization code here
-        initCoffeeAdmin();
-    });
+    // Pagination state for the current query
+    var pendingResults = [];  // Local matches not rendered yet
+    var nextPage = null;  // {query, cursor} of the next server page
+    var pageRequest = null;
+
+    // Server results of recent queries, least recently used first. Keys are
+    // the search mode ('all', or 'records' when the catalog is filtered
+    // locally) and the normalized query.
+    var queryCache = new Map();
+    var queryCacheSize = 50;
+    var queryCacheMaxAge = 60000;  // Milliseconds
+
+    // Result list state. Every result of the current query is kept in
+    // resultList, but only the rows in view (plus overscanRows on either
+    // side) are in the DOM. Row nodes are kept in rowNodes by key, so a
+    // result that stays in the list keeps its node.
+    var resultList = [];
+    var resultKeys = [];
+    var rowNodes = new Map();
+    var listElement = null;
+    var rowHeight = 60;  // Measured from the first rendered row
+    var overscanRows = 5;
+    var renderFrame = null;
 
     /**
      * Initialize Coffee Admin functionality
@@ -61,6 +128,27 @@
         createLauncher();
         // Set up keystroke listeners
         setupKeystrokeListeners();
+        // Warm the catalog without competing with the page itself; opening
+        // the launcher first loads it already
+        if (prefetchConfig.onIdle) {
+            whenIdle(function() {
+                if (!catalogEntries) {
+                    loadCatalog();
+                }
+            });
+        }
+    }
+
+    /**
+     * Run a callback once the browser is idle
+     * @param {Function} callback - The function to run
+     */
+    function whenIdle(callback) {
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(callback, {timeout: 2000});
+        } else {
+            setTimeout(callback, 1000);
+        }
     }
 
     /**
@@ -129,25 +217,22 @@
             }
 
             // Arrow keys and Enter only work when launcher is visible
-            var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
-            var items = resultsContainer.querySelectorAll('.coffee-launcher-result-item');
-
-            if (items.length === 0) return;
+            if (resultList.length === 0) return;
 
             // Arrow Down - navigate to next result
             if (e.key === 'ArrowDown') {
                 e.preventDefault();
-                navigateResults(1, items);
+                navigateResults(1);
             }
             // Arrow Up - navigate to previous result
             else if (e.key === 'ArrowUp') {
                 e.preventDefault();
-                navigateResults(-1, items);
+                navigateResults(-1);
             }
             // Enter - select current result
             else if (e.key === 'Enter') {
                 e.preventDefault();
-                selectCurrentResult(items);
+                selectCurrentResult();
             }
         });
 
@@ -155,6 +240,29 @@
         launcherInput.addEventListener('input', function(e) {
             handleLauncherInput(e.target.value);
         });
+
+        listElement = document.createElement('div');
+        listElement.className = 'coffee-launcher-result-list';
+
+        // One click handler for every result row, present and future
+        var resultsContainer = backdrop.querySelector('.coffee-launcher-results');
+        resultsContainer.addEventListener('click', function(e) {
+            var item = e.target.closest('.coffee-launcher-result-item');
+            if (item) {
+                handleResultClick(item.dataset.url);
+            }
+        });
+
+        // Render the rows scrolled into view, and load the next page when
+        // scrolled near the end of the results
+        resultsContainer.addEventListener('scroll', function() {
+            scheduleRender();
+            var remaining = resultsContainer.scrollHeight - resultsContainer.scrollTop -
+                resultsContainer.clientHeight;
+            if (remaining < 100) {
+                loadMoreResults();
+            }
+        });
     }
 
     /**
@@ -210,6 +318,9 @@
         launcherElement.classList.add('active');
         isLauncherVisible = true;
 
+        // Fetch (or revalidate) the catalog so typing needs no round-trips
+        loadCatalog();
+
         // Focus input after animation starts
         setTimeout(function() {
             launcherInput.focus();
@@ -228,8 +339,9 @@
         // Clear input
         launcherInput.value = '';
 
-        // Reset selection
+        // Reset selection and pagination
         selectedResultIndex = -1;
+        resetPagination();
 
         // Hide loading state
         var loadingOverlay = launcherElement.querySelector('.coffee-launcher-loading');
@@ -238,12 +350,7 @@
         }
 
         // Reset results
-        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
-        resultsContainer.innerHTML = `
-            <div class="coffee-launcher-empty">
-                Start typing to search...
-            </div>
-        `;
+        showMessage('Start typing to search...');
     }
 
     /**
@@ -251,8 +358,6 @@
      * @param {string} value - The input value
      */
     function handleLauncherInput(value) {
-        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
-
         // Cancel previous debounce timer
         if (searchDebounceTimer) {
             clearTimeout(searchDebounceTimer);
@@ -263,49 +368,133 @@
             currentSearchRequest.abort();
             currentSearchRequest = null;
         }
+        resetPagination();
 
         // Handle empty input
         if (!value.trim()) {
-            resultsContainer.innerHTML = `
-                <div class="coffee-launcher-empty">
-                    Start typing to search...
-                </div>
-            `;
+            showMessage('Start typing to search...');
+            return;
+        }
+
+        // Filter the catalog locally when it is available
+        if (catalogEntries) {
+            var localResults = rankEntries(catalogEntries, value);
+            pendingResults = localResults.slice(pageSize);
+            displaySearchResults(localResults.slice(0, pageSize));
+
+            // Records still come from the server, unless they are cached
+            if (recordSearch && value.trim().length >= recordSearch.minLength) {
+                var cachedRecords = getCachedResults('records', value);
+                if (cachedRecords) {
+                    if (cachedRecords.results.length) {
+                        appendSearchResults(cachedRecords.results);
+                    }
+                    return;
+                }
+                searchDebounceTimer = setTimeout(function() {
+                    performSearch(value, localResults);
+                }, getSearchDelay());
+            }
+            return;
+        }
+
+        // Answer repeated and refined queries without a round-trip
+        var cached = getCachedResults('all', value);
+        if (cached) {
+            displaySearchResults(cached.results);
+            nextPage = cached.nextCursor ? {query: cached.query, cursor: cached.nextCursor} : null;
             return;
         }
 
         // Show loading state
-        resultsContainer.innerHTML = `
-            <div class="coffee-launcher-empty">
-                Searching...
-            </div>
-        `;
+        showMessage('Searching...');
 
-        // Debounce search (300ms delay)
+        // Debounce search
         searchDebounceTimer = setTimeout(function() {
             performSearch(value);
-        }, 300);
+        }, getSearchDelay());
+    }
+
+    /**
+     * Return the debounce window for server searches: the average response
+     * time of recent searches, within the configured bounds. A fast server
+     * is asked sooner; a slow one is not sent a request per keystroke.
+     * @returns {number} Delay in milliseconds
+     */
+    function getSearchDelay() {
+        var delay = searchLatency === null ? debounceConfig.initial : searchLatency;
+        return Math.round(Math.min(debounceConfig.max, Math.max(debounceConfig.min, delay)));
+    }
+
+    /**
+     * Add a search response time to the moving average
+     * @param {number} duration - Response time in milliseconds
+     */
+    function recordSearchLatency(duration) {
+        searchLatency = searchLatency === null ? duration : searchLatency * 0.7 + duration * 0.3;
     }
 
     /**
      * Perform search via API
      * @param {string} query - The search query
+     * @param {Array} [localResults] - Catalog results already shown; only
+     *   record results from the server are appended to them
      */
-    function performSearch(query) {
-        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
-
+    function performSearch(query, localResults) {
         // Create AbortController for cancellable requests
         var controller = new AbortController();
         currentSearchRequest = controller;
 
-        // Build search URL
-        var searchUrl = '/admin/coffee/search/?q=' + encodeURIComponent(query);
+        // Build search URL (streamed so fast results render first). In
+        // catalog mode only records are asked for, so matching catalog
+        // entries leave the server's whole page to them.
+        var params = {q: query, stream: 'ndjson', format: 'compact'};
+        if (localResults) {
+            params.providers = 'records';
+        } else {
+            params.limit = pageSize;
+        }
+        var searchUrl = buildEndpointUrl(endpointConfig.search, params);
+
+        // Results shown so far; in catalog mode only records are added
+        var shown = localResults || [];
+        // Results from the server, cached once the stream is done
+        var received = [];
+        var started = Date.now();
+
+        function handleEvent(event) {
+            if (event.done) {
+                currentSearchRequest = null;
+                recordSearchLatency(Date.now() - started);
+                cacheResults(localResults ? 'records' : 'all', event.query, received, event);
+                if (!localResults) {
+                    if (shown.length === 0) {
+                        displaySearchResults([]);
+                    }
+                    nextPage = event.next_cursor ? {query: query, cursor: event.next_cursor} : null;
+                }
+                return;
+            }
+            if (localResults && event.provider === 'catalog') return;
+
+            var batch = expandResults(event.results);
+            if (!batch.length) return;
+            received = received.concat(batch);
+
+            if (shown.length === 0) {
+                displaySearchResults(batch);
+            } else {
+                appendSearchResults(batch);
+            }
+            shown = shown.concat(batch);
+        }
 
         // Perform fetch request
         fetch(searchUrl, {
             method: 'GET',
             headers: {
                 'X-Requested-With': 'XMLHttpRequest',
+                'Accept': 'application/x-ndjson',
             },
             signal: controller.signal
         })
@@ -313,11 +502,7 @@
             if (!response.ok) {
                 throw new Error('Search failed: ' + response.status);
             }
-            return response.json();
-        })
-        .then(function(data) {
-            currentSearchRequest = null;
-            displaySearchResults(data.results);
+            return readNdjson(response, handleEvent);
         })
         .catch(function(error) {
             currentSearchRequest = null;
@@ -328,11 +513,377 @@
             }
 
             console.error('Search error:', error);
-            resultsContainer.innerHTML = `
-                <div class="coffee-launcher-empty">
-                    Search failed. Please try again.
-                </div>
-            `;
+
+            // Keep the local catalog results if only records failed
+            if (localResults) {
+                return;
+            }
+            showMessage('Search failed. Please try again.');
+        });
+    }
+
+    /**
+     * Build an endpoint URL with query parameters, selecting the configured
+     * admin site
+     * @param {string} endpoint - Endpoint path
+     * @param {Object} params - Query parameters
+     * @returns {string} The URL
+     */
+    function buildEndpointUrl(endpoint, params) {
+        if (endpointConfig.site) {
+            params.site = endpointConfig.site;
+        }
+        var query = Object.keys(params).map(function(key) {
+            return encodeURIComponent(key) + '=' + encodeURIComponent(params[key]);
+        }).join('&');
+        return query ? endpoint + '?' + query : endpoint;
+    }
+
+    /**
+     * Remember the server results of a query
+     * @param {string} mode - 'all', or 'records' for record-only searches
+     * @param {string} query - The normalized query the server answered
+     * @param {Array} results - Every result received for the query
+     * @param {Object} done - The done event closing the stream
+     * @param {number} [time] - When the results were fetched, default now
+     */
+    function cacheResults(mode, query, results, done, time) {
+        var key = mode + ':' + query;
+        queryCache.delete(key);
+        queryCache.set(key, {
+            query: query,
+            results: results,
+            nextCursor: done.next_cursor,
+            // Record searches are capped per model, may match exactly
+            // (=field) and start at a minimum query length, so a longer
+            // query can find records its prefix did not: only results from
+            // a server without record search are known to hold every match
+            complete: mode === 'all' && !done.next_cursor && !done.partial &&
+                !done.record_search,
+            time: time || Date.now()
+        });
+
+        // Evict the least recently used queries
+        while (queryCache.size > queryCacheSize) {
+            queryCache.delete(queryCache.keys().next().value);
+        }
+    }
+
+    /**
+     * Return the cached results of a query, or null. A query that extends a
+     * cached query with a complete result set is answered by ranking those
+     * results locally, since it can only match a subset of them.
+     * @param {string} mode - 'all', or 'records' for record-only searches
+     * @param {string} query - The search query
+     * @returns {Object|null} {query, results, nextCursor}
+     */
+    function getCachedResults(mode, query) {
+        query = query.toLowerCase().trim();
+        var now = Date.now();
+        var exact = queryCache.get(mode + ':' + query);
+        if (exact && now - exact.time < queryCacheMaxAge) {
+            // Mark as most recently used
+            queryCache.delete(mode + ':' + query);
+            queryCache.set(mode + ':' + query, exact);
+            return exact;
+        }
+
+        // The longest fresh, complete cached query this one extends
+        var base = null;
+        queryCache.forEach(function(entry, key) {
+            if (key.indexOf(mode + ':') === 0 && entry.complete &&
+                    now - entry.time < queryCacheMaxAge &&
+                    query.indexOf(entry.query) === 0 &&
+                    (!base || entry.query.length > base.query.length)) {
+                base = entry;
+            }
+        });
+        if (!base) return null;
+
+        if (!base.entries) {
+            base.entries = base.results.map(prepareCatalogEntry);
+        }
+        // Refined results expire with the results they were taken from
+        var results = rankEntries(base.entries, query);
+        cacheResults(mode, query, results, {next_cursor: null, partial: false}, base.time);
+        return queryCache.get(mode + ':' + query);
+    }
+
+    /**
+     * Expand a compact (columnar) result list from the server into result
+     * objects; verbose lists are returned unchanged
+     * @param {Object|Array} results - Results as sent by the server
+     * @returns {Array} Array of result objects
+     */
+    function expandResults(results) {
+        if (Array.isArray(results)) return results;
+        var fields = results.fields;
+        var tables = results.tables;
+        return results.rows.map(function(row) {
+            var item = {};
+            fields.forEach(function(field, i) {
+                item[field] = tables[field] ? tables[field][row[i]] : row[i];
+            });
+            return item;
+        });
+    }
+
+    /**
+     * Forget the remaining pages of the previous query
+     */
+    function resetPagination() {
+        pendingResults = [];
+        nextPage = null;
+        if (pageRequest) {
+            pageRequest.abort();
+            pageRequest = null;
+        }
+    }
+
+    /**
+     * Render the next page of results: remaining local matches first, then
+     * the next server page if the search API returned a cursor
+     */
+    function loadMoreResults() {
+        if (pendingResults.length) {
+            var page = pendingResults.slice(0, pageSize);
+            pendingResults = pendingResults.slice(pageSize);
+            // Keep record results from the server below the catalog matches
+            appendSearchResults(page, true);
+            return;
+        }
+        if (!nextPage || pageRequest || currentSearchRequest) return;
+
+        var controller = new AbortController();
+        pageRequest = controller;
+        var page = nextPage;
+        var pageUrl = buildEndpointUrl(endpointConfig.search, {
+            q: page.query,
+            limit: pageSize,
+            cursor: page.cursor,
+            format: 'compact'
+        });
+
+        fetch(pageUrl, {
+            method: 'GET',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            signal: controller.signal
+        })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('Search failed: ' + response.status);
+            }
+            return response.json();
+        })
+        .then(function(data) {
+            pageRequest = null;
+            nextPage = data.next_cursor ? {query: page.query, cursor: data.next_cursor} : null;
+            appendSearchResults(expandResults(data.results));
+        })
+        .catch(function(error) {
+            pageRequest = null;
+            if (error.name !== 'AbortError') {
+                console.error('Search error:', error);
+            }
+        });
+    }
+
+    /**
+     * Read a newline-delimited JSON response, calling onEvent for each
+     * line as soon as it arrives
+     * @param {Response} response - The fetch response
+     * @param {Function} onEvent - Called with each parsed line
+     * @returns {Promise} Resolved when the stream ends
+     */
+    function readNdjson(response, onEvent) {
+        function handleLines(lines) {
+            lines.forEach(function(line) {
+                if (line.trim()) onEvent(JSON.parse(line));
+            });
+        }
+
+        // Browsers without streaming fetch bodies read the whole response
+        if (!response.body || !response.body.getReader || !window.TextDecoder) {
+            return response.text().then(function(text) {
+                handleLines(text.split('\n'));
+            });
+        }
+
+        var reader = response.body.getReader();
+        var decoder = new TextDecoder();
+        var buffer = '';
+
+        function pump() {
+            return reader.read().then(function(chunk) {
+                if (chunk.done) {
+                    handleLines([buffer]);
+                    return;
+                }
+                buffer += decoder.decode(chunk.value, {stream: true});
+                var lines = buffer.split('\n');
+                buffer = lines.pop();
+                handleLines(lines);
+                return pump();
+            });
+        }
+        return pump();
+    }
+
+    /**
+     * Fetch the permitted catalog, revalidating a previously loaded copy
+     * with If-None-Match so an unchanged catalog costs a 304
+     */
+    function loadCatalog() {
+        if (catalogRequest) return;
+
+        var headers = {
+            'X-Requested-With': 'XMLHttpRequest',
+        };
+        if (catalogEtag) {
+            headers['If-None-Match'] = catalogEtag;
+        }
+
+        catalogRequest = fetch(buildEndpointUrl(endpointConfig.catalog, {format: 'compact'}), {
+            method: 'GET',
+            headers: headers,
+            cache: 'no-cache'
+        })
+        .then(function(response) {
+            if (response.status === 304) {
+                return null;
+            }
+            if (!response.ok) {
+                throw new Error('Catalog failed: ' + response.status);
+            }
+            catalogEtag = response.headers.get('ETag');
+            return response.json();
+        })
+        .then(function(data) {
+            catalogRequest = null;
+            if (data) {
+                catalogEntries = expandResults(data.results).map(prepareCatalogEntry);
+                recordSearch = data.record_search ? {minLength: data.record_search_min_length} : null;
+            }
+
+            // Re-run a query typed while the catalog was loading
+            if (isLauncherVisible && launcherInput.value.trim()) {
+                handleLauncherInput(launcherInput.value);
+            }
+        })
+        .catch(function(error) {
+            catalogRequest = null;
+            // Keep using the search API if the catalog is unavailable
+            console.error('Catalog error:', error);
+        });
+    }
+
+    /**
+     * Split text into lowercase word tokens
+     * @param {string} text - The text to tokenize
+     * @returns {Array} List of tokens
+     */
+    function tokenize(text) {
+        return String(text).toLowerCase().split(/[^a-z0-9\u00c0-\uffff]+/).filter(Boolean);
+    }
+
+    /**
+     * Precompute the lowercase tokens used to match a catalog entry
+     * @param {Object} item - Catalog entry from the server
+     * @param {number} position - Index of the entry in the catalog
+     * @returns {Object} The entry with matching data attached
+     */
+    function prepareCatalogEntry(item, position) {
+        var titleTokens = tokenize(item.title);
+        var otherTokens = tokenize(item.subtitle + ' ' + item.app_label).filter(function(token) {
+            return titleTokens.indexOf(token) === -1;
+        });
+
+        return {
+            item: item,
+            position: position,
+            title: item.title.toLowerCase(),
+            acronym: titleTokens.map(function(token) { return token[0]; }).join(''),
+            tokens: titleTokens.map(function(token, i) {
+                return {text: token, weight: 1, leading: i === 0};
+            }).concat(otherTokens.map(function(token) {
+                return {text: token, weight: 0.5, leading: false};
+            }))
+        };
+    }
+
+    /**
+     * Check whether the characters of needle appear in order in haystack
+     */
+    function isSubsequence(needle, haystack) {
+        var i = 0;
+        for (var j = 0; j < haystack.length && i < needle.length; j++) {
+            if (haystack[j] === needle[i]) i++;
+        }
+        return i === needle.length;
+    }
+
+    /**
+     * Score a single query token against an entry, mirroring the server's
+     * ranking (exact > acronym > prefix > substring > subsequence)
+     * @returns {number} Score, 0 if the token does not match
+     */
+    function scoreToken(queryToken, entry) {
+        var best = 0;
+        if (queryToken.length > 1 && entry.acronym.indexOf(queryToken) === 0) {
+            best = entry.acronym === queryToken ? 90 : 70;
+        }
+
+        entry.tokens.forEach(function(token) {
+            var text = token.text;
+            var score = 0;
+            if (text === queryToken) {
+                score = 100;
+            } else if (text.indexOf(queryToken) === 0) {
+                score = 80;
+            } else if (text.indexOf(queryToken) !== -1) {
+                score = 50;
+            } else if (text[0] === queryToken[0] && isSubsequence(queryToken, text)) {
+                score = 30 * queryToken.length / text.length;
+            }
+            if (!score) return;
+            if (token.leading) score += 10;
+            score *= token.weight;
+            if (score > best) best = score;
+        });
+        return best;
+    }
+
+    /**
+     * Rank prepared entries (the catalog, or cached results) against a query
+     * @param {Array} entries - Entries from prepareCatalogEntry
+     * @param {string} query - The search query
+     * @returns {Array} All matching result objects, best first
+     */
+    function rankEntries(entries, query) {
+        query = query.toLowerCase().trim();
+        var queryTokens = tokenize(query);
+        if (!queryTokens.length) return [];
+
+        var matches = [];
+        entries.forEach(function(entry) {
+            var total = 0;
+            for (var i = 0; i < queryTokens.length; i++) {
+                var score = scoreToken(queryTokens[i], entry);
+                if (!score) return;
+                total += score;
+            }
+            if (entry.title.indexOf(query) === 0) total += 50;
+            matches.push({score: total, entry: entry});
+        });
+
+        matches.sort(function(a, b) {
+            return (b.score - a.score) || (a.entry.position - b.entry.position);
+        });
+
+        return matches.map(function(match) {
+            return match.entry.item;
         });
     }
 
@@ -341,49 +892,227 @@
      * @param {Array} results - Array of result objects
      */
     function displaySearchResults(results) {
+        if (!results || results.length === 0) {
+            showMessage('No results found');
+            return;
+        }
+
         var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
+        if (listElement.parentNode !== resultsContainer) {
+            resultsContainer.innerHTML = '';
+            resultsContainer.appendChild(listElement);
+        }
+        resultsContainer.scrollTop = 0;
 
-        // Reset selection when displaying new results (will be set to 0 if results exist)
-        selectedResultIndex = -1;
+        // Automatically select the first result
+        setResults(results.slice(), 0);
+        renderResults();
+    }
 
-        if (!results || results.length === 0) {
-            resultsContainer.innerHTML = `
-                <div class="coffee-launcher-empty">
-                    No results found
-                </div>
-            `;
+    /**
+     * Append a batch of results below the ones already displayed
+     * @param {Array} results - Array of result objects
+     * @param {boolean} [beforeRecords] - Insert the results above the
+     *   record results instead of at the end
+     */
+    function appendSearchResults(results, beforeRecords) {
+        if (resultList.length === 0) {
+            displaySearchResults(results);
             return;
         }
 
-        var html = results.map(function(item) {
-            return `
-                <div class="coffee-launcher-result-item" data-url="${item.url}">
-                    <span class="coffee-launcher-result-icon">${item.icon}</span>
-                    <div class="coffee-launcher-result-text">
-                        <div class="coffee-launcher-result-title">${item.title}</div>
-                        <div class="coffee-launcher-result-subtitle">${item.subtitle}</div>
-                    </div>
-                </div>
-            `;
-        }).join('');
+        var at = resultList.length;
+        if (beforeRecords) {
+            for (var i = 0; i < resultList.length; i++) {
+                if (resultList[i].category === 'records') {
+                    at = i;
+                    break;
+                }
+            }
+        }
 
-        resultsContainer.innerHTML = html;
+        // Keep the same result selected
+        var selected = selectedResultIndex;
+        if (selected >= at) {
+            selected += results.length;
+        }
+        setResults(resultList.slice(0, at).concat(results, resultList.slice(at)), selected);
+        renderResults();
+    }
 
-        // Add click handlers to results
-        var items = resultsContainer.querySelectorAll('.coffee-launcher-result-item');
-        items.forEach(function(item) {
-            item.addEventListener('click', function() {
-                handleResultClick(item.dataset.url);
-            });
+    /**
+     * Replace the result list with a message such as "No results found"
+     * @param {string} text - The message
+     */
+    function showMessage(text) {
+        setResults([], -1);
+        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
+        resultsContainer.innerHTML = `
+            <div class="coffee-launcher-empty">
+                ${escapeHtml(text)}
+            </div>
+        `;
+    }
+
+    /**
+     * Set the results of the current query and drop the row nodes of
+     * results that are no longer listed
+     * @param {Array} results - Array of result objects
+     * @param {number} selected - Index of the selected result, -1 for none
+     */
+    function setResults(results, selected) {
+        var seen = {};
+        resultList = results;
+        resultKeys = results.map(function(item) {
+            // Rows are keyed by URL; repeated URLs get a counter
+            var key = item.category + ' ' + item.url;
+            seen[key] = (seen[key] || 0) + 1;
+            return seen[key] > 1 ? key + ' ' + seen[key] : key;
         });
+        selectedResultIndex = selected;
 
-        // Automatically select the first result
-        if (items.length > 0) {
-            selectedResultIndex = 0;
-            items[0].classList.add('selected');
+        var current = new Set(resultKeys);
+        rowNodes.forEach(function(node, key) {
+            if (!current.has(key)) {
+                rowNodes.delete(key);
+            }
+        });
+    }
+
+    /**
+     * Render the rows on the next animation frame
+     */
+    function scheduleRender() {
+        if (renderFrame) return;
+        renderFrame = window.requestAnimationFrame(function() {
+            renderFrame = null;
+            renderResults();
+        });
+    }
+
+    /**
+     * Render the rows in view. Rows out of view are replaced by padding,
+     * so the scrollbar still reflects the whole list.
+     */
+    function renderResults() {
+        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
+        if (listElement.parentNode !== resultsContainer) return;
+
+        var scrollTop = resultsContainer.scrollTop;
+        var viewportHeight = resultsContainer.clientHeight || 400;
+        var start = Math.max(0, Math.floor(scrollTop / rowHeight) - overscanRows);
+        var end = Math.min(
+            resultList.length,
+            Math.ceil((scrollTop + viewportHeight) / rowHeight) + overscanRows
+        );
+
+        // Put the visible rows in order, moving only nodes that are out of place
+        var next = listElement.firstChild;
+        for (var i = start; i < end; i++) {
+            var node = getRowNode(i);
+            node.classList.toggle('selected', i === selectedResultIndex);
+            if (node === next) {
+                next = next.nextSibling;
+            } else {
+                listElement.insertBefore(node, next);
+            }
+        }
+        while (next) {
+            var following = next.nextSibling;
+            listElement.removeChild(next);
+            next = following;
+        }
+
+        listElement.style.paddingTop = (start * rowHeight) + 'px';
+        listElement.style.paddingBottom = ((resultList.length - end) * rowHeight) + 'px';
+
+        // Rows have a fixed height; measure it once they are in the DOM
+        var measured = listElement.firstChild ? listElement.firstChild.offsetHeight : 0;
+        if (measured && measured !== rowHeight) {
+            rowHeight = measured;
+            renderResults();
         }
     }
 
+    /**
+     * Return the row node of result ``index``, reusing the node of the same
+     * result from an earlier render
+     * @param {number} index - Index of the result in resultList
+     * @returns {Element} The row node
+     */
+    function getRowNode(index) {
+        var key = resultKeys[index];
+        var item = resultList[index];
+        var node = rowNodes.get(key);
+        if (node && node.coffeeItem !== item && !sameResult(node.coffeeItem, item)) {
+            node = null;
+        }
+        if (!node) {
+            var template = document.createElement('template');
+            template.innerHTML = renderResultItem(item).trim();
+            node = template.content.firstChild;
+            rowNodes.set(key, node);
+        }
+        node.coffeeItem = item;
+        return node;
+    }
+
+    /**
+     * Check whether two results render the same row
+     */
+    function sameResult(a, b) {
+        return a.title === b.title && a.subtitle === b.subtitle && a.icon === b.icon &&
+            a.url === b.url && a.count === b.count;
+    }
+
+    /**
+     * Abbreviate a row count for its badge: 845, 12K, 2.3M
+     * @param {number} count - Number of rows
+     * @returns {string} Abbreviated count
+     */
+    function formatCount(count) {
+        var units = [[1e9, 'B'], [1e6, 'M'], [1e3, 'K']];
+        for (var i = 0; i < units.length; i++) {
+            if (count >= units[i][0]) {
+                var value = count / units[i][0];
+                return (value < 10 ? Math.floor(value * 10) / 10 : Math.floor(value)) + units[i][1];
+            }
+        }
+        return String(count);
+    }
+
+    /**
+     * Escape text for safe insertion into HTML
+     * @param {string} value - The text to escape
+     * @returns {string} Escaped text
+     */
+    function escapeHtml(value) {
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
+    /**
+     * Build the HTML of one result row
+     * @param {Object} item - Result object
+     * @returns {string} HTML
+     */
+    function renderResultItem(item) {
+        // Record titles are user data, so everything is escaped
+        return `
+            <div class="coffee-launcher-result-item" data-url="${escapeHtml(item.url)}" data-category="${escapeHtml(item.category)}">
+                <span class="coffee-launcher-result-icon">${escapeHtml(item.icon)}</span>
+                <div class="coffee-launcher-result-text">
+                    <div class="coffee-launcher-result-title">${escapeHtml(item.title)}${item.count != null ? ` <span class="coffee-launcher-result-count">(${formatCount(item.count)})</span>` : ''}</div>
+                    <div class="coffee-launcher-result-subtitle">${escapeHtml(item.subtitle)}</div>
+                </div>
+            </div>
+        `;
+    }
+
     /**
      * Handle result item click
      * @param {string} url - The URL to navigate to
@@ -411,48 +1140,43 @@
     /**
      * Navigate through results with arrow keys
      * @param {number} direction - 1 for down, -1 for up
-     * @param {NodeList} items - List of result items
      */
-    function navigateResults(direction, items) {
-        // Remove current selection
-        if (selectedResultIndex >= 0 && selectedResultIndex < items.length) {
-            items[selectedResultIndex].classList.remove('selected');
-        }
+    function navigateResults(direction) {
+        var count = resultList.length;
 
         // Calculate new index
         if (selectedResultIndex === -1) {
             // No selection yet, select first or last depending on direction
-            selectedResultIndex = direction === 1 ? 0 : items.length - 1;
+            selectedResultIndex = direction === 1 ? 0 : count - 1;
         } else {
             selectedResultIndex = selectedResultIndex + direction;
         }
 
         // Wrap around
-        if (selectedResultIndex >= items.length) {
+        if (selectedResultIndex >= count) {
             selectedResultIndex = 0;
         } else if (selectedResultIndex < 0) {
-            selectedResultIndex = items.length - 1;
+            selectedResultIndex = count - 1;
         }
 
-        // Add selection to new item
-        items[selectedResultIndex].classList.add('selected');
-
-        // Scroll into view if needed
-        items[selectedResultIndex].scrollIntoView({
-            block: 'nearest',
-            behavior: 'smooth'
-        });
+        // Scroll the row into view; it may not be rendered yet
+        var resultsContainer = launcherElement.querySelector('.coffee-launcher-results');
+        var top = listElement.offsetTop - resultsContainer.offsetTop +
+            selectedResultIndex * rowHeight;
+        if (top < resultsContainer.scrollTop) {
+            resultsContainer.scrollTop = top;
+        } else if (top + rowHeight > resultsContainer.scrollTop + resultsContainer.clientHeight) {
+            resultsContainer.scrollTop = top + rowHeight - resultsContainer.clientHeight;
+        }
+        renderResults();
     }
 
     /**
      * Select the currently highlighted result
-     * @param {NodeList} items - List of result items
      */
-    function selectCurrentResult(items) {
-        if (selectedResultIndex >= 0 && selectedResultIndex < items.length) {
-            var selectedItem = items[selectedResultIndex];
-            var url = selectedItem.dataset.url;
-            handleResultClick(url);
+    function selectCurrentResult() {
+        if (selectedResultIndex >= 0 && selectedResultIndex < resultList.length) {
+            handleResultClick(resultList[selectedResultIndex].url);
         }
     }
 
@@ -460,12 +1184,38 @@
     window.CoffeeAdmin = {
         init: initCoffeeAdmin,
         version: '0.1.0',
+        // Launcher shortcut, e.g. CoffeeAdmin.keystroke.key = 'k'
+        keystroke: keystrokeConfig,
+        // Server endpoints, e.g. CoffeeAdmin.endpoints.search = '/myadmin/coffee/search/'
+        endpoints: endpointConfig,
+        // Search debounce bounds, e.g. CoffeeAdmin.debounce.max = 600
+        debounce: debounceConfig,
+        // Idle catalog prefetch, e.g. CoffeeAdmin.prefetch.onIdle = false
+        prefetch: prefetchConfig,
         // Expose keystroke handler for customization
         onKeystrokeTriggered: onKeystrokeTriggered,
         // Launcher controls
         showLauncher: showLauncher,
         hideLauncher: hideLauncher,
-        toggleLauncher: toggleLauncher
+        toggleLauncher: toggleLauncher,
+        // Same as loader.js: resolves once the launcher is ready
+        load: function() {
+            return Promise.resolve(window.CoffeeAdmin);
+        }
     };
 
+    // Initialize when DOM is ready; loader.js loads this file afterwards
+    function start() {
+        console.log('Coffee Admin JavaScript loaded');
+
+        // Add your custom initialization code here
+        initCoffeeAdmin();
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', start);
+    } else {
+        start();
+    }
+
 })();
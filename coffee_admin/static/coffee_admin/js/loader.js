@@ -0,0 +1,155 @@
+/**
+ * Coffee Admin loader
+ *
+ * This small file is loaded on every Django admin page instead of the
+ * launcher. It only listens for the launcher shortcut (default: Ctrl+D).
+ * The first time the shortcut is pressed, or CoffeeAdmin.showLauncher() is
+ * called, it loads launcher.css and coffee_admin.js, which build the
+ * launcher UI. Page views that never open the launcher pay for neither.
+ *
+ * With data-preload="idle", both files are prefetched into the browser
+ * cache when the browser is idle, so the first open does not wait for the
+ * network. With data-preload="load", the launcher is loaded on idle instead,
+ * and it fetches the catalog ahead of use (see CoffeeAdmin.prefetch).
+ * Drop data-preload to turn both off.
+ *
+ * The script tag names the files to load and the current admin site:
+ *   <script src=".../loader.js" data-script=".../coffee_admin.js"
+ *           data-style=".../launcher.css" data-site="admin"
+ *           data-preload="idle" defer></script>
+ *
+ * Settings made on window.CoffeeAdmin before the launcher loads (keystroke,
+ * endpoints, debounce, prefetch) are picked up by coffee_admin.js.
+ */
+
+(function() {
+    'use strict';
+
+    var options = document.currentScript.dataset;
+
+    // Launcher shortcut; coffee_admin.js takes it over once loaded
+    var keystrokeConfig = {
+        altKey: false,
+        ctrlKey: true,
+        shiftKey: false,
+        key: 'd'  // The key to listen for (case-insensitive)
+    };
+
+    var loading = null;
+
+    /**
+     * Add a script or stylesheet to the page
+     * @param {string} tagName - 'script' or 'link'
+     * @param {Object} attributes - Attributes of the new element
+     * @returns {Promise} Resolved when the file has loaded
+     */
+    function addElement(tagName, attributes) {
+        return new Promise(function(resolve, reject) {
+            var element = document.createElement(tagName);
+            Object.keys(attributes).forEach(function(name) {
+                element.setAttribute(name, attributes[name]);
+            });
+            element.onload = resolve;
+            element.onerror = reject;
+            document.head.appendChild(element);
+        });
+    }
+
+    /**
+     * Load the launcher stylesheet and script, once
+     * @returns {Promise} Resolved with the full CoffeeAdmin API
+     */
+    function loadLauncher() {
+        if (!loading) {
+            loading = Promise.all([
+                // An unstyled launcher still works, so CSS errors are ignored
+                addElement('link', {rel: 'stylesheet', href: options.style}).catch(function() {}),
+                addElement('script', {src: options.script, 'data-site': options.site || ''})
+            ]).then(function() {
+                // coffee_admin.js handles the shortcut from now on
+                document.removeEventListener('keydown', handleKeystroke);
+                return window.CoffeeAdmin;
+            }, function(error) {
+                // Try again on the next keystroke
+                loading = null;
+                throw error;
+            });
+        }
+        return loading;
+    }
+
+    /**
+     * Load the launcher and call one of its functions
+     * @param {string} name - Name of a CoffeeAdmin function
+     */
+    function callLauncher(name) {
+        loadLauncher().then(function(api) {
+            api[name]();
+        }, function(error) {
+            console.error('Coffee Admin failed to load:', error);
+        });
+    }
+
+    /**
+     * Open the launcher when the configured keystroke is pressed
+     * @param {KeyboardEvent} event - The keyboard event
+     */
+    function handleKeystroke(event) {
+        if (event.key && event.key.toLowerCase() === keystrokeConfig.key.toLowerCase() &&
+                event.altKey === keystrokeConfig.altKey &&
+                event.ctrlKey === keystrokeConfig.ctrlKey &&
+                event.shiftKey === keystrokeConfig.shiftKey) {
+            event.preventDefault();
+            callLauncher('toggleLauncher');
+        }
+    }
+
+    /**
+     * Ask the browser to fetch the launcher files into its cache, without
+     * running them
+     */
+    function prefetchLauncher() {
+        if (loading) return;
+        [options.style, options.script].forEach(function(href) {
+            var link = document.createElement('link');
+            link.rel = 'prefetch';
+            link.href = href;
+            document.head.appendChild(link);
+        });
+    }
+
+    document.addEventListener('keydown', handleKeystroke);
+
+    /**
+     * Load the launcher ahead of use, so it can warm the catalog
+     */
+    function preloadLauncher() {
+        loadLauncher().catch(function() {
+            // Loaded again when the launcher is opened
+        });
+    }
+
+    var preload = {idle: prefetchLauncher, load: preloadLauncher}[options.preload];
+    if (preload) {
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(preload, {timeout: 5000});
+        } else {
+            window.addEventListener('load', function() {
+                setTimeout(preload, 1000);
+            });
+        }
+    }
+
+    // Stand-in API until coffee_admin.js replaces it
+    window.CoffeeAdmin = {
+        keystroke: keystrokeConfig,
+        endpoints: {},
+        debounce: {},
+        prefetch: {},
+        load: loadLauncher,
+        showLauncher: function() { callLauncher('showLauncher'); },
+        hideLauncher: function() {},
+        toggleLauncher: function() { callLauncher('toggleLauncher'); }
+    };
+
+})();
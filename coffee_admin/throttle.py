@@ -0,0 +1,84 @@
+"""
+Per-user rate limiting of the search endpoint.
+
+With ``COFFEE_ADMIN_SEARCH_THROTTLE_RATE`` set, every user gets a token
+bucket holding up to ``COFFEE_ADMIN_SEARCH_THROTTLE_BURST`` tokens, refilled
+at the configured rate per second. Each search request takes one token; a
+request finding the bucket empty gets 429 Too Many Requests with a
+``Retry-After`` header, so a runaway launcher client cannot occupy every
+worker thread. Typing in the launcher stays far below any sensible rate.
+
+Buckets live in the worker process, so with N processes a user may reach up
+to N times the rate in total.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Number of buckets kept at most; full and least recently used ones go first
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class Throttle:
+    """
+    Token buckets by key (the user's primary key).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        # Least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def acquire(self, key, rate, burst):
+        """
+        Take a token from the bucket of ``key``, refilled at ``rate`` tokens
+        per second up to ``burst``. Return 0 if a token was taken, otherwise
+        the number of seconds until one is available.
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune(now, rate, burst)
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+            else:
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+                self._buckets.move_to_end(key)
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0
+            return (1 - bucket.tokens) / rate
+
+    def _prune(self, now, rate, burst):
+        # Drop the least recently used buckets while they are full (the same
+        # as no bucket), and the oldest one anyway if all of them are in use
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            full = oldest.tokens + (now - oldest.updated) * rate >= burst
+            if not full and len(buckets) < MAX_BUCKETS:
+                break
+            buckets.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Search requests handled by this process
+search_throttle = Throttle()
@@ -6,6 +6,11 @@ app_name = 'coffee_admin'
 urlpatterns = [
     # Search endpoint for launcher
     path('search/', views.SearchAdminUrlsView.as_view(), name='search'),
+    # Full permitted catalog for client-side filtering
+    path('catalog/', views.CatalogView.as_view(), name='catalog'),
+    # The same endpoints for any other AdminSite, selected by its name
+    path('sites/<str:site>/search/', views.SearchAdminUrlsView.as_view(), name='site_search'),
+    path('sites/<str:site>/catalog/', views.CatalogView.as_view(), name='site_catalog'),
     # Add custom admin URLs here
     # path('dashboard/', views.AdminDashboardView.as_view(), name='dashboard'),
 ]
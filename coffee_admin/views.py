@@ -1,12 +1,58 @@
+import hashlib
+import math
+
+import django
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import JsonResponse
-from django.urls import get_resolver
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag, urlsafe_base64_decode, urlsafe_base64_encode
 from django.contrib import admin
 from django.apps import apps
 from django.views import View
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import UserPassesTestMixin
 
+from .catalog import (  # noqa: F401
+    find_admin_site,
+    get_catalog,
+    get_loaded_catalog,
+    get_model_icon,
+)
+from .conf import get_setting
+from .counts import add_counts, get_catalog_counts, get_counts_key
+from .metrics import NULL_TIMER, start_timer
+from .permissions import (
+    compute_permitted_keys,
+    get_cached_permitted_keys,
+    get_permitted_keys,
+    get_shared_permission_cache,
+)
+from .records import RecordSearchProvider, rank_record
+from .serializers import (
+    RESPONSE_FORMATS,
+    dumps,
+    encode,
+    encoded_response,
+    format_results,
+    json_response,
+)
+from .singleflight import search_flights
+from .throttle import search_throttle
+
+# Content types of the streaming search formats
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+# Result providers a search request can ask for with ?providers=
+PROVIDERS = frozenset(('catalog', 'records'))
+
+# StreamingHttpResponse accepts async iterators from Django 4.2
+ASYNC_STREAMING = django.VERSION >= (4, 2)
+
 
 class StaffMemberRequiredMixin(UserPassesTestMixin):
     """
@@ -29,7 +75,57 @@ class AdminDashboardView(StaffMemberRequiredMixin, TemplateView):
         return context
 
 
-class SearchAdminUrlsView(StaffMemberRequiredMixin, View):
+class AdminSiteMixin:
+    """
+    Mixin for views that work on a configurable AdminSite.
+
+    Any other AdminSite can be selected by name with a ``site`` URL keyword
+    argument or query parameter, so one route can serve every site. The
+    user must pass the selected site's ``has_permission()``.
+    """
+    # Default to Django's default admin site, can be overridden
+    admin_site = admin.site
+    # URL keyword argument or query parameter naming another AdminSite
+    site_kwarg = 'site'
+
+    def get_admin_site(self):
+        """
+        Get the admin site to search. Can be overridden for custom logic.
+        """
+        request = getattr(self, 'request', None)
+        name = getattr(self, 'kwargs', {}).get(self.site_kwarg)
+        if not name and request is not None:
+            name = request.GET.get(self.site_kwarg)
+        if not name or name == getattr(self.admin_site, 'name', None):
+            return self.admin_site
+
+        admin_site = find_admin_site(name)
+        if admin_site is None:
+            raise Http404(f'No admin site named {name!r}.')
+        if not admin_site.has_permission(request):
+            raise PermissionDenied
+        return admin_site
+
+
+class ResponseFormatMixin:
+    """
+    Mixin for views whose result lists can be sent verbose (one object per
+    result, the default) or compact (columnar, see coffee_admin.serializers).
+    """
+    response_format = 'verbose'
+
+    def get_response_format(self):
+        """
+        Return the result format asked for with ``?format=``, defaulting to
+        'verbose'.
+        """
+        response_format = self.request.GET.get('format')
+        if response_format in RESPONSE_FORMATS:
+            return response_format
+        return 'verbose'
+
+
+class SearchAdminUrlsView(StaffMemberRequiredMixin, AdminSiteMixin, ResponseFormatMixin, View):
     """
     Search Django admin URLs and return matching results as JSON.
     Returns all registered admin pages with their titles and URLs.
@@ -43,148 +139,483 @@ class SearchAdminUrlsView(StaffMemberRequiredMixin, View):
             path('search/', SearchAdminUrlsView.as_view(admin_site=my_admin_site)),
         ]
     """
-    # Default to Django's default admin site, can be overridden
-    admin_site = admin.site
 
-    def get_admin_site(self):
+    # Default page size; clients may ask for up to COFFEE_ADMIN_SEARCH_MAX_LIMIT
+    max_results = 50
+
+    # Replaced per request when Server-Timing or metrics are enabled
+    timer = NULL_TIMER
+
+    # Share responses between concurrent identical requests (see
+    # COFFEE_ADMIN_COALESCE_SEARCHES)
+    coalesce = True
+
+    # Known model row counts; replaced per request when
+    # COFFEE_ADMIN_MODEL_COUNTS is enabled
+    counts = {}
+
+    # Result providers of the current request (see get_providers)
+    providers = PROVIDERS
+
+    def get_query(self):
         """
-        Get the admin site to search. Can be overridden for custom logic.
+        Return the normalized search query of the current request.
+        """
+        return self.request.GET.get('q', '').lower().strip()
+
+    def get_page(self, query):
+        """
+        Return ``(limit, offset)`` for the current request. ``limit`` defaults
+        to ``max_results`` and is capped by COFFEE_ADMIN_SEARCH_MAX_LIMIT; the
+        offset comes from the opaque ``cursor`` of a previous response.
+        Raises ValueError for a cursor that does not belong to ``query``.
+        """
+        try:
+            limit = int(self.request.GET.get('limit', self.max_results))
+        except ValueError:
+            limit = self.max_results
+        limit = max(1, min(limit, get_setting('SEARCH_MAX_LIMIT')))
+
+        cursor = self.request.GET.get('cursor')
+        offset = decode_cursor(cursor, query) if cursor else 0
+        return limit, offset
+
+    def get_providers(self):
+        """
+        Return the result providers asked for with ``?providers=``, a comma
+        separated list of 'catalog' and 'records'; both by default.
+        """
+        providers = PROVIDERS.intersection(self.request.GET.get('providers', '').split(','))
+        return frozenset(providers) or PROVIDERS
+
+    def get_stream_format(self):
         """
-        return self.admin_site
+        Return 'ndjson' or 'sse' if the client asked for a streaming response
+        (through ``?stream=`` or the Accept header), otherwise None.
+        """
+        stream = self.request.GET.get('stream')
+        if stream in STREAM_CONTENT_TYPES:
+            return stream
+        accept = self.request.headers.get('Accept', '')
+        for stream, content_type in STREAM_CONTENT_TYPES.items():
+            if content_type in accept:
+                return stream
+        return None
+
+    def get_throttled_response(self):
+        """
+        Return a 429 response if the user has used up their search requests
+        (see COFFEE_ADMIN_SEARCH_THROTTLE_RATE), otherwise None.
+        """
+        rate = get_setting('SEARCH_THROTTLE_RATE')
+        if not rate:
+            return None
+        retry_after = search_throttle.acquire(
+            self.request.user.pk, rate, get_setting('SEARCH_THROTTLE_BURST'),
+        )
+        if not retry_after:
+            return None
+        response = JsonResponse({'error': 'Too many requests.'}, status=429)
+        response['Retry-After'] = str(math.ceil(retry_after))
+        return response
 
     def get(self, request, *args, **kwargs):
-        query = request.GET.get('q', '').lower().strip()
-        results = []
-
-        # Get the admin site (supports custom implementations)
-        admin_site = self.get_admin_site()
-
-        # Get all registered models in admin
-        for model, model_admin in admin_site._registry.items():
-            try:
-                app_label = model._meta.app_label
-                model_name = model._meta.model_name
-
-                # Safely get verbose names with fallbacks
-                verbose_name = getattr(model._meta, 'verbose_name', model_name.replace('_', ' '))
-                verbose_name_plural = getattr(model._meta, 'verbose_name_plural', verbose_name + 's')
-
-                # Get the admin site's URL prefix
-                admin_url = getattr(admin_site, 'name', 'admin')
-
-                # Base URLs for this model
-                list_url = f'/{admin_url}/{app_label}/{model_name}/'
-                add_url = f'/{admin_url}/{app_label}/{model_name}/add/'
-
-                # Create result for the model list view
-                list_item = {
-                    'title': verbose_name_plural.title(),
-                    'subtitle': f'View all {verbose_name_plural}',
-                    'url': list_url,
-                    'icon': get_model_icon(app_label, model_name),
-                    'category': 'models',
-                    'app_label': app_label,
+        if get_setting('PROFILING') and request.GET.get('profile') and \
+                request.user.is_superuser:
+            # Imported here so that profiling costs nothing unless it is used
+            from .profiling import profile_response
+            return profile_response(request, lambda: self.search(request))
+        return self.search(request)
+
+    def search(self, request):
+        """
+        Return the search response for the current request.
+        """
+        throttled = self.get_throttled_response()
+        if throttled is not None:
+            return throttled
+        query = self.get_query()
+        try:
+            self.limit, self.offset = self.get_page(query)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        self.response_format = self.get_response_format()
+        self.providers = self.get_providers()
+        self.timer = start_timer()
+        try:
+            # The catalog is built once per site and permissions once per user
+            with self.timer.phase('catalog'):
+                catalog = get_catalog(self.get_admin_site())
+            with self.timer.phase('permissions'):
+                permitted = get_permitted_keys(request, catalog)
+            # Only counts computed earlier in the background; never a query here
+            self.counts = get_catalog_counts(catalog)
+
+            stream = self.get_stream_format()
+            if stream:
+                events = self.iter_search_events(catalog, permitted, query)
+                content = (encode_stream_event(event, stream) for event in events)
+                return self.get_streaming_response(content, stream)
+
+            with self.timer.phase('records'):
+                records = self.get_record_results(catalog, query)
+            response = self.get_search_response(catalog, permitted, query, records)
+        except BaseException:
+            # e.g. Http404 for an unknown site: the timer's query wrappers
+            # must not stay on the connection after the request
+            self.timer.finish()
+            raise
+        return self.finish_timing(response, query)
+
+    def finish_timing(self, response, query):
+        """
+        Stop the request timer, add the Server-Timing header to ``response``
+        and publish the request's metrics.
+        """
+        self.timer.finish()
+        self.timer.add_header(response)
+        self.timer.publish(type(self), self.request, query)
+        return response
+
+    def use_record_search(self, query):
+        """
+        Return True if ``query`` should also search records.
+        """
+        return 'records' in self.providers and get_setting('RECORD_SEARCH') and \
+            len(query) >= get_setting('RECORD_SEARCH_MIN_QUERY_LENGTH')
+
+    def get_record_results(self, catalog, query):
+        """
+        Return ``(results, partial)`` from the record search, or None when
+        record search is disabled, the query is too short or a later page
+        was requested (records are only listed on the first page).
+        """
+        if self.offset or not self.use_record_search(query):
+            return None
+        return RecordSearchProvider(catalog).search(self.request, query, self.limit)
+
+    def search_catalog(self, catalog, permitted, query):
+        """
+        Return ``(results, next_cursor)`` for the requested page of permitted
+        catalog entries. One extra entry is looked up to tell whether
+        another page exists; nothing beyond it is ranked or checked.
+        Requests without the catalog provider get no entries.
+        """
+        if 'catalog' not in self.providers:
+            return [], None
+        entries = catalog.search(
+            query, self.limit + 1, predicate=lambda entry: entry.is_permitted(permitted),
+            offset=self.offset,
+        )
+        next_cursor = None
+        if len(entries) > self.limit:
+            entries = entries[:self.limit]
+            next_cursor = encode_cursor(self.offset + self.limit, query)
+        results = [entry.as_dict() for entry in entries]
+        add_counts(entries, results, self.counts, permitted)
+        return results, next_cursor
+
+    def get_search_response(self, catalog, permitted, query, records=None):
+        """
+        Return the JSON response for ``query``. Without record results the
+        response is fully determined by the catalog and permissions, so it
+        gets an ETag and clients that already hold it get 304 Not Modified.
+        """
+        etag = None
+        response = None
+        if records is None:
+            # Identical queries with unchanged catalog and permissions get a 304
+            extra = (
+                query, str(self.limit), str(self.offset), self.response_format,
+                ','.join(sorted(self.providers)),
+            )
+            if self.counts:
+                extra += (get_counts_key(self.counts),)
+            etag = get_catalog_etag(catalog, permitted, *extra)
+            response = get_conditional_response(self.request, etag=etag)
+
+        if response is None:
+            def compute():
+                return self.encode_search(catalog, permitted, query, records)
+
+            if etag is not None and self.coalesce and get_setting('COALESCE_SEARCHES'):
+                # Same catalog, permissions and parameters: the same response
+                encoded, count = search_flights.do((id(catalog), etag), compute)
+            else:
+                encoded, count = compute()
+            self.timer.count_results(count)
+            response = encoded_response(encoded)
+
+        if etag is not None:
+            response['ETag'] = etag
+        patch_cache_control(
+            response, private=True, max_age=get_setting('SEARCH_CACHE_MAX_AGE'),
+        )
+        return response
+
+    def encode_search(self, catalog, permitted, query, records=None):
+        """
+        Return the encoded JSON body of the search response for ``query``
+        and its number of results.
+        """
+        with self.timer.phase('search'):
+            results, next_cursor = self.search_catalog(catalog, permitted, query)
+        partial = False
+        if records is not None:
+            record_results, partial = records
+            results.extend(record_results[:self.limit - len(results)])
+
+        with self.timer.phase('serialize'):
+            encoded = encode({
+                'results': format_results(results, self.response_format),
+                'query': query,
+                'count': len(results),
+                'partial': partial,
+                'next_cursor': next_cursor,
+            })
+        return encoded, len(results)
+
+    def iter_search_events(self, catalog, permitted, query):
+        """
+        Yield the search response as a series of event dicts: navigation
+        entries first, then record results per model as each query finishes,
+        and finally a ``done`` summary carrying the next page's cursor.
+
+        Metrics are published once the client has received the whole stream.
+        """
+        try:
+            with self.timer.phase('search'):
+                results, next_cursor = self.search_catalog(catalog, permitted, query)
+            count = len(results)
+            if 'catalog' in self.providers:
+                yield {
+                    'provider': 'catalog',
+                    'results': format_results(results, self.response_format),
                 }
 
-                # Check if user has add permission for this model
-                has_add_permission = model_admin.has_add_permission(request)
-
-                # Create result for add view only if user has permission
-                add_item = None
-                if has_add_permission:
-                    add_item = {
-                        'title': f'Add {verbose_name.title()}',
-                        'subtitle': f'Create a new {verbose_name}',
-                        'url': add_url,
-                        'icon': '➕',
-                        'category': 'actions',
-                        'app_label': app_label,
-                    }
-
-                # Filter results based on query
-                if not query:
-                    results.append(list_item)
-                    if add_item:
-                        results.append(add_item)
-                else:
-                    # Search in title, subtitle, and app label
-                    list_searchable = f"{list_item['title']} {list_item['subtitle']} {app_label}".lower()
-
-                    if query in list_searchable:
-                        results.append(list_item)
-
-                    if add_item:
-                        add_searchable = f"{add_item['title']} {add_item['subtitle']} {app_label}".lower()
-                        if query in add_searchable:
-                            results.append(add_item)
-            except Exception as e:
-                # Skip models that cause errors
-                continue
-
-        # Add admin home (use the admin site's name for the URL)
-        admin_url = getattr(admin_site, 'name', 'admin')
-        if not query or 'home' in query or 'admin' in query or 'index' in query:
-            results.insert(0, {
-                'title': 'Admin Home',
-                'subtitle': 'Django administration index',
-                'url': f'/{admin_url}/',
-                'icon': '🏠',
-                'category': 'navigation',
-                'app_label': 'admin',
+            partial = False
+            if not self.offset and self.use_record_search(query) and count < self.limit:
+                batches = RecordSearchProvider(catalog).iter_search(self.request, query)
+                for batch in batches:
+                    batch = batch[:self.limit - count]
+                    if batch:
+                        batch.sort(key=lambda result: rank_record(result, query))
+                        count += len(batch)
+                        yield {
+                            'provider': 'records',
+                            'results': format_results(batch, self.response_format),
+                        }
+                    if count >= self.limit:
+                        break
+                partial = batches.partial
+
+            self.timer.count_results(count)
+            yield {
+                'done': True,
+                'query': query,
+                'count': count,
+                'partial': partial,
+                'next_cursor': next_cursor,
+                # Longer queries may match records this one did not
+                'record_search': get_setting('RECORD_SEARCH'),
+            }
+        finally:
+            # Also stops query counting when the client disconnects early
+            self.timer.finish()
+        self.timer.publish(type(self), self.request, query)
+
+    def get_streaming_response(self, content, stream):
+        """
+        Wrap encoded search events in a StreamingHttpResponse for the
+        ``stream`` format ('ndjson' or 'sse').
+        """
+        response = StreamingHttpResponse(content, content_type=STREAM_CONTENT_TYPES[stream])
+        # Streamed results include live record data and must not be reused
+        patch_cache_control(response, private=True, no_cache=True)
+        # Ask proxies such as nginx not to buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        # Headers go out first, so only phases before the stream are included
+        self.timer.add_header(response)
+        return response
+
+
+class AsyncSearchAdminUrlsView(SearchAdminUrlsView):
+    """
+    Native async variant of SearchAdminUrlsView for ASGI deployments
+    (Django 4.1+).
+
+    Catalog filtering and serialization run on the event loop. Only work that
+    may block -- loading the user, building a catalog that is not loaded
+    yet, running uncached permission checks and, with
+    COFFEE_ADMIN_SHARE_PERMISSIONS set, reading the shared cache -- is handed
+    to a thread with sync_to_async, so launcher traffic does not occupy the
+    sync thread pool.
+
+    Streamed responses need Django 4.2+; on Django 4.1 requests asking for
+    a stream get the regular JSON response instead.
+
+    Example:
+        path('search/', AsyncSearchAdminUrlsView.as_view(admin_site=my_admin_site)),
+    """
+
+    # Responses are computed on the event loop, which must never block
+    # waiting for another thread; one loop cannot compute two at once anyway
+    coalesce = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        # UserPassesTestMixin.dispatch is sync and request.user may hit the DB
+        if not await sync_to_async(self.get_test_func())():
+            return await sync_to_async(self.handle_no_permission)()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        throttled = self.get_throttled_response()
+        if throttled is not None:
+            return throttled
+        query = self.get_query()
+        try:
+            self.limit, self.offset = self.get_page(query)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        self.response_format = self.get_response_format()
+        self.providers = self.get_providers()
+        # Queries run in other threads here, so they are not counted
+        self.timer = start_timer(count_queries=False)
+
+        with self.timer.phase('catalog'):
+            admin_site = self.get_admin_site()
+            catalog = get_loaded_catalog(admin_site)
+            if catalog is None:
+                # Building may take a while, read the shared cache or wait
+                # for another thread building the same catalog
+                catalog = await sync_to_async(get_catalog)(admin_site)
+        # Shared cache backends do blocking I/O (and DatabaseCache refuses
+        # to run on the event loop), so lookups that use one run in a thread
+        with self.timer.phase('permissions'):
+            if get_shared_permission_cache() is None:
+                permitted = get_cached_permitted_keys(request, catalog)
+                if permitted is None:
+                    permitted = await sync_to_async(compute_permitted_keys)(request, catalog)
+            else:
+                permitted = await sync_to_async(get_permitted_keys)(request, catalog)
+        self.counts = get_catalog_counts(catalog)
+
+        stream = self.get_stream_format() if ASYNC_STREAMING else None
+        if stream:
+            events = self.iter_search_events(catalog, permitted, query)
+            content = (encode_stream_event(event, stream) for event in events)
+            # Each batch is produced in a thread; the loop only relays them
+            return self.get_streaming_response(iterate_in_thread(content), stream)
+
+        # Record search queries the database, so it runs off the event loop
+        records = None
+        if get_setting('RECORD_SEARCH'):
+            with self.timer.phase('records'):
+                records = await sync_to_async(self.get_record_results)(catalog, query)
+
+        response = self.get_search_response(catalog, permitted, query, records)
+        return self.finish_timing(response, query)
+
+
+class CatalogView(StaffMemberRequiredMixin, AdminSiteMixin, ResponseFormatMixin, View):
+    """
+    Return every launcher entry the user may see, so the launcher can filter
+    locally instead of calling the search endpoint on each keystroke.
+
+    The response carries an ETag derived from the catalog version and the
+    user's permitted entries; clients revalidate with If-None-Match and get
+    304 Not Modified while neither has changed.
+    """
+
+    def get(self, request, *args, **kwargs):
+        catalog = get_catalog(self.get_admin_site())
+        permitted = get_permitted_keys(request, catalog)
+        response_format = self.get_response_format()
+        counts = get_catalog_counts(catalog)
+        # Verbose catalogs keep the ETag they had before compact responses
+        extra = () if response_format == 'verbose' else (response_format,)
+        if counts:
+            extra += (get_counts_key(counts),)
+        etag = get_catalog_etag(catalog, permitted, *extra)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            entries = [entry for entry in catalog if entry.is_permitted(permitted)]
+            results = [entry.as_dict() for entry in entries]
+            add_counts(entries, results, counts, permitted)
+            response = json_response({
+                'results': format_results(results, response_format),
+                'version': etag.strip('"'),
+                'count': len(results),
+                # Records are not in the catalog; tell the launcher to ask the server
+                'record_search': get_setting('RECORD_SEARCH'),
+                'record_search_min_length': get_setting('RECORD_SEARCH_MIN_QUERY_LENGTH'),
             })
 
-        # Limit results to prevent overwhelming the UI
-        max_results = 50
-        if len(results) > max_results:
-            results = results[:max_results]
-
-        return JsonResponse({
-            'results': results,
-            'query': query,
-            'count': len(results),
-        })
-
-
-def get_model_icon(app_label, model_name):
-    """
-    Return an icon emoji for a model based on common patterns.
-    """
-    icon_map = {
-        'auth': {
-            'user': '👤',
-            'group': '👥',
-            'permission': '🔐',
-        },
-        'contenttypes': {
-            'contenttype': '📋',
-        },
-        'sessions': {
-            'session': '🔑',
-        },
-        'sites': {
-            'site': '🌐',
-        },
-        'admin': {
-            'logentry': '📝',
-        },
-    }
-
-    # Try to find specific icon for this model
-    if app_label in icon_map and model_name in icon_map[app_label]:
-        return icon_map[app_label][model_name]
-
-    # Generic icons based on app
-    app_icons = {
-        'auth': '🔐',
-        'contenttypes': '📋',
-        'sessions': '🔑',
-        'sites': '🌐',
-        'admin': '⚙️',
-    }
-
-    if app_label in app_icons:
-        return app_icons[app_label]
-
-    # Default icon
-    return '📦'
+        response['ETag'] = etag
+        # Always revalidate; a 304 costs no catalog serialization
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def encode_stream_event(event, stream):
+    """
+    Serialize one search event as an NDJSON line or a Server-Sent Event.
+    """
+    data = dumps(event)
+    if stream == 'sse':
+        return f'event: {"done" if event.get("done") else "results"}\ndata: {data}\n\n'
+    return f'{data}\n'
+
+
+async def iterate_in_thread(iterator):
+    """
+    Asynchronously iterate a blocking ``iterator``, advancing it with
+    sync_to_async so database work stays off the event loop.
+    """
+    sentinel = object()
+    while True:
+        item = await sync_to_async(next)(iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
+
+def encode_cursor(offset, query):
+    """
+    Return an opaque cursor for the page of ``query`` results starting at
+    ``offset``.
+    """
+    digest = hashlib.sha1(query.encode()).hexdigest()[:8]
+    return urlsafe_base64_encode(f'{offset}:{digest}'.encode())
+
+
+def decode_cursor(cursor, query):
+    """
+    Return the offset encoded in ``cursor``. Raises ValueError if the cursor
+    is malformed or was issued for a different query.
+    """
+    try:
+        offset, digest = urlsafe_base64_decode(cursor).decode().split(':')
+        offset = int(offset)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    if offset < 0 or digest != hashlib.sha1(query.encode()).hexdigest()[:8]:
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    return offset
+
 
+def get_catalog_etag(catalog, permitted, *extra):
+    """
+    Return a quoted ETag identifying ``catalog`` as seen with ``permitted``
+    keys, optionally narrowed by ``extra`` strings such as the search query.
+
+    Unlike the permission fingerprint this only depends on content, so every
+    worker process produces the same ETag for the same user.
+    """
+    digest = hashlib.sha1(catalog.version.encode())
+    for key in sorted(permitted):
+        digest.update(key.encode())
+    for part in extra:
+        digest.update(b'\x1f' + part.encode())
+    return quote_etag(digest.hexdigest()[:16])
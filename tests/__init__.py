@@ -1,3 +1,15 @@
 """
 Tests for django-coffee-admin package
 """
+import django
+import pytest
+
+# Async class-based views (AsyncSearchAdminUrlsView) need Django 4.1
+requires_async_views = pytest.mark.skipif(
+    django.VERSION < (4, 1), reason='Async class-based views require Django 4.1+',
+)
+
+# StreamingHttpResponse takes async iterators from Django 4.2
+requires_async_streaming = pytest.mark.skipif(
+    django.VERSION < (4, 2), reason='Async streaming responses require Django 4.2+',
+)
@@ -0,0 +1,227 @@
+"""
+Benchmarks for the search endpoint against synthetic admin registries.
+
+Run from the repository root:
+
+    python -m tests.benchmarks --models 1000 --requests 200
+
+Every run registers ``--models`` dynamically created models on a fresh
+AdminSite and calls SearchAdminUrlsView as a superuser and as a staff user
+for an empty, a short and a long query. For each combination it reports
+latency percentiles, memory allocated per request (tracemalloc) and database
+queries per request. ``--permission-delay`` makes every ModelAdmin
+permission hook sleep to mimic expensive custom checks, and ``--cold``
+clears the permission cache before each request.
+"""
+import argparse
+import math
+import os
+import time
+import tracemalloc
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    import django
+
+    django.setup()
+
+from django.apps.registry import Apps  # noqa: E402
+from django.contrib.admin import AdminSite, ModelAdmin  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, models  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from coffee_admin.catalog import get_catalog, invalidate_catalog  # noqa: E402
+from coffee_admin.permissions import permission_cache  # noqa: E402
+from coffee_admin.views import SearchAdminUrlsView  # noqa: E402
+
+# Words combined into model names, e.g. "Customer Invoice 42"
+WORDS = (
+    'customer', 'invoice', 'order', 'product', 'shipment', 'supplier',
+    'warehouse', 'payment', 'refund', 'ticket', 'contract', 'employee',
+)
+
+QUERIES = {
+    'empty': '',
+    'short': 'cu',
+    'long': 'customer invoice 1',
+}
+
+PERCENTILES = (50, 90, 99)
+
+
+def create_models(count, app_label='benchmarks'):
+    """
+    Return ``count`` new model classes in an isolated app registry, so they
+    never leak into the project's own models.
+    """
+    registry = Apps()
+    created = []
+    for i in range(count):
+        name = f'{WORDS[i % len(WORDS)]} {WORDS[i // len(WORDS) % len(WORDS)]} {i}'
+        meta = type('Meta', (), {
+            'app_label': app_label,
+            'apps': registry,
+            'verbose_name': name,
+            'verbose_name_plural': name,
+        })
+        created.append(type(f'BenchmarkModel{i}', (models.Model,), {
+            '__module__': __name__,
+            'Meta': meta,
+        }))
+    return created
+
+
+def build_admin_site(model_count, permission_delay=0):
+    """
+    Return an AdminSite with ``model_count`` registered models. With a
+    ``permission_delay`` every permission hook sleeps that many seconds.
+    """
+    class BenchmarkModelAdmin(ModelAdmin):
+        def has_view_permission(self, request, obj=None):
+            if permission_delay:
+                time.sleep(permission_delay)
+            return super().has_view_permission(request, obj)
+
+        def has_add_permission(self, request):
+            if permission_delay:
+                time.sleep(permission_delay)
+            return super().has_add_permission(request)
+
+    site = AdminSite(name=f'benchmark_{model_count}')
+    for model in create_models(model_count):
+        site.register(model, BenchmarkModelAdmin)
+    return site
+
+
+def percentile(values, pct):
+    """
+    Return the nearest-rank ``pct`` percentile of ``values``.
+    """
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def measure(view, user_pk, query, requests, cold=False):
+    """
+    Call ``view`` ``requests`` times for ``query`` and return a result row.
+    Latency and allocations are measured in separate passes so tracemalloc
+    does not inflate the timings.
+    """
+    factory = RequestFactory()
+
+    def call():
+        request = factory.get('/admin/coffee/search/', {'q': query})
+        # A fresh user object per request, as the auth middleware would load
+        request.user = User.objects.get(pk=user_pk)
+        if cold:
+            permission_cache.clear()
+        return request
+
+    timings = []
+    query_counts = []
+    for _i in range(requests):
+        request = call()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = view(request)
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+        query_counts.append(len(queries))
+
+    allocations = []
+    for _i in range(requests):
+        request = call()
+        tracemalloc.start()
+        try:
+            view(request)
+            allocations.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    row = {
+        'query': query,
+        'requests': requests,
+        'max_ms': max(timings) * 1000,
+        'peak_kib': sum(allocations) / len(allocations) / 1024,
+        'queries': sum(query_counts) / len(query_counts),
+    }
+    for pct in PERCENTILES:
+        row[f'p{pct}_ms'] = percentile(timings, pct) * 1000
+    return row
+
+
+def run_benchmark(models=1000, requests=100, permission_delay=0, cold=False):
+    """
+    Run every user/query scenario and return ``(build_ms, rows)`` where
+    ``build_ms`` is the time to build the catalog and its search index.
+    """
+    site = build_admin_site(models, permission_delay)
+    view = SearchAdminUrlsView.as_view(admin_site=site)
+
+    invalidate_catalog(site)
+    started = time.perf_counter()
+    get_catalog(site).index
+    build_ms = (time.perf_counter() - started) * 1000
+
+    users = {
+        'superuser': User.objects.create_superuser(username=f'bench_admin_{models}'),
+        'staff': User.objects.create_user(username=f'bench_staff_{models}', is_staff=True),
+    }
+
+    rows = []
+    for user_label, user in users.items():
+        for query_label, query in QUERIES.items():
+            row = measure(view, user.pk, query, requests, cold=cold)
+            row['scenario'] = f'{user_label}/{query_label}'
+            rows.append(row)
+    return build_ms, rows
+
+
+def format_report(build_ms, rows):
+    """
+    Return the benchmark results as a plain-text table.
+    """
+    columns = [f'p{pct} ms' for pct in PERCENTILES] + ['max ms', 'peak KiB', 'queries']
+    lines = [
+        f'Catalog build: {build_ms:.1f} ms',
+        f'{"scenario":<18}' + ''.join(f'{column:>10}' for column in columns),
+    ]
+    for row in rows:
+        values = [row[f'p{pct}_ms'] for pct in PERCENTILES]
+        values += [row['max_ms'], row['peak_kib'], row['queries']]
+        lines.append(f'{row["scenario"]:<18}' + ''.join(f'{value:>10.2f}' for value in values))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', type=int, default=1000,
+                        help='Number of models registered on the admin site (default: 1000).')
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Requests per scenario (default: 100).')
+    parser.add_argument('--permission-delay', type=float, default=0,
+                        help='Seconds each ModelAdmin permission hook sleeps (default: 0).')
+    parser.add_argument('--cold', action='store_true',
+                        help='Clear the permission cache before every request.')
+    options = parser.parse_args(argv)
+
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    build_ms, rows = run_benchmark(
+        models=options.models,
+        requests=options.requests,
+        permission_delay=options.permission_delay,
+        cold=options.cold,
+    )
+    print(f'{options.models} models, {options.requests} requests per scenario'
+          f'{", cold permission cache" if options.cold else ""}')
+    print(format_report(build_ms, rows))
+
+
+if __name__ == '__main__':
+    main()
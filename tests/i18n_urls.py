@@ -0,0 +1,10 @@
+"""
+URLconf mounting the admin under i18n_patterns(), for the URL table tests
+"""
+from django.conf.urls.i18n import i18n_patterns
+from django.contrib import admin
+from django.urls import path
+
+urlpatterns = i18n_patterns(
+    path('admin/', admin.site.urls),
+)
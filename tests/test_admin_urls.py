@@ -0,0 +1,118 @@
+"""
+Tests for the memoized admin URL tables
+"""
+import pytest
+from django.contrib import admin
+from django.contrib.admin import AdminSite
+from django.contrib.admin.utils import quote
+from django.contrib.auth.models import Group, User
+from django.test import override_settings
+from django.urls import path, reverse, set_script_prefix
+from django.utils import translation
+
+from coffee_admin.admin_urls import AdminURLTable, get_url_table
+from coffee_admin.catalog import get_catalog
+
+# Used as ROOT_URLCONF to mount the admin somewhere else
+urlpatterns = [
+    path('backoffice/', admin.site.urls),
+]
+
+
+@pytest.fixture
+def script_prefix():
+    """Serve the current thread as if mounted under /portal/"""
+    set_script_prefix('/portal/')
+    yield '/portal/'
+    set_script_prefix('/')
+
+
+@pytest.mark.unit
+class TestAdminURLTable:
+    """Tests for URL reversal"""
+
+    def test_urls_match_reverse(self):
+        urls = AdminURLTable(admin.site)
+
+        assert urls.index == reverse('admin:index')
+        assert urls.changelist(User) == reverse('admin:auth_user_changelist')
+        assert urls.add(User) == reverse('admin:auth_user_add')
+
+    def test_change_url_quotes_primary_key(self):
+        urls = AdminURLTable(admin.site)
+
+        assert urls.change(User, 'a/b') == reverse('admin:auth_user_change', args=(quote('a/b'),))
+        assert urls.change(User, 42) == '/admin/auth/user/42/change/'
+
+    def test_unmounted_site_falls_back_to_site_name(self):
+        site = AdminSite(name='elsewhere')
+        site.register(Group)
+        urls = AdminURLTable(site)
+
+        assert urls.index == '/elsewhere/'
+        assert urls.changelist(Group) == '/elsewhere/auth/group/'
+        assert urls.change(Group, 3) == '/elsewhere/auth/group/3/change/'
+
+    def test_model_registered_later(self):
+        site = AdminSite(name='elsewhere')
+        urls = AdminURLTable(site)
+
+        assert urls.add(Group) == '/elsewhere/auth/group/add/'
+
+    def test_script_prefix(self, script_prefix):
+        urls = AdminURLTable(admin.site, prefix=script_prefix)
+
+        assert urls.changelist(User) == '/portal/admin/auth/user/'
+
+    @override_settings(ROOT_URLCONF='tests.test_admin_urls')
+    def test_custom_mount_point(self):
+        urls = AdminURLTable(admin.site)
+
+        assert urls.changelist(User) == '/backoffice/auth/user/'
+
+
+@pytest.mark.unit
+class TestURLTableCache:
+    """Tests for URL table memoization and invalidation"""
+
+    def test_table_is_reused(self):
+        assert get_url_table(admin.site) is get_url_table(admin.site)
+
+    def test_table_per_script_prefix(self, script_prefix):
+        urls = get_url_table(admin.site)
+        set_script_prefix('/')
+
+        assert get_url_table(admin.site) is not urls
+        assert urls.index == '/portal/admin/'
+
+    def test_catalog_per_script_prefix(self, script_prefix):
+        catalog = get_catalog(admin.site)
+
+        assert catalog.home.url == '/portal/admin/'
+        assert all(entry.url.startswith('/portal/admin/') for entry in catalog)
+
+    def test_registry_change_rebuilds_table(self):
+        site = AdminSite(name='elsewhere')
+        urls = get_url_table(site)
+        site.register(Group)
+
+        assert get_url_table(site) is not urls
+        assert Group in get_url_table(site).models
+
+    def test_urlconf_change_rebuilds_catalog(self):
+        assert get_catalog(admin.site).home.url == '/admin/'
+
+        with override_settings(ROOT_URLCONF='tests.test_admin_urls'):
+            assert get_catalog(admin.site).home.url == '/backoffice/'
+
+        assert get_catalog(admin.site).home.url == '/admin/'
+
+    @override_settings(ROOT_URLCONF='tests.i18n_urls')
+    def test_table_per_language(self):
+        with translation.override('nl'):
+            dutch = get_url_table(admin.site)
+        with translation.override('en'):
+            english = get_url_table(admin.site)
+
+        assert dutch.index == '/nl/admin/'
+        assert english.index == '/en/admin/'
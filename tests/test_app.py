@@ -51,6 +51,10 @@ class TestStaticFiles:
         js_file = os.path.join(static_dir, 'js', 'coffee_admin.js')
         assert os.path.exists(js_file), f"JS file not found at {js_file}"
 
+        # Check for the loader
+        loader_file = os.path.join(static_dir, 'js', 'loader.js')
+        assert os.path.exists(loader_file), f"JS file not found at {loader_file}"
+
 
 @pytest.mark.unit
 class TestTemplates:
@@ -87,3 +91,22 @@ class TestTemplates:
 
         # Should include JS
         assert 'coffee_admin.js' in content
+
+        # Should only load the loader eagerly
+        assert 'loader.js' in content
+
+
+@pytest.mark.django_db
+class TestLazyLoading:
+    """Tests for the admin page markup"""
+
+    def test_admin_page_loads_only_the_loader(self, client, superuser):
+        """Admin pages should defer the launcher files to loader.js"""
+        client.force_login(superuser)
+        content = client.get('/admin/').content.decode()
+
+        assert 'src="/static/coffee_admin/js/loader.js"' in content
+        assert 'data-script="/static/coffee_admin/js/coffee_admin.js"' in content
+        assert 'data-style="/static/coffee_admin/css/launcher.css"' in content
+        assert 'data-site="admin"' in content
+        assert 'rel="stylesheet" href="/static/coffee_admin/css/launcher.css"' not in content
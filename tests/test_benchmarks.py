@@ -0,0 +1,55 @@
+"""
+Smoke tests for the search benchmark suite (tests/benchmarks.py)
+"""
+import pytest
+
+from tests.benchmarks import QUERIES, build_admin_site, format_report, percentile, run_benchmark
+
+
+@pytest.mark.benchmark
+class TestBenchmarkHelpers:
+    """Tests for the synthetic registry and reporting helpers"""
+
+    def test_percentile_uses_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+
+        assert percentile(values, 50) == 3
+        assert percentile(values, 99) == 5
+        assert percentile([7], 90) == 7
+
+    def test_admin_site_registers_synthetic_models(self):
+        site = build_admin_site(30)
+
+        assert len(site._registry) == 30
+        assert {model._meta.app_label for model in site._registry} == {'benchmarks'}
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+class TestRunBenchmark:
+    """Tests for a small end-to-end benchmark run"""
+
+    def test_reports_every_scenario(self):
+        build_ms, rows = run_benchmark(models=24, requests=2)
+
+        assert build_ms > 0
+        assert [row['scenario'] for row in rows] == [
+            f'{user}/{query}' for user in ('superuser', 'staff') for query in QUERIES
+        ]
+        for row in rows:
+            assert row['p50_ms'] <= row['p99_ms'] <= row['max_ms']
+            assert row['peak_kib'] > 0
+            assert row['queries'] >= 0
+
+    def test_cold_permission_cache(self):
+        _build_ms, rows = run_benchmark(models=12, requests=2, cold=True)
+        staff = [row for row in rows if row['scenario'].startswith('staff/')]
+
+        # Without the permission cache every staff request loads permissions
+        assert all(row['queries'] > 0 for row in staff)
+
+    def test_format_report(self):
+        report = format_report(1.5, run_benchmark(models=12, requests=1)[1])
+
+        assert report.splitlines()[0] == 'Catalog build: 1.5 ms'
+        assert 'superuser/long' in report
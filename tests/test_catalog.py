@@ -0,0 +1,210 @@
+"""
+Tests for the per-AdminSite search catalog
+"""
+import pytest
+from django.contrib import admin
+from django.contrib.admin import AdminSite
+from django.contrib.auth.models import Group, User
+from django.http import HttpResponse
+from django.urls import path
+
+from coffee_admin.catalog import AdminCatalog, get_catalog, invalidate_catalog
+
+
+def noop_view(request):
+    return HttpResponse()
+
+
+class ReportsAdminSite(AdminSite):
+    def get_urls(self):
+        return [
+            path('reports/', noop_view, name='reports'),
+            path('reports/<int:year>/', noop_view, name='yearly_report'),
+        ] + super().get_urls()
+
+
+class ImportGroupAdmin(admin.ModelAdmin):
+    def get_urls(self):
+        return [
+            path('import/', noop_view, name='auth_group_import'),
+        ] + super().get_urls()
+
+
+@pytest.mark.unit
+class TestAdminCatalog:
+    """Tests for AdminCatalog construction"""
+
+    def test_catalog_contains_home_first(self):
+        """The admin index entry should come first"""
+        catalog = AdminCatalog(admin.site)
+        home = next(iter(catalog))
+
+        assert home.title == 'Admin Home'
+        assert home.url == '/admin/'
+        assert home.permission is None
+
+    def test_catalog_contains_list_and_add_entries(self):
+        """Every registered model gets a list entry and an add entry"""
+        catalog = AdminCatalog(admin.site)
+        titles = {entry.title for entry in catalog}
+
+        assert 'Users' in titles
+        assert 'Add User' in titles
+        assert len(catalog.entries) == 2 * len(admin.site._registry)
+
+    def test_add_entries_require_add_permission(self):
+        """Add entries are permission-gated, list entries are not"""
+        catalog = AdminCatalog(admin.site)
+
+        for entry in catalog.entries:
+            if entry.category == 'actions':
+                assert entry.permission == 'add'
+            else:
+                assert entry.permission is None
+
+    def test_searchable_text_is_lowercased(self):
+        """Searchable text should be precomputed in lowercase"""
+        catalog = AdminCatalog(admin.site)
+
+        for entry in catalog:
+            assert entry.searchable == entry.searchable.lower()
+
+    def test_custom_site_urls_use_site_name(self):
+        """URLs should be prefixed with the site's name"""
+        site = AdminSite(name='custom_admin')
+        site.register(Group)
+
+        catalog = AdminCatalog(site)
+
+        assert catalog.home.url == '/custom_admin/'
+        assert '/custom_admin/auth/group/' in [entry.url for entry in catalog]
+
+
+@pytest.mark.unit
+class TestCatalogCache:
+    """Tests for catalog caching and invalidation"""
+
+    def test_catalog_is_reused(self):
+        """get_catalog should return the same object for repeated calls"""
+        invalidate_catalog(admin.site)
+
+        assert get_catalog(admin.site) is get_catalog(admin.site)
+
+    def test_register_invalidates_catalog(self):
+        """Registering a model should rebuild the site's catalog"""
+        site = AdminSite(name='hooked_admin')
+        site.register(Group)
+        before = get_catalog(site)
+
+        site.register(User)
+        after = get_catalog(site)
+
+        assert after is not before
+        assert 'Users' in [entry.title for entry in after]
+
+    def test_unregister_invalidates_catalog(self):
+        """Unregistering a model should rebuild the site's catalog"""
+        site = AdminSite(name='hooked_admin')
+        site.register(Group)
+        site.register(User)
+        before = get_catalog(site)
+
+        site.unregister(User)
+        after = get_catalog(site)
+
+        assert after is not before
+        assert 'Users' not in [entry.title for entry in after]
+
+    def test_invalidation_is_per_site(self):
+        """Changing one site's registry should not rebuild another's catalog"""
+        site = AdminSite(name='other_admin')
+        default_catalog = get_catalog(admin.site)
+
+        site.register(Group)
+
+        assert get_catalog(admin.site) is default_catalog
+
+
+@pytest.mark.unit
+class TestPageEntries:
+    """Tests for app index and named view entries"""
+
+    def test_app_index_pages(self):
+        catalog = AdminCatalog(admin.site)
+        apps = {entry.title: entry for entry in catalog.pages if entry.category == 'apps'}
+
+        assert apps['Authentication and Authorization'].url == '/admin/auth/'
+        assert apps['Authentication and Authorization'].permission is None
+
+    def test_builtin_pages(self):
+        catalog = AdminCatalog(admin.site)
+        pages = {entry.title: entry.url for entry in catalog.pages if entry.category == 'pages'}
+
+        assert pages == {'Change Password': '/admin/password_change/'}
+
+    def test_pages_follow_model_entries(self):
+        catalog = AdminCatalog(admin.site)
+
+        assert list(catalog)[-len(catalog.pages):] == catalog.pages
+        assert len(catalog) == len(list(catalog))
+
+    def test_custom_site_views(self):
+        site = ReportsAdminSite(name='reports_admin')
+        site.register(Group)
+
+        pages = {entry.title: entry for entry in AdminCatalog(site).pages}
+
+        assert pages['Reports'].url == '/reports_admin/reports/'
+        # Views that take arguments cannot be linked to
+        assert 'Yearly Report' not in pages
+
+    def test_model_admin_views_require_view_permission(self):
+        site = AdminSite(name='import_admin')
+        site.register(Group, ImportGroupAdmin)
+
+        pages = {entry.title: entry for entry in AdminCatalog(site).pages}
+
+        assert pages['Import Groups'].url == '/import_admin/auth/group/import/'
+        assert pages['Import Groups'].permission == 'view'
+        assert pages['Import Groups'].permission_key == 'auth.group:view'
+        assert 'Auth Group Changelist' not in pages
+
+
+@pytest.mark.unit
+class TestSharedEntries:
+    """Tests for entry data shared across sites"""
+
+    def test_sites_share_entry_data(self):
+        first = AdminSite(name='first_admin')
+        second = AdminSite(name='second_admin')
+        first.register(Group)
+        second.register(Group)
+
+        first_groups = next(e for e in AdminCatalog(first).entries if e.title == 'Groups')
+        second_groups = next(e for e in AdminCatalog(second).entries if e.title == 'Groups')
+
+        assert first_groups.data is second_groups.data
+        assert first_groups.url == '/first_admin/auth/group/'
+        assert second_groups.url == '/second_admin/auth/group/'
+
+    def test_permission_uses_site_model_admin(self, authenticated_staff_request):
+        class OpenGroupAdmin(admin.ModelAdmin):
+            def has_add_permission(self, request):
+                return True
+
+        open_site = AdminSite(name='open_admin')
+        open_site.register(Group, OpenGroupAdmin)
+        closed_site = AdminSite(name='restricted_admin')
+        closed_site.register(Group)
+
+        def add_entry(site):
+            return next(e for e in AdminCatalog(site).entries if e.permission == 'add')
+
+        assert add_entry(open_site).has_permission(authenticated_staff_request)
+        assert not add_entry(closed_site).has_permission(authenticated_staff_request)
+
+    def test_entries_are_compact(self):
+        entry = AdminCatalog(admin.site).home
+
+        assert not hasattr(entry, '__dict__')
+        assert entry.searchable == 'admin home django administration index admin home index'
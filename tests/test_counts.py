@@ -0,0 +1,239 @@
+"""
+Tests for the row-count badges on model results
+"""
+import json
+
+import pytest
+from django.contrib import admin
+from django.contrib.auth.models import Group, Permission, User
+from django.db import connection
+
+from coffee_admin import counts as counts_module
+from coffee_admin.catalog import get_catalog
+from coffee_admin.counts import (
+    clear_counts,
+    count_rows,
+    estimate_rows,
+    get_counts,
+    refresh_counts,
+)
+from coffee_admin.permissions import compute_permitted_keys, get_view_key
+from coffee_admin.serializers import compact_results, expand_results
+
+
+class QueuedExecutor:
+    """Stand-in for the count pool that runs submitted refreshes on demand"""
+
+    def __init__(self):
+        self.queue = []
+
+    def submit(self, run, func, *args):
+        # Skip run_in_worker, which would close the test transaction's connection
+        self.queue.append((func, args))
+
+    def run(self):
+        queue, self.queue = self.queue, []
+        for func, args in queue:
+            func(*args)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = QueuedExecutor()
+    monkeypatch.setattr(counts_module, 'get_executor', lambda: executor)
+    clear_counts()
+    yield executor
+    clear_counts()
+
+
+@pytest.fixture
+def model_counts(settings, executor):
+    settings.COFFEE_ADMIN_MODEL_COUNTS = True
+    return executor
+
+
+def search(client, query, **params):
+    return client.get('/admin/coffee/search/', {'q': query, **params})
+
+
+def result_counts(response):
+    return {
+        result['title']: result.get('count')
+        for result in json.loads(response.content)['results']
+    }
+
+
+@pytest.mark.django_db
+class TestCounting:
+    """Tests for estimating and counting rows"""
+
+    def test_sqlite_without_statistics(self):
+        assert estimate_rows(Group, 'default') is None
+
+    def test_sqlite_statistics(self):
+        Group.objects.bulk_create(Group(name=f'group {i}') for i in range(3))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        assert estimate_rows(Group, 'default') == 3
+
+    def test_small_tables_are_counted_exactly(self, monkeypatch):
+        monkeypatch.setattr(counts_module, 'estimate_rows', lambda model, using: 5000)
+        Group.objects.create(name='acme')
+
+        assert count_rows(Group) == 1
+
+    def test_large_tables_use_the_estimate(self, settings, monkeypatch):
+        settings.COFFEE_ADMIN_MODEL_COUNTS_EXACT_BELOW = 1000
+        monkeypatch.setattr(counts_module, 'estimate_rows', lambda model, using: 2300000)
+
+        assert count_rows(Group) == 2300000
+
+    def test_failed_count_is_not_shown(self, executor, monkeypatch):
+        def fail(model):
+            raise RuntimeError('broken')
+
+        monkeypatch.setattr(counts_module, 'count_rows', fail)
+        refresh_counts([Group])
+
+        assert get_counts([Group]) == {}
+
+
+@pytest.mark.django_db
+class TestCountCache:
+    """Tests for counts cached and refreshed off the request path"""
+
+    def test_first_lookup_only_schedules(self, executor, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert get_counts([Group, User]) == {}
+
+        assert len(executor.queue) == 1
+
+    def test_refreshed_counts_are_returned(self, executor):
+        Group.objects.create(name='acme')
+        get_counts([Group])
+        executor.run()
+
+        assert get_counts([Group]) == {'auth.group': 1}
+        assert executor.queue == []
+
+    def test_pending_counts_are_scheduled_once(self, executor):
+        get_counts([Group])
+        get_counts([Group])
+
+        assert len(executor.queue) == 1
+
+    def test_expired_counts_are_served_while_refreshed(self, executor, settings):
+        settings.COFFEE_ADMIN_MODEL_COUNTS_TTL = -1
+        get_counts([Group])
+        executor.run()
+        Group.objects.create(name='acme')
+
+        assert get_counts([Group]) == {'auth.group': 0}
+        executor.run()
+        assert get_counts([Group]) == {'auth.group': 1}
+
+
+@pytest.mark.django_db
+class TestCountBadges:
+    """Tests for counts attached to search and catalog results"""
+
+    def test_disabled_by_default(self, client, superuser, executor):
+        client.force_login(superuser)
+
+        response = search(client, 'group')
+
+        assert result_counts(response)['Groups'] is None
+        assert executor.queue == []
+
+    def test_counts_appear_once_computed(self, client, superuser, model_counts):
+        client.force_login(superuser)
+        Group.objects.create(name='acme')
+
+        assert result_counts(search(client, 'group'))['Groups'] is None
+        model_counts.run()
+        counts = result_counts(search(client, 'group'))
+
+        assert counts['Groups'] == 1
+        assert counts['Add Group'] is None
+
+    def test_counts_need_view_permission(self, client, staff_user, model_counts):
+        client.force_login(staff_user)
+        search(client, 'user')
+        model_counts.run()
+
+        assert result_counts(search(client, 'user'))['Users'] is None
+
+        staff_user.user_permissions.add(Permission.objects.get(codename='view_user'))
+        client.force_login(User.objects.get(pk=staff_user.pk))
+
+        assert result_counts(search(client, 'user'))['Users'] == 1
+
+    def test_view_permission_is_only_checked_with_counts(
+        self, authenticated_superuser_request, settings,
+    ):
+        catalog = get_catalog(admin.site)
+
+        permitted = compute_permitted_keys(authenticated_superuser_request, catalog)
+        assert get_view_key(User) not in permitted
+
+        settings.COFFEE_ADMIN_MODEL_COUNTS = True
+        permitted = compute_permitted_keys(authenticated_superuser_request, catalog)
+        assert get_view_key(User) in permitted
+
+    def test_etag_follows_counts(self, client, superuser, model_counts, settings):
+        settings.COFFEE_ADMIN_MODEL_COUNTS_TTL = -1
+        client.force_login(superuser)
+        search(client, 'group')
+        model_counts.run()
+        etag = search(client, 'group')['ETag']
+        Group.objects.create(name='acme')
+        model_counts.run()
+
+        response = search(client, 'group', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert result_counts(response)['Groups'] == 1
+
+    def test_compact_format(self, client, superuser, model_counts):
+        client.force_login(superuser)
+        search(client, 'group')
+        model_counts.run()
+
+        data = json.loads(search(client, 'group', format='compact').content)
+        results = {result['title']: result for result in expand_results(data['results'])}
+
+        assert 'count' in data['results']['fields']
+        assert results['Groups']['count'] == 0
+        assert 'count' not in results['Add Group']
+
+    def test_catalog(self, client, superuser, model_counts):
+        client.force_login(superuser)
+        client.get('/admin/coffee/catalog/')
+        model_counts.run()
+
+        data = json.loads(client.get('/admin/coffee/catalog/').content)
+        counts = {result['title']: result.get('count') for result in data['results']}
+
+        assert counts['Users'] == 1
+        assert counts['Admin Home'] is None
+
+
+@pytest.mark.unit
+class TestCompactCounts:
+    """Tests for the optional count column of compact results"""
+
+    def test_column_is_left_out_without_counts(self):
+        compact = compact_results([{'title': 'Groups'}])
+
+        assert 'count' not in compact['fields']
+
+    def test_round_trip(self):
+        results = [
+            {'title': 'Groups', 'subtitle': '', 'url': '/g/', 'icon': 'x',
+             'category': 'models', 'app_label': 'auth', 'count': 3},
+            {'title': 'Add Group', 'subtitle': '', 'url': '/g/add/', 'icon': 'y',
+             'category': 'actions', 'app_label': 'auth'},
+        ]
+
+        assert expand_results(compact_results(results)) == results
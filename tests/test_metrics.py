@@ -0,0 +1,157 @@
+"""
+Tests for search request timing and metrics hooks
+"""
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+
+from coffee_admin.metrics import (
+    NULL_TIMER,
+    SearchTimer,
+    get_metrics_callback,
+    search_request_finished,
+    start_timer,
+)
+from coffee_admin.views import AsyncSearchAdminUrlsView
+from tests import requires_async_views
+
+collected = []
+
+
+def collect(**metrics):
+    collected.append(metrics)
+
+
+def fail(**metrics):
+    raise RuntimeError('collector is down')
+
+
+@pytest.fixture
+def received():
+    """Metrics sent through the search_request_finished signal"""
+    calls = []
+
+    def receiver(sender, **kwargs):
+        calls.append(kwargs)
+
+    search_request_finished.connect(receiver)
+    yield calls
+    search_request_finished.disconnect(receiver)
+
+
+@pytest.mark.unit
+class TestTimer:
+    """Tests for SearchTimer and NULL_TIMER"""
+
+    def test_disabled_by_default(self):
+        assert start_timer() is NULL_TIMER
+
+    def test_enabled_by_server_timing(self, settings):
+        settings.COFFEE_ADMIN_SERVER_TIMING = True
+
+        assert isinstance(start_timer(), SearchTimer)
+
+    def test_enabled_by_signal_receiver(self, received):
+        assert isinstance(start_timer(), SearchTimer)
+
+    def test_phases_accumulate(self):
+        timer = SearchTimer(count_queries=False)
+        with timer.phase('search'):
+            pass
+        first = timer.timings['search']
+        with timer.phase('search'):
+            pass
+
+        assert timer.timings['search'] >= first
+        assert timer.query_count is None
+
+    @pytest.mark.django_db
+    def test_counts_queries_until_finished(self):
+        timer = SearchTimer()
+        User.objects.count()
+        timer.finish()
+        User.objects.count()
+
+        assert timer.query_count == 1
+        assert 'total' in timer.timings
+
+    def test_callback_from_dotted_path(self, settings):
+        settings.COFFEE_ADMIN_METRICS_CALLBACK = 'tests.test_metrics.collect'
+
+        assert get_metrics_callback() is collect
+
+
+@pytest.mark.django_db
+class TestSearchViewMetrics:
+    """Tests for metrics emitted by the search views"""
+
+    def test_no_server_timing_header_by_default(self, client, staff_user):
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert not response.has_header('Server-Timing')
+
+    def test_server_timing_header(self, client, staff_user, settings):
+        settings.COFFEE_ADMIN_SERVER_TIMING = True
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        phases = [part.split(';')[0] for part in response['Server-Timing'].split(', ')]
+        assert phases == ['catalog', 'permissions', 'records', 'search', 'serialize', 'total']
+
+    def test_failed_request_stops_counting_queries(self, client, staff_user, settings):
+        settings.COFFEE_ADMIN_SERVER_TIMING = True
+        client.force_login(staff_user)
+        wrappers = len(connection.execute_wrappers)
+
+        for _ in range(3):
+            assert client.get('/admin/coffee/search/?q=user&site=nope').status_code == 404
+
+        assert len(connection.execute_wrappers) == wrappers
+
+    def test_signal_receives_metrics(self, client, staff_user, received):
+        client.force_login(staff_user)
+        client.get('/admin/coffee/search/?q=user')
+
+        (metrics,) = received
+        assert metrics['query'] == 'user'
+        assert metrics['result_count'] == 1
+        assert metrics['query_count'] >= 0
+        assert metrics['timings']['total'] >= metrics['timings']['search']
+
+    def test_callback_receives_metrics(self, client, staff_user, settings):
+        settings.COFFEE_ADMIN_METRICS_CALLBACK = collect
+        collected.clear()
+        client.force_login(staff_user)
+        client.get('/admin/coffee/search/?q=user')
+
+        assert [metrics['query'] for metrics in collected] == ['user']
+
+    def test_failing_callback_is_ignored(self, client, staff_user, settings):
+        settings.COFFEE_ADMIN_METRICS_CALLBACK = fail
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert response.status_code == 200
+
+    def test_stream_publishes_after_last_event(self, client, staff_user, settings, received):
+        settings.COFFEE_ADMIN_SERVER_TIMING = True
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user&stream=ndjson')
+
+        assert response['Server-Timing'].startswith('catalog;dur=')
+        assert received == []
+        b''.join(response.streaming_content)
+        assert received[0]['result_count'] == 1
+
+    @requires_async_views
+    def test_async_view_does_not_count_queries(self, request_factory, staff_user, received):
+        request = request_factory.get('/admin/coffee/search/?q=user')
+        request.user = staff_user
+
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(request)
+
+        assert response.status_code == 200
+        assert received[0]['query_count'] is None
+        assert received[0]['result_count'] == 1
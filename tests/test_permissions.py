@@ -0,0 +1,160 @@
+"""
+Tests for the per-user permission cache
+"""
+import pytest
+from django.contrib import admin
+from django.contrib.auth.models import Group, Permission
+from django.test import override_settings
+
+from coffee_admin.catalog import get_catalog
+from coffee_admin.permissions import (
+    PermissionCache,
+    get_permission_fingerprint,
+    get_permitted_keys,
+    permission_cache,
+)
+
+
+@pytest.fixture
+def count_add_checks(monkeypatch):
+    """Count calls to has_add_permission on the default admin site"""
+    calls = []
+    for model_admin in admin.site._registry.values():
+        original = model_admin.has_add_permission
+
+        def counted(request, original=original):
+            calls.append(request)
+            return original(request)
+
+        monkeypatch.setattr(model_admin, 'has_add_permission', counted)
+    return calls
+
+
+@pytest.mark.unit
+class TestPermissionCacheLRU:
+    """Tests for the PermissionCache container"""
+
+    def test_get_missing_returns_none(self):
+        assert PermissionCache().get(('v', 1, 'f')) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = PermissionCache()
+        cache.set(('v', 1, 'f'), frozenset(), maxsize=2)
+        cache.set(('v', 2, 'f'), frozenset(), maxsize=2)
+        cache.get(('v', 1, 'f'))
+        cache.set(('v', 3, 'f'), frozenset(), maxsize=2)
+
+        assert cache.get(('v', 1, 'f')) is not None
+        assert cache.get(('v', 2, 'f')) is None
+        assert len(cache) == 2
+
+    def test_invalidate_user(self):
+        cache = PermissionCache()
+        cache.set(('v', 1, 'f'), frozenset(), maxsize=10)
+        cache.set(('v', 2, 'f'), frozenset(), maxsize=10)
+
+        cache.invalidate_user(1)
+
+        assert cache.get(('v', 1, 'f')) is None
+        assert cache.get(('v', 2, 'f')) is not None
+
+
+@pytest.mark.django_db
+@pytest.mark.permissions
+class TestGetPermittedKeys:
+    """Tests for cached permission evaluation"""
+
+    def test_superuser_may_add_users(self, authenticated_superuser_request):
+        catalog = get_catalog(admin.site)
+
+        assert 'auth.user:add' in get_permitted_keys(authenticated_superuser_request, catalog)
+
+    def test_staff_without_permissions_may_not_add(self, authenticated_staff_request):
+        catalog = get_catalog(admin.site)
+
+        assert get_permitted_keys(authenticated_staff_request, catalog) == frozenset()
+
+    def test_repeat_lookups_skip_permission_checks(
+        self, authenticated_staff_request, count_add_checks
+    ):
+        catalog = get_catalog(admin.site)
+
+        get_permitted_keys(authenticated_staff_request, catalog)
+        checks = len(count_add_checks)
+        get_permitted_keys(authenticated_staff_request, catalog)
+
+        assert checks > 0
+        assert len(count_add_checks) == checks
+
+    @override_settings(COFFEE_ADMIN_PERMISSION_CACHE_SIZE=0)
+    def test_cache_can_be_disabled(self, authenticated_staff_request, count_add_checks):
+        catalog = get_catalog(admin.site)
+
+        get_permitted_keys(authenticated_staff_request, catalog)
+        checks = len(count_add_checks)
+        get_permitted_keys(authenticated_staff_request, catalog)
+
+        assert len(count_add_checks) == 2 * checks
+
+    def test_user_permission_change_invalidates(self, request_factory, staff_user):
+        catalog = get_catalog(admin.site)
+        request = request_factory.get('/')
+        request.user = staff_user
+        assert 'auth.user:add' not in get_permitted_keys(request, catalog)
+
+        staff_user.user_permissions.add(Permission.objects.get(codename='add_user'))
+        # Reload the user so Django's own per-instance permission cache is fresh
+        request.user = type(staff_user).objects.get(pk=staff_user.pk)
+
+        assert 'auth.user:add' in get_permitted_keys(request, catalog)
+
+    def test_group_permission_change_invalidates(self, request_factory, staff_user):
+        catalog = get_catalog(admin.site)
+        group = Group.objects.create(name='editors')
+        staff_user.groups.add(group)
+        request = request_factory.get('/')
+        request.user = type(staff_user).objects.get(pk=staff_user.pk)
+        assert 'auth.group:add' not in get_permitted_keys(request, catalog)
+
+        group.permissions.add(Permission.objects.get(codename='add_group'))
+        request.user = type(staff_user).objects.get(pk=staff_user.pk)
+
+        assert 'auth.group:add' in get_permitted_keys(request, catalog)
+
+    def test_invalidation_during_checks_is_not_lost(
+        self, authenticated_staff_request, count_add_checks, monkeypatch
+    ):
+        catalog = get_catalog(admin.site)
+        user_id = authenticated_staff_request.user.pk
+        model_admin = admin.site._registry[Group]
+        original = model_admin.has_add_permission
+
+        def invalidating(request):
+            # A permission change saved while the checks are still running
+            permission_cache.invalidate_user(user_id)
+            return original(request)
+
+        monkeypatch.setattr(model_admin, 'has_add_permission', invalidating)
+        get_permitted_keys(authenticated_staff_request, catalog)
+        monkeypatch.setattr(model_admin, 'has_add_permission', original)
+        checks = len(count_add_checks)
+        get_permitted_keys(authenticated_staff_request, catalog)
+
+        assert len(count_add_checks) > checks
+
+    def test_fingerprint_changes_on_user_save(self, staff_user):
+        before = get_permission_fingerprint(staff_user)
+
+        staff_user.is_superuser = True
+        staff_user.save()
+
+        assert get_permission_fingerprint(staff_user) != before
+
+    def test_entries_are_bounded(self, authenticated_staff_request):
+        catalog = get_catalog(admin.site)
+        permission_cache.clear()
+
+        with override_settings(COFFEE_ADMIN_PERMISSION_CACHE_SIZE=1):
+            get_permitted_keys(authenticated_staff_request, catalog)
+
+        assert len(permission_cache) == 1
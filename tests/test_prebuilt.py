@@ -0,0 +1,184 @@
+"""
+Tests for catalogs prebuilt by the coffee_build_index management command
+"""
+from io import StringIO
+
+import pytest
+from django.contrib import admin
+from django.contrib.admin import AdminSite
+from django.contrib.auth.models import Group, User
+from django.core.management import CommandError, call_command
+
+from coffee_admin import catalog as catalog_module
+from coffee_admin import prebuilt
+from coffee_admin.catalog import (
+    AdminCatalog,
+    get_catalog,
+    get_catalog_fingerprint,
+    invalidate_catalog,
+)
+from coffee_admin.prebuilt import MAGIC, read_index, write_index
+
+
+@pytest.fixture
+def index_path(settings, tmp_path):
+    """COFFEE_ADMIN_CATALOG_INDEX_PATH, pointing at a file that does not exist yet"""
+    path = tmp_path / 'coffee-index.bin'
+    settings.COFFEE_ADMIN_CATALOG_INDEX_PATH = str(path)
+    invalidate_catalog()
+    yield path
+    invalidate_catalog()
+
+
+@pytest.fixture
+def new_process():
+    """Forget every catalog and the loaded index file, as a freshly started worker"""
+    def forget():
+        invalidate_catalog()
+        prebuilt.reset_index()
+    return forget
+
+
+@pytest.mark.unit
+class TestIndexFile:
+    """Tests for reading and writing the index file"""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / 'index.bin'
+        snapshot = AdminCatalog(admin.site).snapshot()
+        write_index(str(path), {'abc': snapshot})
+
+        assert read_index(str(path)) == {'abc': snapshot}
+
+    def test_missing_file(self, tmp_path):
+        assert read_index(str(tmp_path / 'missing.bin')) == {}
+
+    @pytest.mark.parametrize('data', [b'', b'not an index', MAGIC + b'\xff\x00', MAGIC])
+    def test_corrupt_file(self, tmp_path, data):
+        path = tmp_path / 'index.bin'
+        path.write_bytes(data)
+
+        assert read_index(str(path)) == {}
+
+    def test_other_format(self, tmp_path, monkeypatch):
+        path = tmp_path / 'index.bin'
+        monkeypatch.setattr(prebuilt, 'INDEX_FORMAT', 99)
+        write_index(str(path), {'abc': {}})
+        monkeypatch.undo()
+
+        assert read_index(str(path)) == {}
+
+    def test_disabled_by_default(self, settings, new_process):
+        settings.COFFEE_ADMIN_CATALOG_INDEX_PATH = None
+        new_process()
+
+        assert prebuilt.load_index() == {}
+
+
+@pytest.mark.unit
+class TestBuildIndexCommand:
+    """Tests for the coffee_build_index management command"""
+
+    def test_requires_index_path(self, settings):
+        settings.COFFEE_ADMIN_CATALOG_INDEX_PATH = None
+
+        with pytest.raises(CommandError):
+            call_command('coffee_build_index')
+
+    def test_writes_every_site(self, index_path):
+        site = AdminSite(name='prebuilt_admin')
+        site.register(Group)
+        out = StringIO()
+
+        call_command('coffee_build_index', stdout=out)
+        snapshots = read_index(str(index_path))
+
+        assert get_catalog_fingerprint(admin.site) in snapshots
+        assert get_catalog_fingerprint(site) in snapshots
+        assert 'for prebuilt_admin (en-us)' in out.getvalue()
+
+    def test_path_option(self, tmp_path):
+        path = tmp_path / 'other.bin'
+
+        call_command('coffee_build_index', f'--path={path}', stdout=StringIO())
+
+        assert get_catalog_fingerprint(admin.site) in read_index(str(path))
+
+    def test_script_prefix_option(self, tmp_path):
+        path = tmp_path / 'index.bin'
+        call_command(
+            'coffee_build_index', f'--path={path}', '--script-prefix=/backoffice',
+            stdout=StringIO(),
+        )
+        snapshots = read_index(str(path))
+
+        assert any(
+            snapshot['urls']['index'] == '/backoffice/admin/' for snapshot in snapshots.values()
+        )
+        assert get_catalog_fingerprint(admin.site) not in snapshots
+
+    def test_unwritable_path(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command(
+                'coffee_build_index', f'--path={tmp_path}/missing/index.bin', stdout=StringIO(),
+            )
+
+
+@pytest.mark.unit
+class TestPrebuiltCatalog:
+    """Tests for catalogs restored from the index file"""
+
+    def test_new_process_restores_catalog(self, index_path, new_process, monkeypatch):
+        built = AdminCatalog(admin.site)
+        call_command('coffee_build_index', stdout=StringIO())
+        new_process()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('the registry was walked')
+
+        monkeypatch.setattr(catalog_module, 'build_model_entries', fail)
+        restored = get_catalog(admin.site)
+
+        assert restored.version == built.version
+        assert [entry.as_dict() for entry in restored] == [entry.as_dict() for entry in built]
+
+    def test_restored_entries_check_permissions(self, index_path, new_process, rf, staff_user):
+        call_command('coffee_build_index', stdout=StringIO())
+        new_process()
+        restored = get_catalog(admin.site)
+        request = rf.get('/')
+        request.user = staff_user
+
+        add_user = next(entry for entry in restored if entry.title == 'Add User')
+        assert add_user.model_admin is admin.site._registry[User]
+        assert not add_user.has_permission(request)
+
+    def test_changed_registry_is_rebuilt(self, index_path, new_process):
+        site = AdminSite(name='changed_prebuilt_admin')
+        call_command('coffee_build_index', stdout=StringIO())
+        new_process()
+        site.register(Group)
+
+        catalog = get_catalog(site)
+
+        assert 'Groups' in [entry.title for entry in catalog]
+
+    def test_mismatched_snapshot_is_rebuilt(self, index_path, new_process):
+        site = AdminSite(name='mismatch_prebuilt_admin')
+        site.register(Group)
+        snapshot = AdminCatalog(site).snapshot()
+        site.unregister(Group)
+        write_index(str(index_path), {get_catalog_fingerprint(site): snapshot})
+        new_process()
+
+        catalog = get_catalog(site)
+
+        assert 'Groups' not in [entry.title for entry in catalog]
+
+    def test_setting_change_reloads_file(self, settings, tmp_path, new_process):
+        path = tmp_path / 'index.bin'
+        write_index(str(path), {'abc': {}})
+        new_process()
+        settings.COFFEE_ADMIN_CATALOG_INDEX_PATH = str(path)
+
+        assert prebuilt.load_index() == {'abc': {}}
@@ -0,0 +1,137 @@
+"""
+Tests for on-demand profiling of search requests
+"""
+import importlib
+import json
+import pstats
+import sys
+
+import pytest
+from django.contrib.auth.models import Group
+
+from coffee_admin.views import SearchAdminUrlsView
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.COFFEE_ADMIN_PROFILING = True
+    settings.COFFEE_ADMIN_PROFILE_FUNCTIONS = 5
+    # Imported afresh, as test_disabled_by_default unloads it
+    return importlib.import_module('coffee_admin.profiling')
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    """Tests for the profile=1 search parameter"""
+
+    def test_disabled_by_default(self, client, superuser):
+        sys.modules.pop('coffee_admin.profiling', None)
+        client.force_login(superuser)
+
+        response = client.get('/admin/coffee/search/?q=user&profile=1')
+
+        assert 'profile' not in json.loads(response.content)
+        assert 'coffee_admin.profiling' not in sys.modules
+
+    def test_superuser_gets_a_profile(self, client, superuser, profiling):
+        client.force_login(superuser)
+
+        response = client.get('/admin/coffee/search/?q=user&profile=1')
+        data = json.loads(response.content)
+
+        assert response.status_code == 200
+        assert 'no-cache' in response['Cache-Control']
+        assert data['status'] == 200
+        assert data['response']['query'] == 'user'
+        profile = data['profile']
+        assert profile['total'] > 0
+        assert len(profile['functions']) == 5
+        assert profile['functions'][0]['cumulative_time'] >= \
+            profile['functions'][-1]['cumulative_time']
+        assert profile['query_count'] == len(profile['queries'])
+        assert profile['file'] is None
+
+    def test_queries_are_recorded(self, client, superuser, profiling, monkeypatch):
+        def search(self, request):
+            list(Group.objects.all())
+            return original(self, request)
+
+        original = SearchAdminUrlsView.search
+        monkeypatch.setattr(SearchAdminUrlsView, 'search', search)
+        client.force_login(superuser)
+
+        profile = json.loads(client.get('/admin/coffee/search/?profile=1').content)['profile']
+
+        assert any('auth_group' in query['sql'] for query in profile['queries'])
+
+    def test_staff_user_is_not_profiled(self, client, staff_user, profiling):
+        client.force_login(staff_user)
+
+        response = client.get('/admin/coffee/search/?q=user&profile=1')
+
+        assert 'profile' not in json.loads(response.content)
+
+    def test_profile_is_saved(self, client, superuser, profiling, settings, tmp_path):
+        settings.COFFEE_ADMIN_PROFILE_DIR = str(tmp_path / 'profiles')
+        client.force_login(superuser)
+
+        profile = json.loads(client.get('/admin/coffee/search/?profile=1').content)['profile']
+
+        path = tmp_path / 'profiles' / profile['file']
+        assert pstats.Stats(str(path)).total_calls > 0
+
+    def test_unwritable_profile_dir(self, client, superuser, profiling, settings, tmp_path):
+        blocker = tmp_path / 'file'
+        blocker.write_text('')
+        settings.COFFEE_ADMIN_PROFILE_DIR = str(blocker / 'profiles')
+        client.force_login(superuser)
+
+        profile = json.loads(client.get('/admin/coffee/search/?profile=1').content)['profile']
+
+        assert profile['file'] is None
+        assert profile['file_error']
+
+    def test_streamed_response(self, client, superuser, profiling):
+        client.force_login(superuser)
+
+        response = client.get('/admin/coffee/search/?q=user&stream=ndjson&profile=1')
+        lines = json.loads(response.content)['response'].splitlines()
+
+        assert json.loads(lines[-1])['done'] is True
+
+    def test_not_modified_response(self, client, superuser, profiling):
+        client.force_login(superuser)
+        etag = client.get('/admin/coffee/search/?q=user')['ETag']
+
+        data = json.loads(client.get(
+            '/admin/coffee/search/?q=user&profile=1', HTTP_IF_NONE_MATCH=etag,
+        ).content)
+
+        assert data['status'] == 304
+        assert data['response'] is None
+
+    def test_other_profiling_tool_is_active(self, client, superuser, profiling, monkeypatch):
+        class ActiveProfile:
+            def enable(self):
+                raise ValueError('Another profiling tool is already active')
+
+        monkeypatch.setattr(profiling.cProfile, 'Profile', ActiveProfile)
+        client.force_login(superuser)
+
+        response = client.get('/admin/coffee/search/?q=user&profile=1')
+
+        assert response.status_code == 200
+        assert 'profile' not in json.loads(response.content)
+        assert not profiling._lock.locked()
+
+    def test_one_request_is_profiled_at_a_time(
+        self, client, superuser, profiling, monkeypatch,
+    ):
+        monkeypatch.setattr(profiling, 'LOCK_WAIT', 0.01)
+        client.force_login(superuser)
+
+        with profiling._lock:
+            response = client.get('/admin/coffee/search/?q=user&profile=1')
+
+        assert 'profile' not in json.loads(response.content)
+        assert 'profile' in json.loads(client.get('/admin/coffee/search/?profile=1').content)
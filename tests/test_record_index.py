@@ -0,0 +1,285 @@
+"""
+Tests for the SQLite FTS5 record index
+"""
+from io import StringIO
+
+import pytest
+from django.contrib import admin
+from django.contrib.admin import AdminSite
+from django.contrib.auth.admin import GroupAdmin
+from django.contrib.auth.models import Group, User
+from django.core.management import CommandError, call_command
+from django.db.models.signals import post_delete, post_save
+
+from coffee_admin import record_index as record_index_module
+from coffee_admin import records
+from coffee_admin.catalog import get_catalog
+from coffee_admin.record_index import (
+    RecordIndex,
+    _instance_deleted,
+    _instance_saved,
+    build_match_expression,
+    build_row,
+    connect_signals,
+    get_record_index,
+    resolve_search_field,
+)
+from coffee_admin.records import RecordSearchProvider
+
+
+class IndexedUserAdmin(admin.ModelAdmin):
+    search_fields = ('^username', 'email', 'groups__name')
+    coffee_record_index = True
+
+
+@pytest.fixture
+def indexed_site():
+    """An admin site where users are in the record index and groups are not"""
+    site = AdminSite(name='indexed_admin')
+    site.register(User, IndexedUserAdmin)
+    site.register(Group, GroupAdmin)
+    return site
+
+
+@pytest.fixture
+def record_index(settings, tmp_path):
+    """A configured record index with its signal handlers connected"""
+    settings.COFFEE_ADMIN_RECORD_INDEX_PATH = str(tmp_path / 'records.sqlite3')
+    connect_signals()
+    index = get_record_index()
+    yield index
+    post_save.disconnect(_instance_saved, dispatch_uid='coffee_admin.record_index')
+    post_delete.disconnect(_instance_deleted, dispatch_uid='coffee_admin.record_index')
+    index.close()
+
+
+@pytest.mark.unit
+class TestHelpers:
+    """Tests for query and row helpers"""
+
+    def test_match_expression_uses_prefixes(self):
+        assert build_match_expression('acme sup') == '"acme"* "sup"*'
+
+    def test_match_expression_escapes_quotes(self):
+        assert build_match_expression('a"b') == '"a""b"*'
+
+    def test_match_expression_empty(self):
+        assert build_match_expression('   ') == ''
+
+    def test_index_disabled_by_default(self):
+        assert get_record_index() is None
+
+
+@pytest.mark.unit
+class TestRecordIndex:
+    """Tests for RecordIndex storage"""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        index = RecordIndex(str(tmp_path / 'index.sqlite3'))
+        yield index
+        index.close()
+
+    def test_index_and_search(self, index):
+        index.index([('shop.customer', 1, 'ACME Corp', 'ACME Corp acme@example.com')])
+
+        assert index.search('acm', ['shop.customer'], 10) == [('shop.customer', '1', 'ACME Corp')]
+
+    def test_search_filters_models(self, index):
+        index.index([('shop.customer', 1, 'ACME', 'ACME')])
+
+        assert index.search('acme', ['shop.order'], 10) == []
+
+    def test_reindex_replaces_row(self, index):
+        index.index([('shop.customer', 1, 'ACME', 'ACME')])
+        index.index([('shop.customer', 1, 'Globex', 'Globex')])
+
+        assert index.search('acme', ['shop.customer'], 10) == []
+        assert index.search('globex', ['shop.customer'], 10) == [('shop.customer', '1', 'Globex')]
+
+    def test_remove(self, index):
+        index.index([('shop.customer', 1, 'ACME', 'ACME')])
+        index.remove('shop.customer', 1)
+
+        assert index.search('acme', ['shop.customer'], 10) == []
+
+    def test_clear_model(self, index):
+        index.index([('shop.customer', 1, 'ACME', 'ACME'), ('shop.order', 1, 'ACME', 'ACME')])
+        index.clear('shop.customer')
+
+        assert index.search('acme', ['shop.customer', 'shop.order'], 10) == [
+            ('shop.order', '1', 'ACME'),
+        ]
+
+    def test_limit(self, index):
+        index.index([('shop.customer', pk, 'ACME', 'ACME') for pk in range(5)])
+
+        assert len(index.search('acme', ['shop.customer'], 2)) == 2
+
+
+@pytest.mark.django_db
+class TestRowBuilding:
+    """Tests for index rows built from search_fields"""
+
+    def test_build_row_uses_search_fields(self, staff_user):
+        row = build_row(IndexedUserAdmin(User, admin.site), staff_user)
+
+        assert row[:3] == ('auth.user', staff_user.pk, 'staffuser')
+        assert 'staff@example.com' in row[3]
+
+    def test_multi_valued_relations_are_skipped(self, staff_user):
+        assert resolve_search_field(staff_user, 'groups__name') is None
+
+    def test_unknown_fields_are_skipped(self, staff_user):
+        assert resolve_search_field(staff_user, 'username__iexact') is None
+
+
+@pytest.mark.django_db
+class TestSignals:
+    """Tests for incremental index maintenance"""
+
+    def test_save_indexes_on_commit(
+        self, record_index, indexed_site, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            user = User.objects.create_user(username='acme')
+
+        assert record_index.search('acme', ['auth.user'], 10) == [('auth.user', str(user.pk), 'acme')]
+
+    def test_delete_removes_on_commit(
+        self, record_index, indexed_site, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            user = User.objects.create_user(username='acme')
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+
+        assert record_index.search('acme', ['auth.user'], 10) == []
+
+    def test_index_errors_do_not_fail_writes(
+        self, settings, tmp_path, indexed_site, django_capture_on_commit_callbacks, caplog
+    ):
+        settings.COFFEE_ADMIN_RECORD_INDEX_PATH = str(tmp_path / 'missing' / 'records.sqlite3')
+        connect_signals()
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                user = User.objects.create_user(username='acme')
+            with django_capture_on_commit_callbacks(execute=True):
+                user.delete()
+        finally:
+            post_save.disconnect(_instance_saved, dispatch_uid='coffee_admin.record_index')
+            post_delete.disconnect(_instance_deleted, dispatch_uid='coffee_admin.record_index')
+
+        assert not User.objects.filter(username='acme').exists()
+        assert len([r for r in caplog.records if r.name == 'coffee_admin.record_index']) == 2
+
+    def test_row_errors_do_not_fail_writes(
+        self, record_index, indexed_site, django_capture_on_commit_callbacks, caplog,
+        monkeypatch, django_assert_num_queries,
+    ):
+        def fail(model_admin, obj):
+            raise ValueError('broken __str__')
+
+        monkeypatch.setattr(record_index_module, 'build_row', fail)
+        user = User.objects.create_user(username='acme')
+
+        # Only the UPDATE; the row is built after commit
+        with django_assert_num_queries(1):
+            with django_capture_on_commit_callbacks() as callbacks:
+                user.save(update_fields=['username'])
+        for callback in callbacks:
+            callback()
+
+        assert len([r for r in caplog.records if r.name == 'coffee_admin.record_index']) == 1
+        assert record_index.search('acme', ['auth.user'], 10) == []
+
+    def test_unindexed_models_are_ignored(
+        self, record_index, indexed_site, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            Group.objects.create(name='acme')
+
+        assert callbacks == []
+
+
+@pytest.mark.django_db
+class TestIndexCommand:
+    """Tests for the coffee_index_records management command"""
+
+    def test_requires_index_path(self):
+        with pytest.raises(CommandError):
+            call_command('coffee_index_records')
+
+    def test_rebuilds_in_chunks(self, record_index, indexed_site):
+        for name in ('acme', 'acme-support', 'globex'):
+            User.objects.create_user(username=name)
+        out = StringIO()
+
+        call_command('coffee_index_records', '--chunk-size=2', stdout=out)
+
+        assert 'Indexed 3 auth.user records.' in out.getvalue()
+        assert len(record_index.search('acme', ['auth.user'], 10)) == 2
+
+    def test_rejects_models_not_opted_in(self, record_index, indexed_site):
+        with pytest.raises(CommandError):
+            call_command('coffee_index_records', 'auth.group')
+
+
+@pytest.mark.django_db
+class TestIndexedRecordSearch:
+    """Tests for record search backed by the index"""
+
+    def test_indexed_models_skip_the_search_query(
+        self, record_index, indexed_site, authenticated_superuser_request, settings, monkeypatch
+    ):
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+        user = User.objects.create_user(username='acme-support')
+        record_index.index([('auth.user', user.pk, 'acme', 'acme acme@example.com')])
+        searched = []
+        original = records.search_model
+
+        def tracking_search_model(request, entry, query, limit):
+            searched.append(entry.model)
+            return original(request, entry, query, limit)
+
+        monkeypatch.setattr(records, 'search_model', tracking_search_model)
+
+        provider = RecordSearchProvider(get_catalog(indexed_site))
+        results, partial = provider.search(authenticated_superuser_request, 'acme', 10)
+
+        assert [r['url'] for r in results] == [f'/indexed_admin/auth/user/{user.pk}/change/']
+        assert searched == [Group]
+        assert partial is False
+
+    def test_hits_are_scoped_by_get_queryset(
+        self, record_index, authenticated_superuser_request, settings
+    ):
+        class ScopedUserAdmin(IndexedUserAdmin):
+            def get_queryset(self, request):
+                return super().get_queryset(request).exclude(username='acme-hidden')
+
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+        site = AdminSite(name='scoped_indexed_admin')
+        site.register(User, ScopedUserAdmin)
+        visible = User.objects.create_user(username='acme-visible')
+        hidden = User.objects.create_user(username='acme-hidden')
+        record_index.index([
+            ('auth.user', visible.pk, 'acme-visible', 'acme-visible'),
+            ('auth.user', hidden.pk, 'acme-hidden', 'acme-hidden'),
+        ])
+
+        provider = RecordSearchProvider(get_catalog(site))
+        results, partial = provider.search(authenticated_superuser_request, 'acme', 10)
+
+        assert [r['title'] for r in results] == ['acme-visible']
+
+    def test_deleted_rows_are_not_listed(
+        self, record_index, indexed_site, authenticated_superuser_request, settings
+    ):
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+        record_index.index([('auth.user', 4242, 'acme', 'acme')])
+
+        provider = RecordSearchProvider(get_catalog(indexed_site))
+        results, partial = provider.search(authenticated_superuser_request, 'acme', 10)
+
+        assert results == []
@@ -0,0 +1,168 @@
+"""
+Tests for record search across ModelAdmin.search_fields
+"""
+import time
+
+import pytest
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.test import override_settings
+
+from coffee_admin.catalog import get_catalog
+from coffee_admin.records import RecordSearchProvider, rank_record
+
+
+@pytest.fixture
+def customers(db):
+    """A few users to search for"""
+    return [
+        User.objects.create_user(username=name, email=f'{name}@example.com')
+        for name in ('acme', 'acme-support', 'globex')
+    ]
+
+
+def search(request, query, limit=50):
+    return RecordSearchProvider(get_catalog(admin.site)).search(request, query, limit)
+
+
+@pytest.mark.unit
+class TestRankRecord:
+    """Tests for record ordering"""
+
+    def test_exact_before_prefix_before_substring(self):
+        results = [{'title': t} for t in ('the acme', 'acme inc', 'acme')]
+
+        results.sort(key=lambda result: rank_record(result, 'acme'))
+
+        assert [r['title'] for r in results] == ['acme', 'acme inc', 'the acme']
+
+
+@pytest.mark.django_db
+class TestRecordSearchInline:
+    """Tests for record search with queries run inline"""
+
+    @pytest.fixture(autouse=True)
+    def inline_queries(self, settings):
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+
+    def test_finds_records_via_search_fields(self, authenticated_superuser_request, customers):
+        results, partial = search(authenticated_superuser_request, 'acme')
+
+        assert [r['title'] for r in results] == ['acme', 'acme-support']
+        assert partial is False
+
+    def test_result_structure(self, authenticated_superuser_request, customers):
+        results, _partial = search(authenticated_superuser_request, 'globex')
+        result = results[0]
+
+        assert result['category'] == 'records'
+        assert result['url'] == f'/admin/auth/user/{customers[2].pk}/change/'
+        assert result['app_label'] == 'auth'
+        assert result['icon'] == '👤'
+
+    @override_settings(COFFEE_ADMIN_RECORD_SEARCH_LIMIT=1)
+    def test_per_model_limit(self, authenticated_superuser_request, customers):
+        results, _partial = search(authenticated_superuser_request, 'acme')
+
+        assert len(results) == 1
+
+    def test_global_limit(self, authenticated_superuser_request, customers):
+        results, _partial = search(authenticated_superuser_request, 'acme', limit=1)
+
+        assert len(results) == 1
+
+    def test_requires_view_permission(self, authenticated_staff_request, customers):
+        results, _partial = search(authenticated_staff_request, 'acme')
+
+        assert results == []
+
+    def test_searches_every_model(self, authenticated_superuser_request, customers):
+        Group.objects.create(name='acme staff')
+
+        results, _partial = search(authenticated_superuser_request, 'acme')
+
+        assert 'acme staff' in [r['title'] for r in results]
+
+    @override_settings(COFFEE_ADMIN_RECORD_SEARCH_TIMEOUT=0)
+    def test_deadline_marks_partial(self, authenticated_superuser_request, customers):
+        results, partial = search(authenticated_superuser_request, 'acme')
+
+        assert results == []
+        assert partial is True
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRecordSearchThreaded:
+    """Tests for record search on the thread pool"""
+
+    @pytest.fixture(autouse=True)
+    def threaded_queries(self, settings):
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 2
+
+    def test_finds_records(self, authenticated_superuser_request, customers):
+        results, partial = search(authenticated_superuser_request, 'acme')
+
+        assert [r['title'] for r in results] == ['acme', 'acme-support']
+        assert partial is False
+
+    @override_settings(COFFEE_ADMIN_RECORD_SEARCH_TIMEOUT=0.2)
+    def test_slow_model_is_skipped(self, authenticated_superuser_request, customers, monkeypatch):
+        group_admin = admin.site._registry[Group]
+        original = group_admin.get_search_results
+
+        def slow_search(request, queryset, term):
+            time.sleep(0.5)
+            return original(request, queryset, term)
+
+        monkeypatch.setattr(group_admin, 'get_search_results', slow_search)
+
+        started = time.monotonic()
+        results, partial = search(authenticated_superuser_request, 'acme')
+
+        assert time.monotonic() - started < 0.5
+        assert partial is True
+        assert [r['title'] for r in results] == ['acme', 'acme-support']
+
+
+@pytest.mark.django_db
+class TestSearchViewRecords:
+    """Tests for record results in SearchAdminUrlsView"""
+
+    @pytest.fixture(autouse=True)
+    def record_search(self, settings):
+        settings.COFFEE_ADMIN_RECORD_SEARCH = True
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+
+    def test_records_are_included(self, client, superuser, customers):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=acme').json()
+
+        assert [r['category'] for r in data['results']] == ['records', 'records']
+        assert data['partial'] is False
+
+    def test_records_disable_etag(self, client, superuser, customers):
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?q=acme')
+
+        assert not response.has_header('ETag')
+
+    def test_short_queries_skip_record_search(self, client, superuser, customers):
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?q=a')
+
+        assert 'records' not in [r['category'] for r in response.json()['results']]
+        assert response.has_header('ETag')
+
+    @override_settings(COFFEE_ADMIN_RECORD_SEARCH=False)
+    def test_disabled_by_default_setting(self, client, superuser, customers):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=acme').json()
+
+        assert data['results'] == []
+
+    def test_catalog_advertises_record_search(self, client, superuser):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/catalog/').json()
+
+        assert data['record_search'] is True
+        assert data['record_search_min_length'] == 2
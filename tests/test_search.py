@@ -0,0 +1,114 @@
+"""
+Tests for the ranked search engine
+"""
+import pytest
+
+from coffee_admin.catalog import CatalogEntry
+from coffee_admin.search import SearchIndex, is_subsequence, tokenize, trigrams
+
+
+def make_entry(title, subtitle='', app_label='shop'):
+    return CatalogEntry(
+        title=title,
+        subtitle=subtitle,
+        url=f'/admin/{title.lower().replace(" ", "")}/',
+        icon='📦',
+        category='models',
+        app_label=app_label,
+    )
+
+
+@pytest.fixture
+def index():
+    entries = [
+        make_entry('Customers', 'View all customers'),
+        make_entry('Order Items', 'View all order items'),
+        make_entry('Orders', 'View all orders'),
+        make_entry('Users', 'View all users', app_label='auth'),
+        make_entry('Log Entries', 'View all log entries', app_label='admin'),
+        make_entry('Add Order', 'Create a new order'),
+    ]
+    return SearchIndex(entries)
+
+
+def titles(entries):
+    return [entry.title for entry in entries]
+
+
+@pytest.mark.unit
+class TestHelpers:
+    """Tests for tokenizer and matching helpers"""
+
+    def test_tokenize_splits_on_non_word_characters(self):
+        assert tokenize('Order_Items, view-all') == ['order', 'items', 'view', 'all']
+
+    def test_trigrams_are_padded(self):
+        assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+    def test_is_subsequence(self):
+        assert is_subsequence('usr', 'users')
+        assert not is_subsequence('rsu', 'users')
+
+
+@pytest.mark.unit
+class TestSearchIndex:
+    """Tests for SearchIndex ranking"""
+
+    def test_exact_title_match_ranks_first(self, index):
+        assert titles(index.search('orders', 10))[0] == 'Orders'
+
+    def test_prefix_match(self, index):
+        assert 'Customers' in titles(index.search('cust', 10))
+
+    def test_multi_token_prefix_match(self, index):
+        assert titles(index.search('ord item', 10)) == ['Order Items']
+
+    def test_fuzzy_subsequence_match(self, index):
+        assert titles(index.search('usr', 10)) == ['Users']
+
+    def test_acronym_match(self, index):
+        assert titles(index.search('le', 10))[0] == 'Log Entries'
+
+    def test_substring_match(self, index):
+        assert 'Customers' in titles(index.search('stom', 10))
+
+    def test_app_label_match(self, index):
+        assert titles(index.search('auth', 10)) == ['Users']
+
+    def test_title_matches_outrank_subtitle_matches(self, index):
+        results = titles(index.search('order', 10))
+
+        assert results.index('Orders') < results.index('Add Order')
+
+    def test_no_match(self, index):
+        assert index.search('nonexistentmodel12345', 10) == []
+
+    def test_empty_query(self, index):
+        assert index.search('   ', 10) == []
+
+    def test_limit(self, index):
+        assert len(index.search('view', 2)) == 2
+
+    def test_offset_skips_best_matches(self, index):
+        ranked = titles(index.search('view', 10))
+
+        assert titles(index.search('view', 2, offset=1)) == ranked[1:3]
+
+    def test_indexes_share_token_data(self):
+        first = SearchIndex([make_entry('Customers')])
+        second = SearchIndex([make_entry('Customers')])
+
+        assert first.entries[0].tokens is second.entries[0].tokens
+
+    def test_predicate_is_applied_best_first(self, index):
+        ranked = titles(index.search('order', 10))
+        checked = []
+
+        def predicate(entry):
+            checked.append(entry.title)
+            return entry.title != ranked[0]
+
+        results = titles(index.search('order', 1, predicate=predicate))
+
+        assert results == [ranked[1]]
+        assert checked == ranked[:2]
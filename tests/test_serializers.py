@@ -0,0 +1,97 @@
+"""
+Tests for response encoding and the compact result format
+"""
+import json
+
+import pytest
+from django.utils.translation import gettext_lazy
+
+from coffee_admin import serializers
+from coffee_admin.serializers import (
+    compact_results,
+    dumps,
+    expand_results,
+    format_results,
+    get_dumps,
+    json_dumps,
+    json_response,
+    orjson_dumps,
+)
+
+RESULTS = [
+    {'title': 'Users', 'subtitle': 'Manage users', 'url': '/admin/auth/user/',
+     'icon': '👤', 'category': 'models', 'app_label': 'auth'},
+    {'title': 'Add User', 'subtitle': 'Create new user', 'url': '/admin/auth/user/add/',
+     'icon': '👤', 'category': 'actions', 'app_label': 'auth'},
+    {'title': 'Groups', 'subtitle': 'Manage groups', 'url': '/admin/auth/group/',
+     'icon': '👥', 'category': 'models', 'app_label': 'auth'},
+]
+
+
+def upper_dumps(data):
+    return json.dumps(data).upper()
+
+
+@pytest.mark.unit
+class TestCompactResults:
+    """Tests for the columnar result format"""
+
+    def test_values_are_dictionary_coded(self):
+        compact = compact_results(RESULTS)
+
+        assert compact['tables'] == {
+            'icon': ['👤', '👥'],
+            'category': ['models', 'actions'],
+            'app_label': ['auth'],
+        }
+        assert compact['rows'][1] == ['Add User', 'Create new user', '/admin/auth/user/add/', 0, 1, 0]
+
+    def test_round_trip(self):
+        assert expand_results(compact_results(RESULTS)) == RESULTS
+
+    def test_empty(self):
+        assert expand_results(compact_results([])) == []
+
+    def test_is_smaller(self):
+        assert len(dumps(compact_results(RESULTS * 20))) < len(dumps(RESULTS * 20)) / 2
+
+    def test_verbose_is_unchanged(self):
+        assert format_results(RESULTS, 'verbose') is RESULTS
+
+
+@pytest.mark.unit
+class TestEncoder:
+    """Tests for the pluggable JSON encoder"""
+
+    def test_orjson_is_default_when_installed(self, settings):
+        settings.COFFEE_ADMIN_JSON_ENCODER = None
+        expected = orjson_dumps if serializers.orjson is not None else json_dumps
+
+        assert get_dumps() is expected
+
+    def test_dotted_path(self, settings):
+        settings.COFFEE_ADMIN_JSON_ENCODER = 'tests.test_serializers.upper_dumps'
+
+        assert dumps({'a': 'b'}) == '{"A": "B"}'
+
+    def test_callable(self, settings):
+        settings.COFFEE_ADMIN_JSON_ENCODER = upper_dumps
+
+        assert json_response({'a': 'b'}).content == b'{"A": "B"}'
+
+    @pytest.mark.parametrize('encoder', [json_dumps, orjson_dumps])
+    def test_encoders_agree(self, encoder):
+        if encoder is orjson_dumps and serializers.orjson is None:
+            pytest.skip('orjson is not installed')
+        data = {'results': compact_results(RESULTS), 'title': gettext_lazy('Admin Home')}
+
+        assert json.loads(encoder(data)) == json.loads(json.dumps(
+            {'results': compact_results(RESULTS), 'title': 'Admin Home'},
+        ))
+
+    def test_response(self):
+        response = json_response({'count': 1}, status=201)
+
+        assert response.status_code == 201
+        assert response['Content-Type'] == 'application/json'
+        assert json.loads(response.content) == {'count': 1}
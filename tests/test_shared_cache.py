@@ -0,0 +1,326 @@
+"""
+Tests for catalogs and permission sets shared through Django's cache framework
+"""
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.admin import AdminSite
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.asyncio import async_unsafe
+
+from coffee_admin import catalog as catalog_module
+from coffee_admin import shared_cache
+from coffee_admin.catalog import (
+    AdminCatalog,
+    get_catalog,
+    get_catalog_fingerprint,
+    invalidate_catalog,
+)
+from coffee_admin.permissions import (
+    compute_permitted_keys,
+    get_cached_permitted_keys,
+    get_permission_fingerprint,
+    permission_cache,
+)
+from coffee_admin.shared_cache import get_or_build, make_key
+from coffee_admin.views import AsyncSearchAdminUrlsView
+from tests import requires_async_views
+
+
+@pytest.fixture(params=['locmem', 'filebased'])
+def shared(request, settings, tmp_path):
+    """The shared cache, with each backend the launcher is tested against"""
+    backend = f'django.core.cache.backends.{request.param}.'
+    backend += 'LocMemCache' if request.param == 'locmem' else 'FileBasedCache'
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'launcher': {
+            'BACKEND': backend,
+            'LOCATION': str(tmp_path) if request.param == 'filebased' else 'launcher',
+        },
+    }
+    settings.COFFEE_ADMIN_CATALOG_CACHE = 'launcher'
+    cache = caches['launcher']
+    cache.clear()
+    invalidate_catalog()
+    yield cache
+    cache.clear()
+    invalidate_catalog()
+
+
+class AsyncUnsafeCache(LocMemCache):
+    """LocMemCache that, like DatabaseCache, refuses to run on an event loop"""
+
+    get = async_unsafe(LocMemCache.get)
+    get_many = async_unsafe(LocMemCache.get_many)
+    add = async_unsafe(LocMemCache.add)
+    set = async_unsafe(LocMemCache.set)
+
+
+@pytest.fixture
+def new_process():
+    """Forget everything this process built, as a freshly started worker"""
+    def forget():
+        invalidate_catalog()
+        permission_cache.clear()
+    return forget
+
+
+class Builder:
+    def __init__(self, value='built'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class BrokenCache:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('cache is down')
+        return fail
+
+
+@pytest.mark.unit
+class TestGetOrBuild:
+    """Tests for the stampede-protected cache lookup"""
+
+    def test_builds_once(self, shared):
+        build = Builder()
+
+        assert get_or_build(shared, 'key', build, 60) == 'built'
+        assert get_or_build(shared, 'key', build, 60) == 'built'
+        assert build.calls == 1
+
+    def test_stale_value_is_refreshed(self, shared):
+        # Past its refresh time, but not expired yet
+        shared.set('key', (0, 'old'))
+
+        assert get_or_build(shared, 'key', Builder('new'), 60) == 'new'
+        assert get_or_build(shared, 'key', Builder('newer'), 60) == 'new'
+
+    def test_stale_value_is_used_while_another_process_refreshes(self, shared):
+        shared.set('key', (0, 'old'))
+        shared.add('key:lock', 1)
+        build = Builder('new')
+
+        assert get_or_build(shared, 'key', build, 60) == 'old'
+        assert build.calls == 0
+
+    def test_waits_for_another_process(self, shared, monkeypatch):
+        shared.add('key:lock', 1)
+
+        def other_process_finishes(seconds):
+            shared.set('key', (1e12, 'theirs'))
+
+        monkeypatch.setattr(shared_cache.time, 'sleep', other_process_finishes)
+        build = Builder()
+
+        assert get_or_build(shared, 'key', build, 60) == 'theirs'
+        assert build.calls == 0
+
+    def test_builds_without_storing_after_waiting(self, shared, monkeypatch):
+        shared.add('key:lock', 1)
+        monkeypatch.setattr(shared_cache, 'LOCK_WAIT', 0)
+
+        assert get_or_build(shared, 'key', Builder(), 60) == 'built'
+        assert shared.get('key') is None
+
+    def test_lock_is_released(self, shared):
+        get_or_build(shared, 'key', Builder(), 60)
+
+        assert shared.get('key:lock') is None
+
+    def test_broken_cache_builds(self):
+        assert get_or_build(BrokenCache(), 'key', Builder(), 60) == 'built'
+
+
+@pytest.mark.django_db
+class TestSharedCatalog:
+    """Tests for catalogs restored from the shared cache"""
+
+    def test_catalog_is_stored(self, shared):
+        catalog = get_catalog(admin.site)
+        key = make_key('catalog', get_catalog_fingerprint(admin.site))
+
+        assert shared.get(key)[1]['version'] == catalog.version
+
+    def test_new_process_restores_catalog(self, shared, new_process, monkeypatch):
+        built = get_catalog(admin.site)
+        new_process()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('the registry was walked')
+
+        monkeypatch.setattr(catalog_module, 'build_model_entries', fail)
+        restored = get_catalog(admin.site)
+
+        assert restored is not built
+        assert restored.version == built.version
+        assert [entry.as_dict() for entry in restored] == [entry.as_dict() for entry in built]
+        assert [entry.data for entry in restored] == [entry.data for entry in built]
+
+    def test_restored_entries_check_permissions(self, shared, new_process, rf, staff_user):
+        get_catalog(admin.site)
+        new_process()
+        restored = get_catalog(admin.site)
+        request = rf.get('/')
+        request.user = staff_user
+
+        add_user = next(entry for entry in restored if entry.title == 'Add User')
+        assert add_user.model_admin is admin.site._registry[User]
+        assert not add_user.has_permission(request)
+
+    def test_restored_url_table(self, shared, new_process):
+        get_catalog(admin.site)
+        new_process()
+        restored = get_catalog(admin.site)
+
+        assert restored.urls.change(User, 7) == '/admin/auth/user/7/change/'
+        assert restored.urls.apps['auth'] == '/admin/auth/'
+
+    def test_fingerprint_follows_registry(self, shared):
+        site = AdminSite(name='fingerprint_admin')
+        before = get_catalog_fingerprint(site)
+        site.register(Group)
+
+        assert get_catalog_fingerprint(site) != before
+
+    def test_fingerprint_follows_verbose_names(self, shared, monkeypatch):
+        site = AdminSite(name='verbose_admin')
+        site.register(Group)
+        before = get_catalog_fingerprint(site)
+        monkeypatch.setattr(Group._meta, 'verbose_name_plural', 'teams')
+
+        assert get_catalog_fingerprint(site) != before
+
+    def test_fingerprint_does_not_walk_url_patterns(self, shared, monkeypatch):
+        site = AdminSite(name='routes_admin')
+        site.register(Group)
+        monkeypatch.setattr(site, 'get_urls', pytest.fail)
+
+        assert get_catalog_fingerprint(site)
+
+    def test_fingerprint_follows_version_setting(self, shared, settings):
+        before = get_catalog_fingerprint(admin.site)
+        settings.COFFEE_ADMIN_CATALOG_CACHE_VERSION = 'release-2'
+
+        assert get_catalog_fingerprint(admin.site) != before
+
+    def test_lock_is_not_held_while_loading(self, shared, monkeypatch):
+        load_catalog = catalog_module.load_catalog
+
+        def load(admin_site):
+            # Loading may wait for another process through the cache
+            assert not catalog_module._catalogs_lock.locked()
+            return load_catalog(admin_site)
+
+        monkeypatch.setattr(catalog_module, 'load_catalog', load)
+        site = AdminSite(name='unlocked_admin')
+
+        assert get_catalog(site) is get_catalog(site)
+
+    def test_catalog_invalidated_while_loading_is_not_kept(self, shared, monkeypatch):
+        load_catalog = catalog_module.load_catalog
+        site = AdminSite(name='invalidated_admin')
+
+        def load(admin_site):
+            catalog = load_catalog(admin_site)
+            invalidate_catalog(admin_site)
+            return catalog
+
+        monkeypatch.setattr(catalog_module, 'load_catalog', load)
+        catalog = get_catalog(site)
+        monkeypatch.setattr(catalog_module, 'load_catalog', load_catalog)
+
+        assert get_catalog(site) is not catalog
+
+    def test_mismatched_snapshot_is_rebuilt(self, shared):
+        site = AdminSite(name='mismatch_admin')
+        site.register(Group)
+        snapshot = AdminCatalog(site).snapshot()
+        site.unregister(Group)
+        shared.set(make_key('catalog', get_catalog_fingerprint(site)), (1e12, snapshot))
+
+        catalog = get_catalog(site)
+
+        assert 'Groups' not in [entry.title for entry in catalog]
+
+    def test_disabled_by_default(self, settings):
+        settings.COFFEE_ADMIN_CATALOG_CACHE = None
+        invalidate_catalog()
+        caches['default'].clear()
+        get_catalog(admin.site)
+
+        assert caches['default'].get(
+            make_key('catalog', get_catalog_fingerprint(admin.site)),
+        ) is None
+
+
+@pytest.mark.django_db
+class TestSharedPermissions:
+    """Tests for permitted sets shared through the cache"""
+
+    @pytest.fixture(autouse=True)
+    def share(self, shared, settings):
+        settings.COFFEE_ADMIN_SHARE_PERMISSIONS = True
+
+    def test_new_process_reads_permitted_keys(self, new_process, rf, superuser):
+        request = rf.get('/')
+        request.user = superuser
+        permitted = compute_permitted_keys(request, get_catalog(admin.site))
+        new_process()
+
+        assert get_cached_permitted_keys(request, get_catalog(admin.site)) == permitted
+
+    def test_invalidation_reaches_other_processes(self, rf, staff_user):
+        request = rf.get('/')
+        request.user = staff_user
+        compute_permitted_keys(request, get_catalog(admin.site))
+        before = get_permission_fingerprint(staff_user)
+
+        # Another process saves the user; this one only sees the shared cache
+        staff_user.save()
+        permission_cache._data.clear()
+
+        assert get_permission_fingerprint(staff_user) != before
+        assert get_cached_permitted_keys(request, get_catalog(admin.site)) is None
+
+    def test_group_change_invalidates_everyone(self, staff_user):
+        before = get_permission_fingerprint(staff_user)
+        Group.objects.create(name='Editors')
+
+        assert get_permission_fingerprint(staff_user) != before
+
+
+@pytest.mark.django_db
+@requires_async_views
+class TestAsyncView:
+    """Tests for shared cache lookups from AsyncSearchAdminUrlsView"""
+
+    @pytest.fixture(autouse=True)
+    def unsafe_cache(self, settings):
+        settings.CACHES = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'launcher': {'BACKEND': 'tests.test_shared_cache.AsyncUnsafeCache'},
+        }
+        settings.COFFEE_ADMIN_CATALOG_CACHE = 'launcher'
+        settings.COFFEE_ADMIN_SHARE_PERMISSIONS = True
+        invalidate_catalog()
+        permission_cache.clear()
+        yield caches['launcher']
+        caches['launcher'].clear()
+        invalidate_catalog()
+        permission_cache.clear()
+
+    def test_lookups_run_off_the_event_loop(self, unsafe_cache, authenticated_staff_request):
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(authenticated_staff_request)
+
+        assert response.status_code == 200
+        catalog = get_catalog(admin.site)
+        assert unsafe_cache.get(make_key('catalog', get_catalog_fingerprint(admin.site)))
+        assert get_cached_permitted_keys(authenticated_staff_request, catalog) is not None
@@ -0,0 +1,321 @@
+"""
+Tests for request coalescing and per-user throttling of the search endpoint
+"""
+import json
+import threading
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from coffee_admin import singleflight
+from coffee_admin.singleflight import SingleFlight, search_flights
+from coffee_admin.throttle import Throttle, search_throttle
+from coffee_admin.views import AsyncSearchAdminUrlsView, SearchAdminUrlsView
+from tests import requires_async_views
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def throttled(settings):
+    settings.COFFEE_ADMIN_SEARCH_THROTTLE_RATE = 1
+    settings.COFFEE_ADMIN_SEARCH_THROTTLE_BURST = 2
+    search_throttle.clear()
+    yield
+    search_throttle.clear()
+
+
+def observe_waiting(monkeypatch):
+    """Return a list that gets an item whenever a thread waits for a computation"""
+    waiting = []
+
+    class ObservedEvent(threading.Event):
+        def wait(self, timeout=None):
+            waiting.append(1)
+            return super().wait(timeout)
+
+    class ObservedCall(singleflight.Call):
+        __slots__ = ()
+
+        def __init__(self):
+            super().__init__()
+            self.done = ObservedEvent()
+
+    monkeypatch.setattr(singleflight, 'Call', ObservedCall)
+    return waiting
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Tests for SingleFlight"""
+
+    def test_concurrent_calls_share_one_computation(self, monkeypatch):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'response'
+
+        waiting = observe_waiting(monkeypatch)
+        leader = run_threads(1, lambda: results.append(flight.do('key', compute)))
+        started.wait(5)
+        followers = run_threads(3, lambda: results.append(flight.do('key', compute)))
+        wait_for(lambda: len(waiting) == 3)
+        release.set()
+        for thread in leader + followers:
+            thread.join(5)
+
+        assert calls == [1]
+        assert results == ['response'] * 4
+        assert len(flight) == 0
+
+    def test_different_keys_are_computed_separately(self):
+        flight = SingleFlight()
+
+        assert flight.do('a', lambda: 1) == 1
+        assert flight.do('b', lambda: 2) == 2
+
+    def test_results_are_not_kept(self):
+        flight = SingleFlight()
+        flight.do('key', lambda: 1)
+
+        assert flight.do('key', lambda: 2) == 2
+
+    def test_failure_is_raised_in_its_own_thread_only(self, monkeypatch):
+        waiting = observe_waiting(monkeypatch)
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('broken')
+
+        def run_leader():
+            with pytest.raises(RuntimeError):
+                flight.do('key', fail)
+
+        leader = run_threads(1, run_leader)
+        started.wait(5)
+        followers = run_threads(1, lambda: results.append(flight.do('key', lambda: 'own')))
+        wait_for(lambda: len(waiting) == 1)
+        release.set()
+        for thread in leader + followers:
+            thread.join(5)
+
+        assert results == ['own']
+        assert len(flight) == 0
+
+    def test_slow_computation_is_not_waited_for(self, monkeypatch):
+        monkeypatch.setattr(singleflight, 'WAIT_TIMEOUT', 0.01)
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'slow'
+
+        leader = run_threads(1, lambda: flight.do('key', slow))
+        started.wait(5)
+        try:
+            assert flight.do('key', lambda: 'own') == 'own'
+        finally:
+            release.set()
+            leader[0].join(5)
+
+
+@pytest.mark.unit
+class TestThrottle:
+    """Tests for the per-user token bucket"""
+
+    def test_burst_then_rate(self):
+        clock = Clock()
+        throttle = Throttle(clock=clock)
+
+        assert throttle.acquire(1, 2, 3) == 0
+        assert throttle.acquire(1, 2, 3) == 0
+        assert throttle.acquire(1, 2, 3) == 0
+        assert throttle.acquire(1, 2, 3) == pytest.approx(0.5)
+
+        clock.now += 0.5
+        assert throttle.acquire(1, 2, 3) == 0
+        assert throttle.acquire(1, 2, 3) > 0
+
+    def test_buckets_are_per_key(self):
+        throttle = Throttle(clock=Clock())
+
+        assert throttle.acquire(1, 1, 1) == 0
+        assert throttle.acquire(1, 1, 1) > 0
+        assert throttle.acquire(2, 1, 1) == 0
+
+    def test_refill_is_capped_at_burst(self):
+        clock = Clock()
+        throttle = Throttle(clock=clock)
+        throttle.acquire(1, 1, 2)
+        clock.now += 3600
+
+        assert [throttle.acquire(1, 1, 2) for _ in range(3)][-1] > 0
+
+    def test_full_buckets_are_pruned(self, monkeypatch):
+        monkeypatch.setattr('coffee_admin.throttle.MAX_BUCKETS', 2)
+        clock = Clock()
+        throttle = Throttle(clock=clock)
+        throttle.acquire(1, 1, 5)
+        throttle.acquire(2, 1, 5)
+        clock.now += 10
+
+        throttle.acquire(3, 1, 5)
+
+        assert len(throttle) == 1
+
+
+    def test_active_buckets_are_bounded(self, monkeypatch):
+        monkeypatch.setattr('coffee_admin.throttle.MAX_BUCKETS', 2)
+        throttle = Throttle(clock=Clock())
+        for key in range(5):
+            throttle.acquire(key, 1, 5)
+
+        assert len(throttle) == 2
+
+@pytest.mark.django_db
+class TestSearchThrottling:
+    """Tests for 429 responses from the search endpoint"""
+
+    def test_disabled_by_default(self, client, staff_user):
+        client.force_login(staff_user)
+
+        for _ in range(50):
+            assert client.get('/admin/coffee/search/?q=user').status_code == 200
+
+    def test_too_many_requests(self, client, staff_user, throttled):
+        client.force_login(staff_user)
+        statuses = [client.get('/admin/coffee/search/?q=user').status_code for _ in range(3)]
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert statuses == [200, 200, 429]
+        assert response.status_code == 429
+        assert response['Retry-After'] == '1'
+        assert json.loads(response.content) == {'error': 'Too many requests.'}
+
+    def test_users_are_throttled_separately(self, client, staff_user, superuser, throttled):
+        client.force_login(staff_user)
+        for _ in range(3):
+            client.get('/admin/coffee/search/?q=user')
+        client.force_login(superuser)
+
+        assert client.get('/admin/coffee/search/?q=user').status_code == 200
+
+    @requires_async_views
+    def test_async_view(self, authenticated_staff_request, throttled):
+        view = AsyncSearchAdminUrlsView.as_view()
+        statuses = [
+            async_to_sync(view)(authenticated_staff_request).status_code for _ in range(3)
+        ]
+
+        assert statuses == [200, 200, 429]
+
+
+@pytest.mark.django_db
+class TestSearchCoalescing:
+    """Tests for identical concurrent searches sharing one response"""
+
+    def test_concurrent_identical_searches(
+        self, authenticated_superuser_request, monkeypatch,
+    ):
+        view = SearchAdminUrlsView.as_view()
+        # Warm the catalog and permission caches so the threads stay off the DB
+        view(authenticated_superuser_request)
+        started = threading.Event()
+        release = threading.Event()
+        encode_search = SearchAdminUrlsView.encode_search
+        calls = []
+
+        def slow_encode_search(self, *args, **kwargs):
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return encode_search(self, *args, **kwargs)
+
+        monkeypatch.setattr(SearchAdminUrlsView, 'encode_search', slow_encode_search)
+        waiting = observe_waiting(monkeypatch)
+        request = authenticated_superuser_request
+        request.GET = request.GET.copy()
+        request.GET['q'] = 'user'
+        responses = []
+
+        leader = run_threads(1, lambda: responses.append(view(request)))
+        started.wait(5)
+        followers = run_threads(2, lambda: responses.append(view(request)))
+        wait_for(lambda: len(waiting) == 2)
+        release.set()
+        for thread in leader + followers:
+            thread.join(5)
+
+        assert len(responses) == 3
+        assert len({response.content for response in responses}) == 1
+        assert len({response['ETag'] for response in responses}) == 1
+        assert calls == [1]
+
+    def test_identical_searches_use_the_same_key(
+        self, authenticated_staff_request, monkeypatch,
+    ):
+        keys = []
+        do = search_flights.do
+
+        def record(key, compute):
+            keys.append(key)
+            return do(key, compute)
+
+        monkeypatch.setattr(search_flights, 'do', record)
+        view = SearchAdminUrlsView.as_view()
+        view(authenticated_staff_request)
+        view(authenticated_staff_request)
+
+        assert len(keys) == 2
+        assert keys[0] == keys[1]
+
+    def test_can_be_disabled(self, authenticated_staff_request, settings, monkeypatch):
+        settings.COFFEE_ADMIN_COALESCE_SEARCHES = False
+        monkeypatch.setattr(search_flights, 'do', pytest.fail)
+
+        response = SearchAdminUrlsView.as_view()(authenticated_staff_request)
+
+        assert response.status_code == 200
+
+    @requires_async_views
+    def test_async_view_does_not_block(self, authenticated_staff_request, monkeypatch):
+        monkeypatch.setattr(search_flights, 'do', pytest.fail)
+
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(authenticated_staff_request)
+
+        assert response.status_code == 200
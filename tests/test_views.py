@@ -1,12 +1,26 @@
 """
 Tests for coffee_admin views
 """
+import asyncio
+import json
+import threading
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import PermissionDenied
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
-from django.test import RequestFactory
+from django.test import RequestFactory, override_settings
 from django.urls import reverse
-from coffee_admin.views import SearchAdminUrlsView, StaffMemberRequiredMixin
+from coffee_admin import catalog as catalog_module
+from coffee_admin.catalog import invalidate_catalog
+from coffee_admin.serializers import expand_results
+from coffee_admin.views import (
+    AsyncSearchAdminUrlsView,
+    SearchAdminUrlsView,
+    StaffMemberRequiredMixin,
+)
+from tests import requires_async_streaming, requires_async_views
 
 
 @pytest.mark.django_db
@@ -269,3 +283,512 @@ class TestSearchQuery:
 
         assert data['count'] == 0
         assert data['results'] == []
+
+    def test_fuzzy_query_finds_model(self, client, staff_user):
+        """Abbreviated queries should still find the matching model"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=usr')
+        data = response.json()
+
+        assert data['results'][0]['title'] == 'Users'
+
+    def test_finds_app_index_pages(self, client, staff_user):
+        """App index pages should be searchable"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=authentication')
+        data = response.json()
+
+        assert data['results'][0]['url'] == '/admin/auth/'
+        assert data['results'][0]['category'] == 'apps'
+
+    def test_best_match_ranks_first(self, client, superuser):
+        """The closest title match should be returned before weaker matches"""
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?q=groups')
+        data = response.json()
+
+        assert data['results'][0]['title'] == 'Groups'
+
+
+@pytest.mark.django_db
+class TestSearchPagination:
+    """Tests for the limit parameter and cursor pagination"""
+
+    def test_limit_parameter(self, client, superuser):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?limit=2').json()
+
+        assert data['count'] == 2
+        assert data['next_cursor']
+
+    def test_limit_is_capped(self, client, superuser, settings):
+        settings.COFFEE_ADMIN_SEARCH_MAX_LIMIT = 3
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?limit=1000').json()
+
+        assert data['count'] == 3
+
+    def test_invalid_limit_uses_default(self, client, superuser):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?limit=abc').json()
+
+        assert data['count'] > 0
+
+    def test_cursor_returns_next_page(self, client, superuser):
+        client.force_login(superuser)
+        everything = client.get('/admin/coffee/search/?q=a').json()['results']
+
+        pages = []
+        url = '/admin/coffee/search/?q=a&limit=3'
+        while url:
+            data = client.get(url).json()
+            pages.extend(data['results'])
+            cursor = data['next_cursor']
+            url = f'/admin/coffee/search/?q=a&limit=3&cursor={cursor}' if cursor else None
+
+        assert pages == everything
+
+    def test_last_page_has_no_cursor(self, client, superuser):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=groups').json()
+
+        assert data['next_cursor'] is None
+
+    def test_invalid_cursor(self, client, superuser):
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?cursor=garbage')
+
+        assert response.status_code == 400
+
+    def test_cursor_is_bound_to_query(self, client, superuser):
+        client.force_login(superuser)
+        cursor = client.get('/admin/coffee/search/?q=a&limit=1').json()['next_cursor']
+        response = client.get(f'/admin/coffee/search/?q=b&cursor={cursor}')
+
+        assert response.status_code == 400
+
+    def test_etag_depends_on_page(self, client, superuser):
+        client.force_login(superuser)
+        first = client.get('/admin/coffee/search/?limit=2')
+        cursor = first.json()['next_cursor']
+        second = client.get(f'/admin/coffee/search/?limit=2&cursor={cursor}')
+
+        assert first['ETag'] != second['ETag']
+
+    def test_stream_done_event_has_cursor(self, client, superuser):
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?limit=2&stream=ndjson')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        assert len(events[0]['results']) == 2
+        assert events[-1]['next_cursor']
+
+
+class ClosedAdminSite(admin.AdminSite):
+    def has_permission(self, request):
+        return False
+
+
+@pytest.fixture
+def partner_site():
+    """A second admin site, only reachable through the multi-site endpoints"""
+    site = admin.AdminSite(name='partner_admin')
+    site.register(Group)
+    return site
+
+
+@pytest.mark.django_db
+class TestMultiSiteSearch:
+    """Tests for selecting the AdminSite by name"""
+
+    def test_site_from_url(self, client, superuser, partner_site):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/sites/partner_admin/search/?q=group').json()
+
+        assert [r['url'] for r in data['results']] == [
+            '/partner_admin/auth/group/', '/partner_admin/auth/group/add/',
+        ]
+
+    def test_site_from_query_parameter(self, client, superuser, partner_site):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=user&site=partner_admin').json()
+
+        assert data['results'] == []
+
+    def test_default_site_by_name(self, client, staff_user):
+        client.force_login(staff_user)
+        data = client.get('/admin/coffee/search/?q=user&site=admin').json()
+
+        assert data['results'][0]['url'] == '/admin/auth/user/'
+
+    def test_catalog_from_url(self, client, superuser, partner_site):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/sites/partner_admin/catalog/').json()
+
+        assert {r['title'] for r in data['results']} >= {'Groups', 'Add Group'}
+        assert 'Users' not in {r['title'] for r in data['results']}
+
+    def test_unknown_site(self, client, staff_user):
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/sites/nowhere/search/')
+
+        assert response.status_code == 404
+
+    def test_site_permission_is_checked(self, client, superuser):
+        site = ClosedAdminSite(name='locked_admin')
+        site.register(Group)
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?q=group&site=locked_admin')
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestCompactFormat:
+    """Tests for ?format=compact responses"""
+
+    def test_search(self, client, superuser):
+        client.force_login(superuser)
+        verbose = client.get('/admin/coffee/search/?q=user').json()
+        compact = client.get('/admin/coffee/search/?q=user&format=compact').json()
+
+        assert expand_results(compact['results']) == verbose['results']
+        assert compact['count'] == verbose['count']
+
+    def test_formats_have_different_etags(self, client, superuser):
+        client.force_login(superuser)
+        verbose = client.get('/admin/coffee/search/?q=user')
+        compact = client.get('/admin/coffee/search/?q=user&format=compact')
+
+        assert verbose['ETag'] != compact['ETag']
+
+    def test_unknown_format_is_verbose(self, client, superuser):
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=user&format=xml').json()
+
+        assert data['results'][0]['title'] == 'Users'
+
+    def test_stream(self, client, staff_user):
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user&stream=ndjson&format=compact')
+        content = b''.join(response.streaming_content).decode()
+        events = [json.loads(line) for line in content.splitlines()]
+
+        assert expand_results(events[0]['results'])[0]['title'] == 'Users'
+        assert events[-1]['done']
+
+    def test_catalog(self, client, superuser):
+        client.force_login(superuser)
+        verbose = client.get('/admin/coffee/catalog/')
+        compact = client.get('/admin/coffee/catalog/?format=compact')
+
+        assert expand_results(compact.json()['results']) == verbose.json()['results']
+        assert compact['ETag'] != verbose['ETag']
+
+    def test_stdlib_encoder(self, client, superuser, settings):
+        settings.COFFEE_ADMIN_JSON_ENCODER = 'coffee_admin.serializers.json_dumps'
+        client.force_login(superuser)
+        data = client.get('/admin/coffee/search/?q=user&format=compact').json()
+
+        assert expand_results(data['results'])[0]['title'] == 'Users'
+
+
+@pytest.mark.django_db
+class TestCatalogView:
+    """Tests for CatalogView"""
+
+    def test_view_requires_staff_user(self, client, regular_user):
+        """Catalog should not be accessible to non-staff users"""
+        client.force_login(regular_user)
+        response = client.get('/admin/coffee/catalog/')
+
+        assert response.status_code in [302, 403]
+
+    def test_returns_all_permitted_entries(self, client, superuser):
+        """Catalog should contain the home, list and add entries"""
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/catalog/')
+        data = response.json()
+
+        titles = [r['title'] for r in data['results']]
+        assert titles[0] == 'Admin Home'
+        assert 'Users' in titles
+        assert 'Add User' in titles
+        assert data['count'] == len(data['results'])
+
+    def test_excludes_entries_without_permission(self, client, staff_user):
+        """Add entries should be omitted without add permission"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/catalog/')
+        data = response.json()
+
+        assert not [r for r in data['results'] if r['category'] == 'actions']
+
+    def test_sets_etag_and_revalidation_headers(self, client, staff_user):
+        """Catalog responses should carry an ETag and require revalidation"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/catalog/')
+
+        assert response['ETag'] == f'"{response.json()["version"]}"'
+        assert 'no-cache' in response['Cache-Control']
+        assert 'private' in response['Cache-Control']
+
+    def test_if_none_match_returns_not_modified(self, client, staff_user):
+        """A matching If-None-Match should return 304 without a body"""
+        client.force_login(staff_user)
+        etag = client.get('/admin/coffee/catalog/')['ETag']
+
+        response = client.get('/admin/coffee/catalog/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert response.content == b''
+
+    def test_etag_differs_by_permissions(self, client, staff_user, superuser):
+        """Users with different permissions should get different ETags"""
+        client.force_login(staff_user)
+        staff_etag = client.get('/admin/coffee/catalog/')['ETag']
+        client.force_login(superuser)
+        superuser_etag = client.get('/admin/coffee/catalog/')['ETag']
+
+        assert staff_etag != superuser_etag
+
+
+@pytest.mark.django_db
+class TestSearchCaching:
+    """Tests for conditional GET support on SearchAdminUrlsView"""
+
+    def test_response_has_etag(self, client, staff_user):
+        """Search responses should carry an ETag"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert response['ETag'].startswith('"')
+
+    def test_default_cache_control(self, client, staff_user):
+        """Search responses should be private and revalidated by default"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert 'private' in response['Cache-Control']
+        assert 'max-age=0' in response['Cache-Control']
+
+    @override_settings(COFFEE_ADMIN_SEARCH_CACHE_MAX_AGE=120)
+    def test_configurable_max_age(self, client, staff_user):
+        """max-age should follow COFFEE_ADMIN_SEARCH_CACHE_MAX_AGE"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user')
+
+        assert 'max-age=120' in response['Cache-Control']
+
+    def test_if_none_match_returns_not_modified(self, client, staff_user):
+        """Repeating a query with its ETag should return 304"""
+        client.force_login(staff_user)
+        etag = client.get('/admin/coffee/search/?q=user')['ETag']
+
+        response = client.get('/admin/coffee/search/?q=user', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+    def test_etag_depends_on_query(self, client, staff_user):
+        """Different queries should have different ETags"""
+        client.force_login(staff_user)
+
+        user_etag = client.get('/admin/coffee/search/?q=user')['ETag']
+        group_etag = client.get('/admin/coffee/search/?q=group')['ETag']
+
+        assert user_etag != group_etag
+
+    def test_etag_ignores_query_case(self, client, staff_user):
+        """Queries differing only in case share a validator"""
+        client.force_login(staff_user)
+
+        lower = client.get('/admin/coffee/search/?q=user')['ETag']
+        upper = client.get('/admin/coffee/search/?q=USER')['ETag']
+
+        assert lower == upper
+
+    def test_etag_depends_on_permissions(self, client, staff_user, superuser):
+        """Users with different permissions should get different ETags"""
+        client.force_login(staff_user)
+        staff_etag = client.get('/admin/coffee/search/?q=user')['ETag']
+        client.force_login(superuser)
+        response = client.get('/admin/coffee/search/?q=user', HTTP_IF_NONE_MATCH=staff_etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != staff_etag
+
+
+@pytest.mark.django_db
+@requires_async_views
+class TestAsyncSearchAdminUrlsView:
+    """Tests for AsyncSearchAdminUrlsView"""
+
+    def get(self, request_factory, user, path='/admin/coffee/search/'):
+        request = request_factory.get(path)
+        request.user = user
+        return async_to_sync(AsyncSearchAdminUrlsView.as_view())(request)
+
+    def test_view_is_async(self):
+        """The view function should be a coroutine function"""
+        view = AsyncSearchAdminUrlsView.as_view()
+
+        assert asyncio.iscoroutinefunction(view)
+
+    def test_returns_same_results_as_sync_view(self, request_factory, superuser):
+        """Async and sync views should return identical results"""
+        request = request_factory.get('/admin/coffee/search/?q=user')
+        request.user = superuser
+        sync_data = json.loads(SearchAdminUrlsView.as_view()(request).content)
+
+        response = self.get(request_factory, superuser, '/admin/coffee/search/?q=user')
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == sync_data
+
+    def test_requires_staff_user(self, request_factory, regular_user):
+        """Non-staff users should be denied"""
+        with pytest.raises(PermissionDenied):
+            self.get(request_factory, regular_user)
+
+    def test_catalog_is_built_off_the_event_loop(self, request_factory, staff_user, monkeypatch):
+        """A catalog that is not loaded yet should be built in a sync thread"""
+        threads = []
+        load_catalog = catalog_module.load_catalog
+
+        def load(admin_site):
+            threads.append(threading.current_thread())
+            return load_catalog(admin_site)
+
+        monkeypatch.setattr(catalog_module, 'load_catalog', load)
+        invalidate_catalog()
+
+        assert self.get(request_factory, staff_user).status_code == 200
+        # async_to_sync runs thread-sensitive sync code in the calling thread
+        assert threads == [threading.current_thread()]
+
+    def test_conditional_get(self, request_factory, staff_user):
+        """Async view should honour If-None-Match"""
+        etag = self.get(request_factory, staff_user)['ETag']
+
+        request = request_factory.get('/admin/coffee/search/', HTTP_IF_NONE_MATCH=etag)
+        request.user = staff_user
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(request)
+
+        assert response.status_code == 304
+
+
+@pytest.mark.django_db
+class TestStreamingSearch:
+    """Tests for streaming search responses"""
+
+    def read_ndjson(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_ndjson_stream(self, client, staff_user):
+        """?stream=ndjson should return catalog results then a done summary"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user&stream=ndjson')
+
+        assert response['Content-Type'] == 'application/x-ndjson'
+        events = self.read_ndjson(response)
+        assert events[0]['provider'] == 'catalog'
+        assert events[0]['results'][0]['title'] == 'Users'
+        assert events[-1] == {
+            'done': True, 'query': 'user', 'count': 1, 'partial': False, 'next_cursor': None,
+            'record_search': False,
+        }
+
+    def test_accept_header_selects_stream(self, client, staff_user):
+        """The Accept header should select the streaming format"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user', HTTP_ACCEPT='text/event-stream')
+
+        assert response.streaming
+        assert response['Content-Type'] == 'text/event-stream'
+
+    def test_sse_stream(self, client, staff_user):
+        """?stream=sse should emit Server-Sent Events"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user&stream=sse')
+        content = b''.join(response.streaming_content).decode()
+
+        assert content.startswith('event: results\ndata: ')
+        assert '\n\nevent: done\ndata: ' in content
+
+    def test_stream_is_not_cached(self, client, staff_user):
+        """Streams should not be reused by caches or buffered by proxies"""
+        client.force_login(staff_user)
+        response = client.get('/admin/coffee/search/?q=user&stream=ndjson')
+
+        assert 'no-cache' in response['Cache-Control']
+        assert response['X-Accel-Buffering'] == 'no'
+
+    def test_records_streamed_after_catalog(self, client, superuser, settings):
+        """Record batches should follow the catalog batch"""
+        settings.COFFEE_ADMIN_RECORD_SEARCH = True
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+        User.objects.create_user(username='userbase')
+        client.force_login(superuser)
+
+        events = self.read_ndjson(client.get('/admin/coffee/search/?q=user&stream=ndjson'))
+
+        assert [event.get('provider') for event in events] == ['catalog', 'records', None]
+        assert events[1]['results'][0]['title'] == 'userbase'
+        assert events[-1]['count'] == len(events[0]['results']) + 1
+        assert events[-1]['record_search'] is True
+
+    def test_records_only(self, client, superuser, settings):
+        """providers=records should skip the catalog and leave the page to records"""
+        settings.COFFEE_ADMIN_RECORD_SEARCH = True
+        settings.COFFEE_ADMIN_RECORD_SEARCH_WORKERS = 0
+        User.objects.create_user(username='userbase')
+        client.force_login(superuser)
+
+        events = self.read_ndjson(client.get(
+            '/admin/coffee/search/?q=user&stream=ndjson&limit=1&providers=records',
+        ))
+
+        assert [event.get('provider') for event in events] == ['records', None]
+        assert events[0]['results'][0]['title'] == 'userbase'
+        assert events[-1]['count'] == 1
+
+    def test_catalog_only(self, client, superuser, settings):
+        """providers=catalog should leave out record results"""
+        settings.COFFEE_ADMIN_RECORD_SEARCH = True
+        User.objects.create_user(username='userbase')
+        client.force_login(superuser)
+
+        data = json.loads(client.get('/admin/coffee/search/?q=user&providers=catalog').content)
+
+        assert 'userbase' not in [result['title'] for result in data['results']]
+        assert data['results'][0]['title'] == 'Users'
+
+    @requires_async_streaming
+    def test_async_view_streams(self, request_factory, staff_user):
+        """The async view should stream through an async iterator"""
+        request = request_factory.get('/admin/coffee/search/?q=user&stream=ndjson')
+        request.user = staff_user
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(request)
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        lines = async_to_sync(collect)().decode().splitlines()
+        assert json.loads(lines[-1])['done'] is True
+
+    @requires_async_views
+    def test_async_view_falls_back_without_async_streaming(
+        self, request_factory, staff_user, monkeypatch,
+    ):
+        """Below Django 4.2 the async view should answer streams with plain JSON"""
+        monkeypatch.setattr('coffee_admin.views.ASYNC_STREAMING', False)
+        request = request_factory.get('/admin/coffee/search/?q=user&stream=ndjson')
+        request.user = staff_user
+
+        response = async_to_sync(AsyncSearchAdminUrlsView.as_view())(request)
+
+        assert not response.streaming
+        assert json.loads(response.content)['query'] == 'user'